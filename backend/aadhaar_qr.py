@@ -0,0 +1,147 @@
+"""
+Parse the payload of an Aadhaar QR code into the same fields the OCR path extracts.
+
+Supported payloads:
+  - secure QR (2018+): a long decimal string encoding a gzip/zlib stream whose
+    fields are separated by 0xFF bytes (optionally prefixed with "V2")
+  - legacy XML: <PrintLetterBarcodeData uid=".." name=".." .../> and the
+    shorter <QDA n=".." g=".." d=".." a=".." .../> variant
+
+parse_aadhaar_qr returns a dict with name/dob/gender/aadhaar/address (plus
+"format"), or None when the text is not an Aadhaar payload.
+"""
+import re
+import xml.etree.ElementTree as ET
+import zlib
+
+# Field order after the optional "V2" marker (UIDAI secure QR specification)
+SECURE_QR_FIELDS = (
+    "indicator", "reference_id", "name", "dob", "gender", "care_of", "district",
+    "landmark", "house", "location", "pincode", "post_office", "state", "street",
+    "sub_district", "vtc",
+)
+
+# Address parts in printed order
+ADDRESS_ORDER = (
+    "care_of", "house", "street", "landmark", "location", "vtc",
+    "post_office", "sub_district", "district", "state", "pincode",
+)
+
+GENDERS = {"M": "Male", "F": "Female", "T": "Transgender"}
+
+
+def parse_aadhaar_qr(text):
+    text = (text or "").strip()
+    if not text:
+        return None
+    if text.startswith("<"):
+        return parse_xml_qr(text)
+    if text.isdigit() and len(text) > 100:
+        return parse_secure_qr(text)
+    return None
+
+
+def parse_secure_qr(digits):
+    try:
+        payload = decompress(decimal_to_bytes(digits))
+    except (ValueError, zlib.error):
+        return None
+
+    parts = payload.split(b"\xff")
+    offset = 1 if parts and parts[0][:1] == b"V" else 0
+    values = [p.decode("iso-8859-1").strip() for p in parts[offset:offset + len(SECURE_QR_FIELDS)]]
+    if len(values) < len(SECURE_QR_FIELDS):
+        return None
+    raw = dict(zip(SECURE_QR_FIELDS, values))
+    if not raw["name"] or raw["gender"].upper() not in GENDERS:
+        return None
+
+    last4 = raw["reference_id"][:4]
+    return build_fields(
+        name=raw["name"],
+        dob=raw["dob"],
+        gender=raw["gender"],
+        aadhaar=f"XXXX XXXX {last4}" if last4.isdigit() else "",
+        address=join_address(raw),
+        qr_format="secure",
+    )
+
+
+def parse_xml_qr(text):
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError:
+        return None
+    attrs = {k.lower(): (v or "").strip() for k, v in root.attrib.items()}
+
+    if root.tag == "PrintLetterBarcodeData":
+        raw = {
+            "care_of": attrs.get("co", ""), "house": attrs.get("house", ""),
+            "street": attrs.get("street", ""), "landmark": attrs.get("lm", ""),
+            "location": attrs.get("loc", ""), "vtc": attrs.get("vtc", ""),
+            "post_office": attrs.get("po", ""), "sub_district": attrs.get("subdist", ""),
+            "district": attrs.get("dist", ""), "state": attrs.get("state", ""),
+            "pincode": attrs.get("pc", ""),
+        }
+        return build_fields(
+            name=attrs.get("name", ""),
+            dob=attrs.get("dob", "") or attrs.get("yob", ""),
+            gender=attrs.get("gender", ""),
+            aadhaar=attrs.get("uid", ""),
+            address=join_address(raw),
+            qr_format="xml",
+        )
+    if root.tag == "QDA":
+        return build_fields(
+            name=attrs.get("n", ""),
+            dob=attrs.get("d", ""),
+            gender=attrs.get("g", ""),
+            aadhaar=attrs.get("u", ""),
+            address=attrs.get("a", ""),
+            qr_format="xml",
+        )
+    return None
+
+
+def build_fields(name, dob, gender, aadhaar, address, qr_format):
+    if not name:
+        return None
+    digits = re.sub(r"\D", "", aadhaar)
+    if len(digits) == 12:
+        aadhaar = f"{digits[:4]} {digits[4:8]} {digits[8:]}"
+    return {
+        "name": name,
+        "dob": dob.replace("-", "/"),
+        "gender": GENDERS.get(gender.strip().upper()[:1], gender),
+        "aadhaar": aadhaar,
+        "address": address,
+        "format": qr_format,
+    }
+
+
+def join_address(raw):
+    parts = []
+    for key in ADDRESS_ORDER:
+        value = raw.get(key, "").strip(" ,")
+        if value and value not in parts:
+            parts.append(value)
+    return ", ".join(parts)
+
+
+def decimal_to_bytes(digits):
+    """Big-endian bytes of a decimal string; chunked to stay under int()'s max-digits guard."""
+    value = 0
+    for i in range(0, len(digits), 1000):
+        chunk = digits[i:i + 1000]
+        value = value * 10 ** len(chunk) + int(chunk)
+    return value.to_bytes((value.bit_length() + 7) // 8, "big")
+
+
+def decompress(data):
+    """The spec says zlib; issued cards are gzip-wrapped. Try gzip, zlib, then raw deflate."""
+    for wbits in (16 + zlib.MAX_WBITS, zlib.MAX_WBITS, -zlib.MAX_WBITS):
+        try:
+            return zlib.decompress(data, wbits)
+        except zlib.error:
+            continue
+    raise zlib.error("not a gzip/zlib/deflate stream")
@@ -1,13 +1,23 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO
+import json
 import os
+import sys
+import threading
 from datetime import datetime
+from functools import partial
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import time
+from contextlib import contextmanager
+from browser_pool import SessionPool
+from jobs import JobCancelled, JobManager, JobQueueFull
+from login_cache import LoginCache, capture_state, login_origin, login_rejected, prefix_length, restore_state
+from serving import serve
+from step_fusion import count_round_trips, fill_fields, plan
+from wait_engine import WaitTimeout, make_condition, pause, settle, wait_for
+from workflow_batches import (BatchStore, batch_id_for, dataset_format, missing_variables, parse_dataset,
+                              run_batch, summarize)
 
 app = Flask(__name__)
 CORS(app)
@@ -17,51 +27,117 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 SELENIUM_URL = os.environ.get('SELENIUM_URL', 'http://localhost:4444')
 VNC_URL = os.environ.get('VNC_URL', 'http://localhost:7900')
 
-# Global browser state
+# Browser session pool: every workflow run leases its own WebDriver session, so runs
+# don't interleave on one browser. SELENIUM_URLS lists one or more Selenium endpoints
+# (grid hubs or standalone nodes, comma-separated); sessions are spread across them,
+# so throughput grows with the number of nodes. Interactive single steps keep one
+# pooled session across calls until the browser is reset.
+SELENIUM_URLS = [u.strip() for u in os.environ.get('SELENIUM_URLS', SELENIUM_URL).split(',') if u.strip()]
+BROWSER_POOL_MIN_SIZE = int(os.environ.get('BROWSER_POOL_MIN_SIZE', 1))
+BROWSER_POOL_MAX_SIZE = int(os.environ.get('BROWSER_POOL_MAX_SIZE', 4))  # keep <= the nodes' SE_NODE_MAX_SESSIONS
+BROWSER_POOL_MAX_RUNS = int(os.environ.get('BROWSER_POOL_MAX_RUNS', 50))  # recycle a session after this many runs
+BROWSER_POOL_LEASE_TIMEOUT = int(os.environ.get('BROWSER_POOL_LEASE_TIMEOUT', 30))  # seconds to wait for a free session
+# Sessions kept out of reach of workflow runs and batch rows (the interactive one).
+# Runs and rows together hold at most WORKFLOW_SESSIONS leases; beyond that they
+# wait for a slot (cancellably) rather than time out on the pool.
+BROWSER_POOL_RESERVED = int(os.environ.get('BROWSER_POOL_RESERVED', 1))
+WORKFLOW_SESSIONS = max(1, BROWSER_POOL_MAX_SIZE - BROWSER_POOL_RESERVED)
+
+# Workflow runs are queued jobs: POST /api/workflow-runs returns a job id at once,
+# WORKFLOW_WORKERS runs execute concurrently (one pooled session each) and at most
+# WORKFLOW_MAX_QUEUED wait. Cancelling takes effect between steps and aborts waits.
+WORKFLOW_WORKERS = int(os.environ.get('WORKFLOW_WORKERS', WORKFLOW_SESSIONS))
+WORKFLOW_MAX_QUEUED = int(os.environ.get('WORKFLOW_MAX_QUEUED', 32))
+WORKFLOW_RETENTION_SECONDS = int(os.environ.get('WORKFLOW_RETENTION_SECONDS', 3600))
+# POST /api/execute-workflow waits at most this long, then answers 202 with the job id
+WORKFLOW_SYNC_WAIT_SECONDS = float(os.environ.get('WORKFLOW_SYNC_WAIT_SECONDS', 60))
+
+# Waits: steps wait on page conditions (see wait_engine.py) instead of fixed sleeps.
+# Elements get ELEMENT_TIMEOUT seconds to become clickable/visible. After an action
+# the step waits for WAIT_AFTER_DEFAULTS[type] (per step: config.wait_after, one of
+# settle, url_change, dom_quiet, network_idle, ready, sleep, none) for at most
+# SETTLE_TIMEOUT seconds, then carries on. "Quiet" means no DOM change / request
+# for SETTLE_QUIET_MS. A click's default settle gets CLICK_SETTLE_TIMEOUT instead, the
+# old fixed pause: on a page that never goes quiet (polling, animations) every click
+# would otherwise sit out SETTLE_TIMEOUT, and the next step's element wait already
+# covers a slower page. Wait steps wait for config.until (default settle) for at most
+# their duration in seconds.
+ELEMENT_TIMEOUT = float(os.environ.get('AUTOMATION_ELEMENT_TIMEOUT', 10))
+SETTLE_TIMEOUT = float(os.environ.get('AUTOMATION_SETTLE_TIMEOUT', 5))
+CLICK_SETTLE_TIMEOUT = float(os.environ.get('AUTOMATION_CLICK_SETTLE_TIMEOUT', 0.5))
+SETTLE_QUIET_MS = int(os.environ.get('AUTOMATION_SETTLE_QUIET_MS', 150))
+WAIT_AFTER_DEFAULTS = {'navigate': 'settle', 'click': 'settle', 'type': 'none'}
+WAIT_STEP_DEFAULT_UNTIL = os.environ.get('AUTOMATION_WAIT_STEP_UNTIL', 'settle')
+WAIT_STEP_DEFAULT = 5  # seconds, when a wait step has no duration
+WAIT_STEP_MS_THRESHOLD = 100  # larger durations are legacy milliseconds
+
+# Step fusion: consecutive type steps of a workflow run are filled with one
+# execute_script round trip (see step_fusion.py), falling back to step-by-step
+# execution from the first field that could not be filled. A step opts out with
+# config.fuse = false.
+FUSE_STEPS = os.environ.get('AUTOMATION_FUSE_STEPS', '1') == '1'
+
+# Cached logins: a workflow's steps up to the one with config.ends_login are its
+# login prefix. After it succeeds, the session's cookies and storage are kept in
+# memory for LOGIN_CACHE_TTL seconds (per origin and credentials); later runs
+# restore them and skip the prefix, or run it again when the site rejects the
+# restored session. 0 turns this off. LOGIN_RESTORE_PATH is the light page of the
+# origin loaded to set cookies on.
+LOGIN_CACHE_TTL = int(os.environ.get('AUTOMATION_LOGIN_CACHE_TTL', 900))
+LOGIN_RESTORE_PATH = os.environ.get('AUTOMATION_LOGIN_RESTORE_PATH', '/favicon.ico')
+
+# Batches: POST /api/workflow-batches runs one workflow with {{variable}} placeholders
+# once per row of a CSV/JSONL dataset, BATCH_PARALLELISM rows at a time (one pooled
+# session each, sharing the WORKFLOW_SESSIONS slots with workflow runs). Finished rows are checkpointed under BATCH_DIR, so a crashed or
+# cancelled batch resumes with the rows it had not finished. One batch runs at a time.
+BATCH_DIR = os.environ.get('AUTOMATION_BATCH_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batches'))
+BATCH_PARALLELISM = int(os.environ.get('AUTOMATION_BATCH_PARALLELISM', WORKFLOW_SESSIONS))
+BATCH_MAX_ROWS = int(os.environ.get('AUTOMATION_BATCH_MAX_ROWS', 10000))
+
+# Production serving (python app_selenium_live.py --production). Always one worker
+# process: the session pool and the Socket.IO clients live in its memory.
+# Only step/workflow execution counts against the in-flight cap (by default one per
+# pooled session); over the cap the API answers 429 instead of queueing.
+SERVE_HOST = os.environ.get('AUTOMATION_SERVE_HOST', '0.0.0.0')
+SERVE_PORT = int(os.environ.get('AUTOMATION_SERVE_PORT', 5000))
+SERVE_MAX_IN_FLIGHT = int(os.environ.get('AUTOMATION_SERVE_MAX_IN_FLIGHT', BROWSER_POOL_MAX_SIZE))
+SERVE_GRACEFUL_TIMEOUT = int(os.environ.get('AUTOMATION_SERVE_GRACEFUL_TIMEOUT', 120))
+
+# Global browser state (of the interactive session, and the latest workflow step)
 driver = None
+interactive_session = None
+interactive_checked_at = 0
 browser_state = {
     'url': '',
     'title': '',
     'is_running': False
 }
 
-def get_driver():
-    """Get or create Selenium WebDriver with retry logic"""
-    global driver
-    
-    # Check if existing driver is still alive
-    if driver is not None:
-        try:
-            driver.current_url  # Test if driver is still responsive
-            print("✓ Reusing existing browser session")
-            return driver
-        except Exception as e:
-            print(f"⚠ Existing driver is dead: {e}")
-            driver = None
-    
-    # Create new driver with retry logic
+def create_driver(selenium_url):
+    """Create a Selenium WebDriver session on one endpoint, with retry logic"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            print(f"🔄 Connecting to Selenium (attempt {attempt + 1}/{max_retries})...")
+            print(f"🔄 Connecting to Selenium at {selenium_url} (attempt {attempt + 1}/{max_retries})...")
             options = webdriver.ChromeOptions()
             options.add_argument('--no-sandbox')
             options.add_argument('--disable-dev-shm-usage')
             options.add_argument('--disable-gpu')
+            # no implicit wait: element waits are wait_engine's (ELEMENT_TIMEOUT, polled and cancellable)
             options.set_capability('timeouts', {
-                'implicit': 30000,
+                'implicit': 0,
                 'pageLoad': 60000,
                 'script': 30000
             })
             
-            driver = webdriver.Remote(
-                command_executor=SELENIUM_URL,
+            new_driver = webdriver.Remote(
+                command_executor=selenium_url,
                 options=options
             )
             print("✅ Browser session created successfully")
-            return driver
+            return count_round_trips(new_driver)
             
         except Exception as e:
             print(f"❌ Connection attempt {attempt + 1} failed: {e}")
@@ -71,9 +147,96 @@ def get_driver():
             else:
                 print("❌ All connection attempts failed")
                 raise Exception(f"Failed to connect to Selenium after {max_retries} attempts: {e}")
+
+browser_pool = SessionPool(
+    create_driver,
+    SELENIUM_URLS,
+    min_size=BROWSER_POOL_MIN_SIZE,
+    max_size=BROWSER_POOL_MAX_SIZE,
+    max_runs=BROWSER_POOL_MAX_RUNS,
+    lease_timeout=BROWSER_POOL_LEASE_TIMEOUT,
+)
+
+login_cache = LoginCache(ttl=LOGIN_CACHE_TTL)
+workflow_slots = threading.BoundedSemaphore(WORKFLOW_SESSIONS)
+
+@contextmanager
+def workflow_slot(progress):
+    """Hold one of the WORKFLOW_SESSIONS slots; raises JobCancelled if cancelled while waiting"""
+    while not workflow_slots.acquire(timeout=0.25):
+        progress.check()
+    try:
+        yield
+    finally:
+        workflow_slots.release()
+
+def emit_workflow_event(job_id, event):
+    """Stream every workflow job event to Socket.IO clients as workflow_progress"""
+    socketio.emit('workflow_progress', {
+        'job_id': job_id,
+        **event,
+        'timestamp': datetime.now().isoformat()
+    })
+
+workflow_jobs = JobManager(
+    workers=WORKFLOW_WORKERS,
+    max_queued=WORKFLOW_MAX_QUEUED,
+    retention_seconds=WORKFLOW_RETENTION_SECONDS,
+    thread_name_prefix='workflow',
+    listener=emit_workflow_event,
+)
+
+def emit_batch_event(job_id, event):
+    """Stream batch job events (rows started/finished) to Socket.IO clients as batch_progress"""
+    socketio.emit('batch_progress', {
+        'job_id': job_id,
+        'batch_id': batch_job_ids.get(job_id),
+        **event,
+        'timestamp': datetime.now().isoformat()
+    })
+
+batch_store = BatchStore(BATCH_DIR)
+batch_runs = {}  # batch_id -> job_id of its latest run
+batch_job_ids = {}  # job_id -> batch_id
+batch_jobs = JobManager(
+    workers=1,
+    max_queued=8,
+    retention_seconds=WORKFLOW_RETENTION_SECONDS,
+    thread_name_prefix='batch',
+    listener=emit_batch_event,
+)
+
+def get_driver():
+    """Browser for interactive steps: a pooled session held across calls until reset"""
+    global driver, interactive_session, interactive_checked_at
     
+    # Check if existing driver is still alive (only after it sat idle: a lost
+    # session also shows up as a step error, which discards it)
+    if interactive_session is not None:
+        if time.time() - interactive_checked_at < browser_pool.health_check_after:
+            interactive_checked_at = time.time()
+            return driver
+        try:
+            driver.current_url  # Test if driver is still responsive
+            print("✓ Reusing existing browser session")
+            interactive_checked_at = time.time()
+            return driver
+        except Exception as e:
+            print(f"⚠ Existing driver is dead: {e}")
+            release_interactive_session(discard=True)
+    
+    interactive_session = browser_pool.acquire()
+    driver = interactive_session.driver
+    interactive_checked_at = time.time()
     return driver
 
+def release_interactive_session(discard=False):
+    """Hand the interactive session back to the pool (closed when discard)"""
+    global driver, interactive_session
+    session, interactive_session, driver = interactive_session, None, None
+    if session is not None:
+        browser_pool.release(session, discard=discard)
+
 @app.route('/api/execute-step', methods=['POST'])
 def execute_step():
     try:
@@ -103,8 +266,146 @@ def execute_step():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def run_step_group(kind, group, browser, cancelled):
+    """Yield (step, result) for a planned group; a batch is one fused fill, finished step by step if it stops early"""
+    done = 0
+    if kind == 'batch':
+        try:
+            done, error = fill_fields(browser, group)
+        except Exception as e:
+            error = str(e)
+        for step in group[:done]:
+            yield step, {'success': True, 'message': f"Typed text into: {step['config']['xpath']}", 'fused': len(group)}
+        if done < len(group):
+            print(f"↩️  Fused fill stopped at field {done + 1}/{len(group)} ({error}), continuing step by step")
+    for step in group[done:]:
+        if cancelled is not None and cancelled.is_set():
+            raise JobCancelled()
+        yield step, execute_step_with_selenium(step, browser, cancelled)
+
+def navigate_url(step):
+    url = step.get('config', {}).get('url', '')
+    return url if url.startswith('http') else 'https://' + url
+
+def restore_login(browser, prefix, following, cancelled):
+    """
+    Restore the cached login of a prefix instead of running it. Returns (step, result)
+    pairs standing in for the prefix (and for the next step, when it is the navigate
+    the restore opened), or None when nothing is cached or the site rejected it.
+    """
+    key = login_cache.key(prefix)
+    state = login_cache.get(key)
+    if state is None:
+        return None
+    next_step = following[0] if following and following[0].get('type') == 'navigate' else None
+    target = navigate_url(next_step) if next_step else state['url']
+    try:
+        restore_state(browser, state, login_origin(prefix), target, LOGIN_RESTORE_PATH)
+        settle(browser, SETTLE_TIMEOUT, SETTLE_QUIET_MS, cancelled)  # let a rejecting site redirect
+        rejected = login_rejected(browser, prefix, target)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        print(f"⚠️  Restoring the cached login failed: {e}")
+        rejected = True
+    if rejected:
+        print(f"🔐 Cached login for {login_origin(prefix)} was not accepted, logging in again")
+        login_cache.reject(key)
+        browser.delete_all_cookies()
+        try:
+            browser.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass
+        return None
+    print(f"🔐 Restored cached login for {login_origin(prefix)}, skipping {len(prefix)} step(s)")
+    restored = [(step, {'success': True, 'message': 'Skipped: restored cached login', 'skipped': True})
+                for step in prefix]
+    if next_step is not None:
+        restored.append((next_step, {'success': True, 'url': target, 'title': browser.title, 'restored_login': True}))
+    return restored
+
+def run_workflow(steps, progress):
+    """Job body: run the steps on a leased session, stopping between steps once cancelled"""
+    results = []
+    progress.check()
+    # each run gets its own pooled session, reset (or recycled) when it is returned
+    with workflow_slot(progress), browser_pool.lease() as session:
+        progress('session', session_id=session.id)
+        browser = session.driver
+        round_trips_before = getattr(browser, 'round_trips', 0)
+        cancelled = False
+        login_steps = prefix_length(steps) if LOGIN_CACHE_TTL > 0 else 0
+        login = None
+        
+        def record(step, result):
+            results.append({
+                'step_id': step.get('id'),
+                'result': result,
+                'timestamp': datetime.now().isoformat()
+            })
+            progress('step', step=step, result=result, session_id=session.id,
+                     completed=len(results), total=len(steps))
+        
+        try:
+            restored = None
+            if login_steps:
+                restored = restore_login(browser, steps[:login_steps], steps[login_steps:], progress.cancelled)
+                login = 'restored' if restored else 'login'
+                progress('login', login=login)
+            for step, result in restored or []:
+                record(step, result)
+            for kind, group in plan(steps[len(results):], FUSE_STEPS):
+                progress.check()
+                for step, result in run_step_group(kind, group, browser, progress.cancelled):
+                    record(step, result)
+                    if login == 'login' and len(results) == login_steps:
+                        if all(r['result'].get('success') for r in results):
+                            login_cache.put(login_cache.key(steps[:login_steps]), capture_state(browser))
+                            login = 'cached'
+        except JobCancelled:
+            cancelled = True  # the session itself is fine; it goes back to the pool
+        summary = {
+            'results': results,
+            'session_id': session.id,
+            'round_trips': getattr(browser, 'round_trips', 0) - round_trips_before,
+            'fused_steps': sum(1 for r in results if r['result'].get('fused')),
+            'login': login,
+        }
+    if cancelled:
+        print(f"⏹️  Workflow run {progress.job_id} cancelled after {len(results)}/{len(steps)} steps")
+        raise JobCancelled(result=summary)
+    print(f"📊 Workflow run {progress.job_id}: {len(results)} steps, {summary['round_trips']} WebDriver round trips "
+          f"({summary['fused_steps']} steps fused)")
+    return summary
+
+def submit_workflow(steps):
+    return workflow_jobs.submit('workflow', partial(run_workflow, steps))
+
+def queue_full_response(e):
+    response = jsonify({
+        'success': False,
+        'error': str(e),
+        'retry_after': e.retry_after,
+        'timestamp': datetime.now().isoformat()
+    })
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+def workflow_run_accepted(job_id, state='queued'):
+    return jsonify({
+        'job_id': job_id,
+        'state': state,
+        'status_url': f'/api/workflow-runs/{job_id}',
+        'cancel_url': f'/api/workflow-runs/{job_id}/cancel',
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/execute-workflow', methods=['POST'])
 def execute_workflow():
+    """
+    Run a workflow and answer when it is done (a queued run, waited on; see /api/workflow-runs).
+    A run still going after WORKFLOW_SYNC_WAIT_SECONDS is answered with 202 and its job id.
+    """
     try:
         workflow_data = request.get_json()
         steps = workflow_data.get('steps', [])
@@ -112,30 +413,29 @@ def execute_workflow():
         if not steps:
             return jsonify({'error': 'No steps provided'}), 400
         
-        results = []
-        
-        for step in steps:
-            result = execute_step_with_selenium(step)
-            results.append({
-                'step_id': step.get('id'),
-                'result': result,
-                'timestamp': datetime.now().isoformat()
-            })
-            
-            socketio.emit('workflow_progress', {
-                'step': step,
-                'result': result,
-                'completed': len(results),
-                'total': len(steps),
-                'timestamp': datetime.now().isoformat()
-            })
+        job_id = submit_workflow(steps)
+        status = workflow_jobs.wait(job_id, timeout=WORKFLOW_SYNC_WAIT_SECONDS)
+        if status['state'] in ('queued', 'running'):
+            return workflow_run_accepted(job_id, status['state']), 202
+        if status['state'] == 'failed':
+            raise Exception(status['error'])
+        result = status.get('result') or {}
         
         return jsonify({
-            'success': True,
-            'results': results,
+            'success': status['state'] == 'done',
+            'job_id': job_id,
+            'state': status['state'],
+            'results': result.get('results', []),
+            'session_id': result.get('session_id'),
+            'round_trips': result.get('round_trips'),
+            'fused_steps': result.get('fused_steps'),
+            'login': result.get('login'),
             'timestamp': datetime.now().isoformat()
         })
         
+    except JobQueueFull as e:
+        return queue_full_response(e), 429
+        
     except Exception as e:
         return jsonify({
             'success': False,
@@ -143,6 +443,208 @@ def execute_workflow():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/workflow-runs', methods=['POST'])
+def create_workflow_run():
+    """Queue a workflow run; progress streams as workflow_progress events"""
+    workflow_data = request.get_json(silent=True) or {}
+    steps = workflow_data.get('steps', [])
+    if not steps:
+        return jsonify({'error': 'No steps provided'}), 400
+    try:
+        job_id = submit_workflow(steps)
+    except JobQueueFull as e:
+        return queue_full_response(e), 429
+    return workflow_run_accepted(job_id), 202
+
+@app.route('/api/workflow-runs', methods=['GET'])
+def list_workflow_runs():
+    """Queued and running workflow runs"""
+    return jsonify({
+        **workflow_jobs.snapshot(),
+        'active': workflow_jobs.active('workflow'),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/workflow-runs/<job_id>', methods=['GET'])
+def get_workflow_run(job_id):
+    status = workflow_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired workflow run'}), 404
+    return jsonify(status)
+
+@app.route('/api/workflow-runs/<job_id>/cancel', methods=['POST'])
+def cancel_workflow_run(job_id):
+    state = workflow_jobs.cancel(job_id)
+    if state is None:
+        return jsonify({'error': 'Unknown or expired workflow run'}), 404
+    return jsonify({'job_id': job_id, 'state': state, 'timestamp': datetime.now().isoformat()})
+
+def read_batch_request():
+    """(steps, rows, batch_id, options) from JSON {steps, dataset, format} / {steps, rows}, or a multipart upload"""
+    upload = request.files.get('dataset')
+    if upload is not None:
+        data = request.form
+        steps = json.loads(data.get('steps') or '[]')
+        text = upload.read().decode('utf-8-sig')
+        rows = parse_dataset(text, data.get('format') or dataset_format(upload.filename, upload.mimetype))
+    else:
+        data = request.get_json(silent=True) or {}
+        steps = data.get('steps') or []
+        if isinstance(data.get('rows'), list):
+            rows = data['rows']
+        else:
+            rows = parse_dataset(data.get('dataset') or '', data.get('format') or 'csv')
+    wait = str(data.get('wait', '')).lower() in ('1', 'true')
+    return steps, rows, data.get('batch_id') or batch_id_for(steps, rows), wait
+
+def start_batch(batch_id):
+    """Queue a run of a stored batch (its unfinished rows); returns the job id"""
+    job_id = batch_jobs.submit('batch', partial(run_batch, batch_store, batch_id, run_workflow,
+                                                parallelism=BATCH_PARALLELISM))
+    batch_runs[batch_id] = job_id
+    batch_job_ids[job_id] = batch_id
+    return job_id
+
+def batch_status(batch_id, include_rows=True):
+    """A batch's state, aggregate counts and throughput, and (optionally) its per-row results"""
+    batch = batch_store.load(batch_id)
+    if batch is None:
+        return None
+    results = batch_store.results(batch_id)
+    job = batch_jobs.status(batch_runs[batch_id]) if batch_id in batch_runs else None
+    summary = summarize(len(batch['rows']), results)
+    if job is not None and job['state'] in ('queued', 'running'):
+        state = job['state']
+    else:
+        # rows that failed, or never ran because the process crashed or the batch was
+        # cancelled, run again on resume
+        if summary['pending'] == 0:
+            state = 'complete'
+        elif summary['finished'] == summary['rows'] and not summary['states'].get('cancelled'):
+            state = 'finished_with_errors'
+        else:
+            state = 'interrupted'
+    if job is not None and isinstance(job.get('result'), dict):
+        summary.update({k: job['result'][k] for k in ('elapsed_seconds', 'rows_run', 'rows_per_minute')
+                        if k in job['result']})
+    body = {
+        'batch_id': batch_id,
+        'state': state,
+        'job_id': job['id'] if job else None,
+        'created_at': batch['created_at'],
+        **summary,
+    }
+    if include_rows:
+        body['results'] = [results[index] for index in sorted(results)]
+    return body
+
+def batch_active(batch_id):
+    return batch_id in batch_runs and batch_runs[batch_id] in batch_jobs.active('batch')
+
+@app.route('/api/workflow-batches', methods=['POST'])
+def create_workflow_batch():
+    """
+    Run a parameterized workflow once per dataset row. Posting the same workflow and
+    dataset again (or the same batch_id) resumes the batch instead of starting over.
+    With wait=true the response comes when the batch is finished.
+    """
+    try:
+        steps, rows, batch_id, wait = read_batch_request()
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Could not read the batch: {e}'}), 400
+    if not steps:
+        return jsonify({'error': 'No steps provided'}), 400
+    if not rows:
+        return jsonify({'error': 'The dataset has no rows'}), 400
+    if len(rows) > BATCH_MAX_ROWS:
+        return jsonify({'error': f'The dataset has {len(rows)} rows, at most {BATCH_MAX_ROWS} are allowed'}), 400
+    problems = missing_variables(steps, rows)
+    if problems:
+        return jsonify({
+            'error': 'Some rows do not fill every {{variable}} of the workflow',
+            'rows': [{'row': number, 'missing': missing} for number, missing in problems]
+        }), 400
+    try:
+        created = batch_store.create(batch_id, steps, rows)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not created:
+        stored = batch_store.load(batch_id)
+        if stored is None or stored['steps'] != steps or stored['rows'] != rows:
+            return jsonify({'error': f'Batch {batch_id} exists with a different workflow or dataset'}), 409
+    if batch_active(batch_id):
+        return jsonify({'error': f'Batch {batch_id} is already running', 'job_id': batch_runs[batch_id]}), 409
+    try:
+        job_id = start_batch(batch_id)
+    except JobQueueFull as e:
+        return queue_full_response(e), 429
+    if wait:
+        batch_jobs.wait(job_id)
+        return jsonify({**batch_status(batch_id), 'timestamp': datetime.now().isoformat()})
+    return jsonify({
+        'batch_id': batch_id,
+        'job_id': job_id,
+        'resumed': not created,
+        'rows': len(rows),
+        'status_url': f'/api/workflow-batches/{batch_id}',
+        'cancel_url': f'/api/workflow-batches/{batch_id}/cancel',
+        'timestamp': datetime.now().isoformat()
+    }), 202
+
+@app.route('/api/workflow-batches', methods=['GET'])
+def list_workflow_batches():
+    return jsonify({
+        'batches': [batch_status(batch_id, include_rows=False) for batch_id in batch_store.batch_ids()],
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/workflow-batches/<batch_id>', methods=['GET'])
+def get_workflow_batch(batch_id):
+    try:
+        status = batch_status(batch_id, include_rows=request.args.get('rows', '1') != '0')
+    except ValueError:
+        status = None
+    if status is None:
+        return jsonify({'error': 'Unknown workflow batch'}), 404
+    return jsonify({**status, 'timestamp': datetime.now().isoformat()})
+
+@app.route('/api/workflow-batches/<batch_id>/resume', methods=['POST'])
+def resume_workflow_batch(batch_id):
+    """Run the rows of a batch that have not finished (after a crash, cancel or failed rows)"""
+    try:
+        exists = batch_store.load(batch_id) is not None
+    except ValueError:
+        exists = False
+    if not exists:
+        return jsonify({'error': 'Unknown workflow batch'}), 404
+    if batch_active(batch_id):
+        return jsonify({'error': f'Batch {batch_id} is already running', 'job_id': batch_runs[batch_id]}), 409
+    try:
+        job_id = start_batch(batch_id)
+    except JobQueueFull as e:
+        return queue_full_response(e), 429
+    return jsonify({'batch_id': batch_id, 'job_id': job_id, 'timestamp': datetime.now().isoformat()}), 202
+
+@app.route('/api/workflow-batches/<batch_id>/cancel', methods=['POST'])
+def cancel_workflow_batch(batch_id):
+    """Stop starting rows (running ones are cancelled too); finished rows stay checkpointed"""
+    if batch_id not in batch_runs:
+        return jsonify({'error': 'Unknown or inactive workflow batch'}), 404
+    state = batch_jobs.cancel(batch_runs[batch_id])
+    return jsonify({'batch_id': batch_id, 'state': state, 'timestamp': datetime.now().isoformat()})
+
+@app.route('/api/workflow-batches/<batch_id>', methods=['DELETE'])
+def delete_workflow_batch(batch_id):
+    """Delete a batch's checkpoint files (its dataset included)"""
+    if batch_active(batch_id):
+        return jsonify({'error': f'Batch {batch_id} is running; cancel it first'}), 409
+    try:
+        batch_store.delete(batch_id)
+    except ValueError:
+        return jsonify({'error': 'Unknown workflow batch'}), 404
+    batch_runs.pop(batch_id, None)
+    return jsonify({'success': True, 'timestamp': datetime.now().isoformat()})
+
 @app.route('/api/browser', methods=['POST'])
 def browser_control():
     try:
@@ -175,15 +677,16 @@ def browser_control():
 def health_check():
     global driver
     
-    # Test Selenium connection
-    selenium_connected = False
-    try:
-        import requests
-        response = requests.get(f"{SELENIUM_URL}/status", timeout=3)
-        if response.status_code == 200:
-            selenium_connected = True
-    except:
-        selenium_connected = False
+    # Test Selenium connection (every endpoint of the pool)
+    import requests
+    endpoints = {}
+    for selenium_url in SELENIUM_URLS:
+        try:
+            response = requests.get(f"{selenium_url}/status", timeout=3)
+            endpoints[selenium_url] = response.status_code == 200
+        except:
+            endpoints[selenium_url] = False
+    selenium_connected = any(endpoints.values())
     
     # Test if driver is alive
     driver_alive = False
@@ -197,6 +700,7 @@ def health_check():
     return jsonify({
         'status': 'healthy' if selenium_connected else 'degraded',
         'selenium_url': SELENIUM_URL,
+        'selenium_endpoints': endpoints,
         'vnc_url': VNC_URL,
         'selenium_connected': selenium_connected,
         'browser_active': driver is not None,
@@ -204,6 +708,29 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/browser-pool', methods=['GET'])
+def get_browser_pool():
+    """Pooled browser sessions: idle/leased sessions and lease counters"""
+    return jsonify({
+        **browser_pool.snapshot(),
+        'workflow_sessions': WORKFLOW_SESSIONS,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/login-cache', methods=['GET'])
+def get_login_cache():
+    """Cached login sessions: origins and ages (no cookie values), hit/miss counters"""
+    return jsonify({
+        **login_cache.snapshot(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/login-cache', methods=['DELETE'])
+def clear_login_cache():
+    """Forget every cached login, so the next runs log in again"""
+    login_cache.clear()
+    return jsonify({'success': True, 'timestamp': datetime.now().isoformat()})
+
 @app.route('/api/browser-stream-info', methods=['GET'])
 def get_browser_stream_info():
     """Get live browser stream information"""
@@ -234,24 +761,52 @@ def get_browser_state():
         'timestamp': datetime.now().isoformat()
     })
 
-def execute_step_with_selenium(step):
-    """Execute a single step using Selenium"""
-    global browser_state, driver
+def wait_step_seconds(config):
+    """
+    A wait step's duration in seconds. The editor asks for seconds, but older
+    workflows stored milliseconds (e.g. 1000): values above WAIT_STEP_MS_THRESHOLD
+    are read as milliseconds. Missing or invalid durations fall back to WAIT_STEP_DEFAULT.
+    """
+    try:
+        duration = float(config.get('duration') or WAIT_STEP_DEFAULT)
+    except (TypeError, ValueError):
+        duration = WAIT_STEP_DEFAULT
+    if duration > WAIT_STEP_MS_THRESHOLD:
+        duration /= 1000.0
+    return max(0.0, duration)
+
+def settle_after(browser, step_type, config, cancelled, from_url=None):
+    """The step's post-action wait (config.wait_after, else the step type's default); never fails the step"""
+    condition = config.get('wait_after') or WAIT_AFTER_DEFAULTS.get(step_type, 'none')
+    if condition == 'sleep':  # the old fixed pause, on request
+        pause(float(config.get('wait_after_seconds', 0.5)), cancelled)
+        return {'wait': 'sleep', 'met': True, 'waited_ms': float(config.get('wait_after_seconds', 0.5)) * 1000}
+    capped = step_type == 'click' and not config.get('wait_after')  # the default, not an asked-for settle
+    default_timeout = CLICK_SETTLE_TIMEOUT if capped else SETTLE_TIMEOUT
+    return settle(browser, float(config.get('wait_timeout', default_timeout)), SETTLE_QUIET_MS,
+                  cancelled, from_url=from_url, condition=condition)
+
+def execute_step_with_selenium(step, browser=None, cancelled=None):
+    """
+    Execute a single step using Selenium (on the interactive session unless a browser
+    is given). Once the cancelled event is set, waits stop and JobCancelled is raised.
+    """
+    global browser_state
     
     try:
         step_type = step.get('type')
         config = step.get('config', {})
         
-        browser = get_driver()
+        if browser is None:
+            browser = get_driver()
         browser_state['is_running'] = True
         
         if step_type == 'navigate':
-            url = config.get('url', '')
-            if not url.startswith('http'):
-                url = 'https://' + url
+            url = navigate_url(step)
             
             print(f"🌐 Navigating to: {url}")
             browser.get(url)
+            waited = settle_after(browser, step_type, config, cancelled)
             browser_state['url'] = url
             browser_state['title'] = browser.title
             print(f"✅ Navigation successful: {browser.title}")
@@ -259,46 +814,64 @@ def execute_step_with_selenium(step):
             return {
                 'success': True,
                 'url': url,
-                'title': browser.title
+                'title': browser.title,
+                **waited
             }
         
         elif step_type == 'click':
             xpath = config.get('xpath', '')
             print(f"🖱️  Attempting to click: {xpath}")
-            element = WebDriverWait(browser, 10).until(
-                EC.element_to_be_clickable((By.XPATH, xpath))
-            )
+            element, _ = wait_for(browser, make_condition('clickable', xpath=xpath),
+                                  float(config.get('timeout', ELEMENT_TIMEOUT)), cancelled, f'{xpath} to be clickable')
+            from_url = browser.current_url if config.get('wait_after') == 'url_change' else None
             element.click()
-            time.sleep(0.5)  # Brief wait for page update
+            waited = settle_after(browser, step_type, config, cancelled, from_url)  # page update, if any
             print(f"✅ Click successful")
             
-            return {'success': True, 'message': f'Clicked element: {xpath}'}
+            return {'success': True, 'message': f'Clicked element: {xpath}', **waited}
         
         elif step_type == 'type':
             xpath = config.get('xpath', '')
             text = config.get('text', '')
             
             print(f"⌨️  Typing into: {xpath}")
-            element = WebDriverWait(browser, 10).until(
-                EC.presence_of_element_located((By.XPATH, xpath))
-            )
+            element, _ = wait_for(browser, make_condition('visible', xpath=xpath),
+                                  float(config.get('timeout', ELEMENT_TIMEOUT)), cancelled, f'{xpath} to be visible')
             element.clear()
             element.send_keys(text)
-            time.sleep(0.5)
+            waited = settle_after(browser, step_type, config, cancelled)
             print(f"✅ Type successful")
             
-            return {'success': True, 'message': f'Typed text into: {xpath}'}
+            return {'success': True, 'message': f'Typed text into: {xpath}', **waited}
         
         elif step_type == 'wait':
-            raw_duration = config.get('duration', 1000)
+            # waits for config.until (default: the page settles), at most duration seconds;
+            # until='sleep' is the old fixed delay
+            duration = wait_step_seconds(config)
+            condition = config.get('until') or WAIT_STEP_DEFAULT_UNTIL
+            if condition == 'sleep':
+                print(f"⏳ Waiting for {duration} seconds...")
+                pause(duration, cancelled)
+                print("✅ Wait complete")
+                return {'success': True, 'message': f'Waited for {duration} seconds', 'wait': 'sleep', 'met': True,
+                        'waited_ms': round(duration * 1000, 1)}
+            
+            print(f"⏳ Waiting up to {duration} seconds for {condition}...")
+            check = make_condition(condition, xpath=config.get('xpath'), text=config.get('text'),
+                                   from_url=browser.current_url, quiet_ms=SETTLE_QUIET_MS)
             try:
-                duration = float(raw_duration)
-            except Exception:
-                duration = 1  # default fallback
-            print(f"⏳ Waiting for {duration} seconds...")
-            time.sleep(duration)
-            print("✅ Wait complete")
-            return {'success': True, 'message': f'Waited for {duration} seconds'}
+                _, waited = wait_for(browser, check, duration, cancelled,
+                                     ' '.join(filter(None, [condition, config.get('xpath') or config.get('text')])))
+            except WaitTimeout as e:
+                if condition != 'settle':
+                    raise
+                # a page that never goes quiet (polling, animations) is not an error
+                print(f"⚠️  {e}, continuing")
+                return {'success': True, 'message': str(e), 'wait': condition, 'met': False,
+                        'waited_ms': round(duration * 1000, 1)}
+            print(f"✅ Wait complete after {waited:.2f}s")
+            return {'success': True, 'message': f'{condition} after {waited:.2f} seconds', 'wait': condition,
+                    'met': True, 'waited_ms': round(waited * 1000, 1)}
         
         elif step_type == 'screenshot':
             print(f"📸 Taking screenshot...")
@@ -314,6 +887,8 @@ def execute_step_with_selenium(step):
             print(f"❌ {error_msg}")
             return {'success': False, 'error': error_msg}
             
+    except JobCancelled:
+        raise
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Step execution failed: {error_msg}")
@@ -322,7 +897,8 @@ def execute_step_with_selenium(step):
         # Check if it's a critical driver error (connection lost)
         if 'invalid session id' in error_msg.lower() or 'Session timed out' in error_msg:
             print("⚠️  Driver session lost, will reconnect on next step")
-            driver = None
+            if browser is not None and browser is driver:
+                release_interactive_session(discard=True)
         
         return {'success': False, 'error': error_msg}
 
@@ -333,14 +909,9 @@ def execute_browser_command(command, data):
     try:
         if command == 'reset':
             print("🔄 Resetting browser...")
-            if driver:
-                try:
-                    driver.quit()
-                    print("✅ Browser session closed")
-                except Exception as e:
-                    print(f"⚠️  Error closing driver: {e}")
-                finally:
-                    driver = None
+            if interactive_session is not None:
+                release_interactive_session(discard=True)
+                print("✅ Browser session closed")
             
             browser_state = {
                 'url': '',
@@ -351,9 +922,12 @@ def execute_browser_command(command, data):
             return {'success': True, 'message': 'Browser reset successfully'}
         
         elif command == 'stop':
+            # cancels one workflow run (data.job_id), or every queued/running one
             print("⏹️  Stopping browser execution...")
+            job_ids = [data['job_id']] if data.get('job_id') else workflow_jobs.active('workflow')
+            cancelled = [job_id for job_id in job_ids if workflow_jobs.cancel(job_id) is not None]
             browser_state['is_running'] = False
-            return {'success': True, 'message': 'Browser stopped'}
+            return {'success': True, 'message': 'Browser stopped', 'cancelled_runs': cancelled}
         
         else:
             return {'success': False, 'error': f'Unknown command: {command}'}
@@ -362,7 +936,39 @@ def execute_browser_command(command, data):
         print(f"❌ Browser command failed: {e}")
         return {'success': False, 'error': str(e)}
 
-if __name__ == '__main__':
+def warm_up():
+    """Open BROWSER_POOL_MIN_SIZE sessions up front so the first workflows don't pay for them"""
+    browser_pool.ensure_min()
+
+def shutdown_browser():
+    """Shutdown hook: let queued workflow runs finish, then close every browser session"""
+    # batches are checkpointed, so they stop at once and resume later
+    for job_id in batch_jobs.active('batch'):
+        batch_jobs.cancel(job_id)
+    batch_jobs.drain(SERVE_GRACEFUL_TIMEOUT)
+    if not workflow_jobs.drain(SERVE_GRACEFUL_TIMEOUT):
+        for job_id in workflow_jobs.active('workflow'):
+            workflow_jobs.cancel(job_id)
+        workflow_jobs.drain(10)
+    release_interactive_session(discard=True)
+    browser_pool.close_all()
+    print("✅ Browser sessions closed")
+
+def admission_exempt(path):
+    """Control, status and Socket.IO traffic must get through while a workflow runs"""
+    return not path.startswith(('/api/execute-step', '/api/execute-workflow'))
+
+if __name__ == '__main__' and '--production' in sys.argv:
+    serve(app, SERVE_HOST, SERVE_PORT,
+          workers=1,
+          max_in_flight=SERVE_MAX_IN_FLIGHT,
+          exempt=admission_exempt,
+          warm_up=warm_up,
+          on_shutdown=shutdown_browser,
+          graceful_timeout=SERVE_GRACEFUL_TIMEOUT,
+          name='Live Browser Backend')
+
+elif __name__ == '__main__':
     print("=" * 60)
     print("Starting Live Browser Backend (Selenium + VNC)")
     print("=" * 60)
@@ -0,0 +1,561 @@
+"""
+OCR backend benchmarks.
+
+Usage (from backend/):
+    python bench_ocr.py ocr-modes [image ...] [--repeat N]
+    python bench_ocr.py detect [--megapixels 1 3 12 24] [--repeat N]
+    python bench_ocr.py roi-scale [--widths 500 1000 1600 2500 3300] [--repeat N]
+    python bench_ocr.py suite [--cases N] [--output report.json] [--baseline old.json]
+    python bench_ocr.py memory [--megapixels 12 24 48]
+
+Without image paths synthetic cards are rendered so the benchmarks can run
+without real ID cards. Output is JSON on stdout (or --output).
+Peak RSS per request is read from /proc/self/status (Linux only; null elsewhere).
+"""
+import argparse
+import difflib
+import gc
+import gzip
+import io
+import json
+import math
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import server
+from ocr_metrics import collect_timings
+
+# ========= Synthetic inputs =========
+
+SAMPLE_FIELDS = {
+    "name": "RAHUL KUMAR SHARMA",
+    "dob": "12/08/1990",
+    "gender": "MALE",
+    "aadhaar": "1234 5678 9012",
+    "address": "S/O RAJESH SHARMA, 221B MG ROAD, INDIRANAGAR, BENGALURU 560038",
+}
+
+def render_card_fields(card, fields):
+    """Draw each field's text inside its ROI_PERCENTS box (black on white)."""
+    for key, text in fields.items():
+        pct = server.ROI_PERCENTS.get(key)
+        if pct is None:
+            continue
+        x, y, w, h = server.get_roi_pixels(card, pct)
+        line_h = max(12, min(h, int(card.shape[0] * 0.045)))
+        scale = line_h / 30.0
+        thickness = max(1, int(round(scale * 2)))
+        words = text.split()
+        line, cursor_y = "", y + line_h
+        for word in words:
+            candidate = f"{line} {word}".strip()
+            (tw, _), _ = cv2.getTextSize(candidate, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+            if tw > w - 8 and line:
+                cv2.putText(card, line, (x + 4, cursor_y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness)
+                line, cursor_y = word, cursor_y + int(line_h * 1.3)
+            else:
+                line = candidate
+        if line and cursor_y <= y + h + line_h:
+            cv2.putText(card, line, (x + 4, cursor_y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness)
+    return card
+
+# Back-side QR sits right of the address block, as on issued cards: (x%, y%, size% of height)
+QR_PLACEMENT = (0.64, 0.24, 0.5)
+
+def secure_qr_text(fields):
+    """Encode fields the way an Aadhaar secure QR does: 0xFF-separated, gzip, as a decimal string."""
+    values = [
+        "V2", "3", f"{fields['aadhaar'].replace(' ', '')[-4:]}20240101120000000", fields["name"],
+        fields["dob"].replace("/", "-"), fields["gender"][:1].upper(), "", "", "", "",
+        "", "", "", "", "", fields["address"], "",
+    ]
+    blob = gzip.compress(b"\xff".join(v.encode("iso-8859-1") for v in values))
+    return str(int.from_bytes(blob, "big"))
+
+def synthetic_card(width=1600, fields=None, qr_text=None):
+    """A flat (already warped) card with fields rendered in their ROIs and an optional QR."""
+    height = int(width * 1550 / 2480)
+    card = np.full((height, width, 3), 255, dtype=np.uint8)
+    card = render_card_fields(card, fields or SAMPLE_FIELDS)
+    if qr_text:
+        code = cv2.QRCodeEncoder.create().encode(qr_text)
+        size = int(height * QR_PLACEMENT[2])
+        code = cv2.resize(code, (size, size), interpolation=cv2.INTER_NEAREST)
+        x, y = int(width * QR_PLACEMENT[0]), int(height * QR_PLACEMENT[1])
+        size = min(size, width - x, height - y)
+        card[y:y + size, x:x + size] = cv2.cvtColor(code[:size, :size], cv2.COLOR_GRAY2BGR)
+    return card
+
+def synthetic_scene(megapixels, skew=0.06, seed=0, card=None, noise=12.0):
+    """
+    A 4:3 photo-like scene with a card (synthetic by default) placed under
+    perspective skew, plus gaussian sensor noise of the given sigma.
+    Returns (scene_bgr, true_corners) with corners ordered tl, tr, br, bl.
+    """
+    rng = np.random.default_rng(seed)
+    W = int(round(math.sqrt(megapixels * 1e6 * 4 / 3)))
+    H = int(round(W * 3 / 4))
+    scene = np.full((H, W, 3), 70, dtype=np.uint8)
+
+    if card is None:
+        card = synthetic_card(width=int(W * 0.6))
+    else:
+        card = cv2.resize(card, (int(W * 0.6), int(W * 0.6 * card.shape[0] / card.shape[1])),
+                          interpolation=cv2.INTER_AREA)
+    ch, cw = card.shape[:2]
+    cx, cy = W / 2.0, H / 2.0
+    jitter = lambda: rng.uniform(-skew, skew) * cw
+    dst = np.array([
+        [cx - cw / 2 + jitter(), cy - ch / 2 + jitter()],
+        [cx + cw / 2 + jitter(), cy - ch / 2 + jitter()],
+        [cx + cw / 2 + jitter(), cy + ch / 2 + jitter()],
+        [cx - cw / 2 + jitter(), cy + ch / 2 + jitter()],
+    ], dtype=np.float32)
+    src = np.array([[0, 0], [cw - 1, 0], [cw - 1, ch - 1], [0, ch - 1]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(src, dst)
+    cv2.warpPerspective(card, M, (W, H), dst=scene, borderMode=cv2.BORDER_TRANSPARENT)
+    if noise:
+        grain = rng.normal(0, noise, size=(H, W, 1)).astype(np.int16)
+        scene = np.clip(scene.astype(np.int16) + grain, 0, 255).astype(np.uint8)
+    return scene, dst
+
+NAMES = ["RAHUL KUMAR SHARMA", "PRIYA NAIR", "ANIL DESHMUKH", "FATIMA SHAIKH", "GURPREET SINGH"]
+PLACES = ["MG ROAD BENGALURU 560038", "FC ROAD PUNE 411004", "PARK STREET KOLKATA 700016",
+          "ANNA SALAI CHENNAI 600002", "CIVIL LINES JAIPUR 302006"]
+
+def synthetic_case(index, megapixels, skew, noise, with_qr, seed=0):
+    """
+    One front/back pair as JPEG bytes plus the expected `extracted` fields.
+    With a QR the back carries a secure QR, so the expected Aadhaar is masked.
+    """
+    rng = np.random.default_rng(seed + index)
+    fields = {
+        "name": NAMES[index % len(NAMES)],
+        "dob": f"{rng.integers(1, 29):02d}/{rng.integers(1, 13):02d}/{rng.integers(1950, 2006)}",
+        "gender": "MALE" if index % 2 == 0 else "FEMALE",
+        "aadhaar": " ".join(f"{rng.integers(0, 10000):04d}" for _ in range(3)),
+        "address": f"H NO {rng.integers(1, 400)}, {PLACES[index % len(PLACES)]}",
+    }
+    front_card = synthetic_card(fields={k: v for k, v in fields.items() if k != "address"})
+    back_card = synthetic_card(fields={"address": fields["address"]},
+                               qr_text=secure_qr_text(fields) if with_qr else None)
+
+    front, _ = synthetic_scene(megapixels, skew=skew, seed=seed + index, card=front_card, noise=noise)
+    back, _ = synthetic_scene(megapixels, skew=skew, seed=seed + index + 1000, card=back_card, noise=noise)
+    expected = dict(fields)
+    if with_qr:
+        expected["aadhaar"] = f"XXXX XXXX {fields['aadhaar'][-4:]}"
+    encode = lambda img: cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+    return encode(front), encode(back), expected
+
+def load_inputs(paths):
+    if not paths:
+        return [("synthetic", synthetic_card())]
+    images = []
+    for path in paths:
+        pages = server.load_images_from_upload(path)
+        if pages:
+            images.append((path, pages[0]))
+    return images
+
+def summarize_ms(samples):
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered) * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(math.ceil(0.95 * len(ordered))) - 1)] * 1000, 1),
+        "min_ms": round(ordered[0] * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+def field_similarity(expected, actual):
+    """1.0 for an exact match after case/whitespace normalisation, else difflib's ratio."""
+    norm = lambda text: " ".join((text or "").upper().split())
+    return round(difflib.SequenceMatcher(None, norm(expected), norm(actual)).ratio(), 3)
+
+# ========= Peak memory =========
+
+def rss_kb(field):
+    """VmRSS / VmHWM from /proc/self/status in KB, or None off Linux."""
+    try:
+        with open("/proc/self/status", "r") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def reset_peak_rss():
+    """Reset the kernel's RSS high-water mark (VmHWM) so the next reading covers one request."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+def measure_rss(func):
+    """Run func(); returns (result, peak RSS MB during the call, peak growth MB over the RSS before it)."""
+    gc.collect()
+    before = rss_kb("VmRSS")
+    scoped = reset_peak_rss()
+    result = func()
+    peak = rss_kb("VmHWM") if scoped and before is not None else None
+    if peak is None:
+        return result, None, None
+    return result, round(peak / 1024, 1), round((peak - before) / 1024, 1)
+
+# ========= Benchmarks =========
+
+def bench_ocr_modes(images, repeat):
+    """Compare per-ROI and single-pass OCR on identical warped cards and ROI sets."""
+    report = []
+    for label, bgr in images:
+        warped, _, _ = server.detect_and_warp_card(bgr)
+        norm = server.normalize_canvas(warped)
+        roi_rects = {k: server.get_roi_pixels(norm, p) for k, p in server.ROI_PERCENTS.items()}
+        roi_sets = {
+            "demographic": {k: r for k, r in roi_rects.items() if k != "address"},
+            "address": {k: r for k, r in roi_rects.items() if k == "address"},
+        }
+        for set_name, rects in roi_sets.items():
+            entry = {"input": label, "roi_set": set_name, "rois": len(rects), "modes": {}}
+            outputs = {}
+            for mode in ("per_roi", "single_pass"):
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    outputs[mode] = server.read_rois(norm, rects, mode=mode)
+                    samples.append(time.perf_counter() - started)
+                entry["modes"][mode] = {**summarize_ms(samples), "text": outputs[mode]}
+            entry["matching_fields"] = sum(
+                1 for k in rects
+                if " ".join(outputs["per_roi"][k].split()) == " ".join(outputs["single_pass"][k].split())
+            )
+            base = entry["modes"]["per_roi"]["p50_ms"]
+            fast = entry["modes"]["single_pass"]["p50_ms"]
+            entry["speedup"] = round(base / fast, 2) if fast else None
+            report.append(entry)
+    return report
+
+def corner_tolerance_px(corners):
+    """How far (px) a detected corner may sit from the reference: 0.5% of the card diagonal, at least 3px."""
+    return max(3.0, 0.005 * float(np.linalg.norm(corners[2] - corners[0])))
+
+def bench_detect(megapixels, repeat):
+    """
+    Card detection latency vs input size, full-resolution contour search vs
+    the capped DETECT_MAX_SIDE copy, plus corner error against the true quad.
+    Debug assets are off; the warp is timed separately since it is full-res either way.
+    """
+    configured = server.DETECT_MAX_SIDE or 1024
+    saved = server.DETECT_MAX_SIDE, server.DEBUG_LEVEL
+    server.DEBUG_LEVEL = "off"
+    report = []
+    try:
+        for mp in megapixels:
+            scene, truth = synthetic_scene(mp)
+            tolerance_px = corner_tolerance_px(truth)
+            entry = {"megapixels": mp, "shape": list(scene.shape[:2]), "tolerance_px": round(tolerance_px, 1)}
+            for label, max_side in (("full_res", 0), ("downscaled", configured)):
+                server.DETECT_MAX_SIDE = max_side
+                detect_samples, total_samples = [], []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    quad = server.find_card_quad(scene, {}, {})
+                    detect_samples.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    _, _, info = server.detect_and_warp_card(scene)
+                    total_samples.append(time.perf_counter() - started)
+                result = {
+                    "detect": summarize_ms(detect_samples),
+                    "detect_and_warp": summarize_ms(total_samples),
+                    "card_found": info["card_found"],
+                }
+                if quad is not None:
+                    error = np.linalg.norm(server.order_points(quad) - truth, axis=1).max()
+                    result["max_corner_error_px"] = round(float(error), 2)
+                    result["within_tolerance"] = bool(error <= tolerance_px)
+                entry[label] = result
+            fast = entry["downscaled"]["detect"]["p50_ms"]
+            entry["detect_speedup"] = round(entry["full_res"]["detect"]["p50_ms"] / fast, 2) if fast else None
+            report.append(entry)
+    finally:
+        server.DETECT_MAX_SIDE, server.DEBUG_LEVEL = saved
+    return report
+
+def bench_roi_scale(widths, repeat, mode):
+    """
+    ROI OCR latency and field accuracy vs warped-card width, with crops passed
+    at native size (target 0) and rescaled to OCR_TARGET_LINE_HEIGHT.
+    A 300-dpi scan of an ID-1 card is ~1000px wide; phone photos range 500-3500px.
+    """
+    configured = server.OCR_TARGET_LINE_HEIGHT or 36
+    saved = server.OCR_TARGET_LINE_HEIGHT
+    report = []
+    try:
+        for width in widths:
+            card = synthetic_card(width=width)
+            rects = {k: server.get_roi_pixels(card, p) for k, p in server.ROI_PERCENTS.items()}
+            line_heights = {}
+            for k, (x, y, w, h) in rects.items():
+                gray = cv2.cvtColor(card[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+                line_heights[k] = server.measure_line_height(gray)
+            entry = {"width": width, "line_height_px": line_heights}
+            for label, target in (("native", 0), ("normalized", configured)):
+                server.OCR_TARGET_LINE_HEIGHT = target
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    texts = server.read_rois(card, rects, mode=mode)
+                    samples.append(time.perf_counter() - started)
+                accuracy = {k: field_similarity(SAMPLE_FIELDS[k], texts.get(k, "")) for k in rects}
+                entry[label] = {
+                    **summarize_ms(samples),
+                    "target_line_height": target,
+                    "accuracy": accuracy,
+                    "mean_accuracy": round(statistics.mean(accuracy.values()), 3),
+                }
+            fast = entry["normalized"]["p50_ms"]
+            entry["speedup"] = round(entry["native"]["p50_ms"] / fast, 2) if fast else None
+            report.append(entry)
+    finally:
+        server.OCR_TARGET_LINE_HEIGHT = saved
+    return report
+
+def bench_suite(cases, megapixels, skew, noise, qr_every, seed):
+    """
+    End-to-end suite over synthetic pairs. Each case is timed three ways:
+    detect_and_warp_card alone, process_page_bgr per side, and the
+    /api/ocr/extract route through Flask's test client. Stage timings are
+    per case (summed over both sides): the server's own collector for
+    process_page_bgr, and the response's timings_ms for the route. Accuracy
+    compares `extracted` with the rendered text. The result cache is
+    disabled for the run.
+    """
+    saved_cache = server.result_cache
+    server.result_cache = None
+    client = server.app.test_client()
+    records = []
+    try:
+        for index in range(cases):
+            mp = megapixels[index % len(megapixels)]
+            with_qr = bool(qr_every) and index % qr_every == 0
+            front, back, expected = synthetic_case(index, mp, skew, noise, with_qr, seed)
+            front_bgr = server.load_images_from_bytes(front, "jpg")[0]
+            back_bgr = server.load_images_from_bytes(back, "jpg")[0]
+
+            started = time.perf_counter()
+            _, _, info = server.detect_and_warp_card(front_bgr)
+            warp_seconds = time.perf_counter() - started
+
+            with collect_timings() as page_timings:
+                for bgr in (front_bgr, back_bgr):
+                    page = server.process_page_bgr(bgr)
+                    server.release_debug_images(page.get("debug_images"))
+            page_stages = page_timings.summary_ms()
+
+            started = time.perf_counter()
+            response, peak_mb, growth_mb = measure_rss(lambda: post_pair(client, front, back))
+            route_seconds = time.perf_counter() - started
+            body = response.get_json() or {}
+            route_stages = body.get("timings_ms", {})
+
+            extracted = body.get("extracted", {})
+            accuracy = {k: field_similarity(v, extracted.get(k, "")) for k, v in expected.items()}
+            records.append({
+                "case": index,
+                "megapixels": mp,
+                "qr": with_qr,
+                "status": response.status_code,
+                "card_found": info["card_found"],
+                "extraction_source": body.get("extraction_source"),
+                "detect_and_warp_ms": round(warp_seconds * 1000, 1),
+                "process_page_ms": page_stages.pop("total"),
+                "process_page_stages_ms": page_stages,
+                "route_ms": round(route_seconds * 1000, 1),
+                "route_stages_ms": {k: v for k, v in route_stages.items() if k != "total"},
+                "route_peak_rss_mb": peak_mb,
+                "route_rss_growth_mb": growth_mb,
+                "accuracy": accuracy,
+            })
+    finally:
+        server.result_cache = saved_cache
+
+    return {"config": suite_config(cases, megapixels, skew, noise, qr_every, seed),
+            "summary": summarize_suite(records), "cases": records}
+
+def post_pair(client, front, back):
+    return client.post("/api/ocr/extract", data={
+        "front": (io.BytesIO(front), "front.jpg"),
+        "back": (io.BytesIO(back), "back.jpg"),
+    }, content_type="multipart/form-data")
+
+def bench_memory(megapixels, seed):
+    """
+    Per-request peak RSS and latency of /api/ocr/extract on large synthetic
+    pairs, decoded at full size (budget 0) and under OCR_MEMORY_BUDGET_BYTES.
+    Growth is the peak over the RSS before the request, i.e. what one request costs.
+    """
+    configured = server.OCR_MEMORY_BUDGET_BYTES or 512 * 1024 * 1024
+    saved = server.OCR_MEMORY_BUDGET_BYTES, server.result_cache
+    server.result_cache = None
+    client = server.app.test_client()
+    report = []
+    try:
+        for index, mp in enumerate(megapixels):
+            front, back, expected = synthetic_case(index, mp, 0.05, 8.0, False, seed)
+            entry = {"megapixels": mp, "upload_kb": (len(front) + len(back)) // 1024}
+            for label, budget in (("unlimited", 0), ("budget", configured)):
+                server.OCR_MEMORY_BUDGET_BYTES = budget
+                started = time.perf_counter()
+                response, peak_mb, growth_mb = measure_rss(lambda: post_pair(client, front, back))
+                body = response.get_json() or {}
+                extracted = body.get("extracted", {})
+                entry[label] = {
+                    "budget_bytes": budget,
+                    "status": response.status_code,
+                    "route_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "peak_rss_mb": peak_mb,
+                    "rss_growth_mb": growth_mb,
+                    "card_found": body.get("front", {}).get("card_found"),
+                    "mean_accuracy": round(statistics.mean(
+                        field_similarity(v, extracted.get(k, "")) for k, v in expected.items()), 3),
+                }
+            report.append(entry)
+    finally:
+        server.OCR_MEMORY_BUDGET_BYTES, server.result_cache = saved
+    return report
+
+def suite_config(cases, megapixels, skew, noise, qr_every, seed):
+    return {
+        "cases": cases, "megapixels": megapixels, "skew": skew, "noise": noise,
+        "qr_every": qr_every, "seed": seed,
+        "ocr_mode": server.OCR_MODE, "ocr_concurrency": server.OCR_CONCURRENCY,
+        "debug_level": server.DEBUG_LEVEL, "qr_fast_path": server.QR_FAST_PATH,
+        "detect_max_side": server.DETECT_MAX_SIDE,
+        "memory_budget_bytes": server.OCR_MEMORY_BUDGET_BYTES,
+        "side_classifier": server.SIDE_CLASSIFIER,
+    }
+
+def summarize_suite(records):
+    """p50/p95 per timing and per stage, p50/max peak RSS, plus mean field accuracy and exact-match rate."""
+    timings = {}
+    for record in records:
+        for key in ("detect_and_warp_ms", "process_page_ms", "route_ms"):
+            timings.setdefault(key[:-3], []).append(record[key] / 1000)
+        for stage, ms in record["route_stages_ms"].items():
+            timings.setdefault(f"route.{stage}", []).append(ms / 1000)
+    memory = {}
+    for key in ("route_peak_rss_mb", "route_rss_growth_mb"):
+        values = sorted(record[key] for record in records if record[key] is not None)
+        if values:
+            memory[key[:-3]] = {"p50_mb": round(statistics.median(values), 1), "max_mb": values[-1]}
+    accuracy = {}
+    for record in records:
+        for field, score in record["accuracy"].items():
+            accuracy.setdefault(field, []).append(score)
+    return {
+        "timings": {name: summarize_ms(values) for name, values in sorted(timings.items())},
+        "memory": memory,
+        "accuracy": {
+            field: {"mean": round(statistics.mean(scores), 3),
+                    "exact": round(sum(1 for s in scores if s == 1.0) / len(scores), 3)}
+            for field, scores in accuracy.items()
+        },
+        "errors": sum(1 for record in records if record["status"] != 200),
+    }
+
+def compare_to_baseline(report, baseline, max_regression, min_delta_ms=5.0, min_delta_mb=16.0):
+    """
+    Timings whose p50 grew, peak RSS growth that rose, or accuracies that dropped,
+    by more than max_regression (a fraction). Timing changes under min_delta_ms
+    and memory changes under min_delta_mb are noise.
+    """
+    regressions = []
+    old_timings = baseline.get("summary", {}).get("timings", {})
+    for name, current in report["summary"]["timings"].items():
+        old = old_timings.get(name)
+        if old and old["p50_ms"] > 0 and current["p50_ms"] > old["p50_ms"] * (1 + max_regression) \
+                and current["p50_ms"] - old["p50_ms"] >= min_delta_ms:
+            regressions.append({"metric": f"timings.{name}.p50_ms", "baseline": old["p50_ms"], "current": current["p50_ms"]})
+    old_memory = baseline.get("summary", {}).get("memory", {})
+    for name, current in report["summary"].get("memory", {}).items():
+        old = old_memory.get(name)
+        if old and old["max_mb"] > 0 and current["max_mb"] > old["max_mb"] * (1 + max_regression) \
+                and current["max_mb"] - old["max_mb"] >= min_delta_mb:
+            regressions.append({"metric": f"memory.{name}.max_mb", "baseline": old["max_mb"], "current": current["max_mb"]})
+    old_accuracy = baseline.get("summary", {}).get("accuracy", {})
+    for field, current in report["summary"]["accuracy"].items():
+        old = old_accuracy.get(field)
+        if old and current["mean"] < old["mean"] * (1 - max_regression):
+            regressions.append({"metric": f"accuracy.{field}.mean", "baseline": old["mean"], "current": current["mean"]})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    modes = sub.add_parser("ocr-modes", help="per-ROI vs single-pass tesseract")
+    modes.add_argument("images", nargs="*", help="card images/PDFs; synthetic card if omitted")
+    modes.add_argument("--repeat", type=int, default=5)
+
+    detect = sub.add_parser("detect", help="card detection latency vs megapixels, full-res vs downscaled")
+    detect.add_argument("--megapixels", type=float, nargs="+", default=[1, 3, 6, 12, 24])
+    detect.add_argument("--repeat", type=int, default=3)
+
+    roi_scale = sub.add_parser("roi-scale", help="ROI OCR latency/accuracy vs card width, native vs rescaled crops")
+    roi_scale.add_argument("--widths", type=int, nargs="+", default=[500, 1000, 1600, 2500, 3300])
+    roi_scale.add_argument("--repeat", type=int, default=3)
+    roi_scale.add_argument("--mode", choices=["per_roi", "single_pass"], default="per_roi")
+
+    suite = sub.add_parser("suite", help="end-to-end stage timings + field accuracy on synthetic pairs")
+    suite.add_argument("--cases", type=int, default=10)
+    suite.add_argument("--megapixels", type=float, nargs="+", default=[2, 12])
+    suite.add_argument("--skew", type=float, default=0.05)
+    suite.add_argument("--noise", type=float, default=8.0)
+    suite.add_argument("--qr-every", type=int, default=2, help="every Nth case gets a secure QR (0 = none)")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--baseline", help="previous suite report; exit 1 on regressions")
+    suite.add_argument("--max-regression", type=float, default=0.2)
+    suite.add_argument("--min-delta-ms", type=float, default=5.0)
+
+    memory = sub.add_parser("memory", help="per-request peak RSS on large inputs, with and without the memory budget")
+    memory.add_argument("--megapixels", type=float, nargs="+", default=[12, 24, 48])
+    memory.add_argument("--seed", type=int, default=0)
+
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+
+    args = parser.parse_args(argv)
+    exit_code = 0
+    if args.bench == "ocr-modes":
+        result = bench_ocr_modes(load_inputs(args.images), max(1, args.repeat))
+    elif args.bench == "detect":
+        result = bench_detect(args.megapixels, max(1, args.repeat))
+    elif args.bench == "roi-scale":
+        result = bench_roi_scale(args.widths, max(1, args.repeat), args.mode)
+    elif args.bench == "suite":
+        result = bench_suite(max(1, args.cases), args.megapixels, args.skew, args.noise, args.qr_every, args.seed)
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as fh:
+                baseline = json.load(fh).get("results", {})
+            result["regressions"] = compare_to_baseline(result, baseline, args.max_regression, args.min_delta_ms)
+            exit_code = 1 if result["regressions"] else 0
+    elif args.bench == "memory":
+        result = bench_memory(args.megapixels, args.seed)
+
+    report = {"benchmark": args.bench, "results": result}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+A pool of remote WebDriver sessions for running workflows concurrently.
+
+  - lease() / acquire() + release(): one session per run, never shared while leased
+  - sessions are spread over several Selenium endpoints (fewest live sessions first),
+    so throughput grows with the number of nodes
+  - min_size sessions are kept warm, max_size caps the total; acquire() waits
+    up to lease_timeout for a free session, then raises PoolExhausted
+  - an idle session is health-checked before it is handed out again, and
+    replaced when it no longer answers
+  - between runs a session is reset (extra windows closed, storage and
+    cookies cleared, about:blank); after max_runs runs it is recycled instead
+
+The reset is best effort: cookies of origins other than the last one visited
+survive until the session is recycled. Use max_runs=1 for full isolation.
+"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolExhausted(Exception):
+    def __init__(self, retry_after):
+        super().__init__("All browser sessions are busy")
+        self.retry_after = retry_after
+
+
+class PooledSession:
+    _ids = itertools.count(1)
+
+    def __init__(self, driver, endpoint):
+        self.id = next(self._ids)
+        self.driver = driver
+        self.endpoint = endpoint
+        self.runs = 0
+        self.created_at = time.time()
+        self.last_used = time.time()
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "runs": self.runs,
+            "age_seconds": round(time.time() - self.created_at, 1),
+        }
+
+
+class SessionPool:
+    def __init__(self, factory, endpoints, min_size=0, max_size=2, max_runs=50,
+                 lease_timeout=30, health_check_after=30):
+        """factory(endpoint) -> a new WebDriver connected to that Selenium endpoint."""
+        self.factory = factory
+        self.endpoints = list(endpoints)
+        self.min_size = min(min_size, max_size)
+        self.max_size = max(1, max_size)
+        self.max_runs = max_runs
+        self.lease_timeout = lease_timeout
+        self.health_check_after = health_check_after
+        self._idle = []        # PooledSession, most recently released last
+        self._leased = {}      # id -> PooledSession
+        self._creating = {}    # endpoint -> sessions being created
+        self._cond = threading.Condition()
+        self.stats = {"created": 0, "recycled": 0, "discarded": 0, "leases": 0, "waits": 0, "exhausted": 0}
+
+    # ----- leasing -----
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Lease a session for one run; it is discarded instead of reused if the run raised."""
+        session = self.acquire(timeout)
+        try:
+            yield session
+        except BaseException:
+            self.release(session, discard=True)
+            raise
+        self.release(session)
+
+    def acquire(self, timeout=None):
+        timeout = self.lease_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            with self._cond:
+                session = self._idle.pop() if self._idle else None
+                endpoint = None
+                if session is not None:
+                    self._leased[session.id] = session  # counted as leased while it is checked
+                else:
+                    if self._total() < self.max_size:
+                        endpoint = self._pick_endpoint()
+                        self._creating[endpoint] = self._creating.get(endpoint, 0) + 1
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats["exhausted"] += 1
+                            raise PoolExhausted(max(1, int(self.lease_timeout / 2)))
+                        if not waited:
+                            self.stats["waits"] += 1
+                            waited = True
+                        self._cond.wait(remaining)
+                        continue
+
+            if session is not None:
+                if self._healthy(session):
+                    with self._cond:
+                        self.stats["leases"] += 1
+                    return session
+                self._retire(session, "discarded")
+                continue
+
+            return self._open(endpoint)
+
+    def release(self, session, discard=False):
+        """Return a leased session: reset for the next run, or closed when broken or worn out."""
+        # the session stays counted as leased until it is reset or quit, so a
+        # replacement is never opened while the node still holds its slot
+        with self._cond:
+            if session.id not in self._leased:
+                return
+            session.runs += 1
+            session.last_used = time.time()
+        if discard:
+            self._retire(session, "discarded")
+        elif self.max_runs and session.runs >= self.max_runs:
+            self._retire(session, "recycled")
+        elif not self._reset(session):
+            self._retire(session, "discarded")
+        else:
+            with self._cond:
+                self._leased.pop(session.id, None)
+                self._idle.append(session)
+                self._cond.notify_all()
+
+    # ----- sizing -----
+
+    def ensure_min(self):
+        """Open sessions until min_size exist (warm-up); failures are reported, not raised."""
+        while True:
+            with self._cond:
+                if self._total() >= self.min_size:
+                    return
+                endpoint = self._pick_endpoint()
+                self._creating[endpoint] = self._creating.get(endpoint, 0) + 1
+            try:
+                self._open(endpoint, idle=True)
+            except Exception as e:
+                print(f"⚠️  Could not open a warm browser session on {endpoint}: {e}")
+                return
+
+    def _replenish_async(self):
+        with self._cond:
+            if self._total() >= self.min_size:
+                return
+        threading.Thread(target=self.ensure_min, name="browser-pool-fill", daemon=True).start()
+
+    def close_all(self):
+        """Quit every idle session; leased ones are closed when released."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self.min_size = 0
+        for session in idle:
+            self._quit(session)
+        with self._cond:
+            self.stats["discarded"] += len(idle)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "max_runs": self.max_runs,
+                "endpoints": self.endpoints,
+                "idle": [s.describe() for s in self._idle],
+                "leased": [s.describe() for s in self._leased.values()],
+                "creating": sum(self._creating.values()),
+                **self.stats,
+            }
+
+    # ----- internals -----
+
+    def _total(self):
+        """Live sessions plus those being opened (caller holds the lock)."""
+        return len(self._idle) + len(self._leased) + sum(self._creating.values())
+
+    def _pick_endpoint(self):
+        """Endpoint with the fewest live + pending sessions (caller holds the lock)."""
+        load = {endpoint: self._creating.get(endpoint, 0) for endpoint in self.endpoints}
+        for session in itertools.chain(self._idle, self._leased.values()):
+            load[session.endpoint] = load.get(session.endpoint, 0) + 1
+        return min(self.endpoints, key=lambda endpoint: load[endpoint])
+
+    def _open(self, endpoint, idle=False):
+        """
+        Create a session on an endpoint reserved in _creating. The reservation is
+        swapped for the live session under one lock hold, so _total() never dips.
+        """
+        try:
+            session = PooledSession(self.factory(endpoint), endpoint)
+        except BaseException:
+            with self._cond:
+                self._creating[endpoint] -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._creating[endpoint] -= 1
+            self.stats["created"] += 1
+            if idle:
+                self._idle.append(session)
+                self._cond.notify_all()
+            else:
+                self._leased[session.id] = session
+                self.stats["leases"] += 1
+        return session
+
+    def _healthy(self, session):
+        if time.time() - session.last_used < self.health_check_after:
+            return True
+        try:
+            session.driver.current_url
+            return True
+        except Exception as e:
+            print(f"⚠ Browser session {session.id} is dead: {e}")
+            return False
+
+    def _reset(self, session):
+        driver = session.driver
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                pass  # about:blank and some error pages have no storage
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            print(f"⚠ Browser session {session.id} failed its reset: {e}")
+            return False
+
+    def _quit(self, session):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+
+    def _retire(self, session, reason):
+        """Quit a leased session, then free its slot and top the pool back up to min_size."""
+        self._quit(session)
+        with self._cond:
+            self._leased.pop(session.id, None)
+            self.stats[reason] += 1
+            self._cond.notify_all()
+        self._replenish_async()
@@ -0,0 +1,327 @@
+"""
+Background jobs: a bounded thread pool with a queue depth limit, per-job
+progress events, and retention of finished jobs for polling. The OCR backend
+runs its async pair/batch/document requests on it, the automation backend its
+workflow runs and batches.
+
+Job functions take a single `progress(stage, **details)` callback and
+return a JSON-serializable result. cancel() sets `progress.cancelled`;
+a job that honours it raises JobCancelled (from progress.check() or
+itself) and ends in the "cancelled" state. Queued jobs are cancelled
+before they start.
+
+With share_state(dir), every job's status and events are also mirrored to
+<dir>/<job_id>.json, so pre-forked sibling processes can answer status and
+event-stream requests for jobs they did not run.
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    def __init__(self, result=None):
+        super().__init__("Job was cancelled")
+        self.result = result  # partial result kept on the job
+
+
+class JobProgress:
+    """The callback handed to job functions: progress(stage, **details), plus cancellation."""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+        self.cancelled = threading.Event()
+
+    def __call__(self, stage, **details):
+        self.manager.report(self.job_id, stage, **details)
+
+    def check(self):
+        """Raise JobCancelled once the job has been cancelled."""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+
+class JobManager:
+    def __init__(self, workers=2, max_queued=16, retention_seconds=900, thread_name_prefix="job", listener=None):
+        """listener(job_id, event), if given, is called after every progress event (outside the lock)."""
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=thread_name_prefix)
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._queued = 0
+        self._recent_durations = []  # seconds, for the Retry-After estimate
+        self._progress = {}  # job_id -> JobProgress of queued/running jobs
+        self.listener = listener
+        self.state_dir = None
+
+    def share_state(self, state_dir):
+        """Mirror job state to state_dir so sibling worker processes can read it."""
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_dir = state_dir
+
+    # ----- submission -----
+
+    def submit(self, kind, func, cleanup=None):
+        """Queue func(progress); raises JobQueueFull when max_queued jobs are already waiting."""
+        with self._cond:
+            self._expire_finished()
+            if self._queued >= self.max_queued:
+                raise JobQueueFull(self._retry_after())
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "state": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "events": [],
+                "result": None,
+                "error": None,
+            }
+            self._queued += 1
+            self._progress[job_id] = JobProgress(self, job_id)
+            self._persist(self._jobs[job_id])
+        self._executor.submit(self._run, job_id, func, cleanup)
+        return job_id
+
+    def _run(self, job_id, func, cleanup):
+        with self._cond:
+            job = self._jobs[job_id]
+            progress = self._progress[job_id]
+            if job["state"] == "cancelled":  # cancelled while queued; cancel() settled it
+                self._progress.pop(job_id, None)
+                run = False
+            else:
+                self._queued -= 1
+                job["state"] = "running"
+                job["started_at"] = time.time()
+                run = True
+        if not run:
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception:
+                    pass
+            return
+        self.report(job_id, "started")
+        try:
+            result = func(progress)
+            final_state, error = "done", None
+        except JobCancelled as e:
+            result, final_state, error = e.result, "cancelled", None
+        except Exception as e:
+            print(f"❌ {job['kind']} job {job_id} failed:", e)
+            result, final_state, error = None, "failed", str(e)
+        finally:
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception:
+                    pass
+
+        with self._cond:
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = time.time()
+            job["state"] = final_state
+            self._progress.pop(job_id, None)
+            self._recent_durations = (self._recent_durations + [job["finished_at"] - job["started_at"]])[-20:]
+        self.report(job_id, final_state)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job of this process. Queued jobs end at once;
+        running ones when they next check. Returns the job's state, or None if unknown.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["finished_at"] is not None:
+                return job["state"]
+            self._progress[job_id].cancelled.set()
+            if job["state"] != "queued":
+                return job["state"]
+            self._queued -= 1
+            job["state"] = "cancelled"
+            job["finished_at"] = time.time()
+        self.report(job_id, "cancelled")
+        return "cancelled"
+
+    def active(self, kind=None):
+        """Ids of queued and running jobs (of one kind, if given)."""
+        with self._cond:
+            return [job_id for job_id, job in self._jobs.items()
+                    if job["finished_at"] is None and (kind is None or job["kind"] == kind)]
+
+    def wait(self, job_id, timeout=None):
+        """Block until a local job has finished (or timeout); returns its status()."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["finished_at"] is not None:
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return self.status(job_id)
+
+    # ----- progress -----
+
+    def report(self, job_id, stage, **details):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            event = {
+                "seq": len(job["events"]) + 1,
+                "stage": stage,
+                "elapsed_ms": round((time.time() - job["submitted_at"]) * 1000, 1),
+                **details,
+            }
+            job["events"].append(event)
+            self._persist(job)
+            self._cond.notify_all()
+        if self.listener is not None:
+            try:
+                self.listener(job_id, event)
+            except Exception as e:
+                print("⚠️ Job event listener failed:", e)
+
+    def status(self, job_id, include_result=True):
+        with self._cond:
+            job = self._jobs.get(job_id) or self._load(job_id)
+            if job is None:
+                return None
+            body = {k: v for k, v in job.items() if k not in ("events", "result")}
+            body["progress"] = job["events"][-1] if job["events"] else None
+            body["event_count"] = len(job["events"])
+            if include_result and (job["state"] == "done" or job["state"] == "cancelled" and job["result"] is not None):
+                body["result"] = job["result"]
+            return body
+
+    def events(self, job_id, after=0, heartbeat_seconds=15):
+        """
+        Yield events with seq > after as they arrive, then stop once the job
+        is finished. Yields None as a keep-alive when nothing happened for a while.
+        """
+        with self._cond:
+            local = job_id in self._jobs
+        if not local:
+            yield from self._shared_events(job_id, after, heartbeat_seconds)
+            return
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if len(job["events"]) <= after and job["finished_at"] is None:
+                    self._cond.wait(timeout=heartbeat_seconds)
+                pending = job["events"][after:]
+                finished = job["finished_at"] is not None
+            if not pending and not finished:
+                yield None
+            for event in pending:
+                yield event
+            after += len(pending)
+            if finished and not pending:
+                return
+
+    def _shared_events(self, job_id, after, heartbeat_seconds, poll_seconds=0.5):
+        """events() for a job owned by a sibling process: poll its state file."""
+        idle = 0.0
+        while True:
+            job = self._load(job_id)
+            if job is None:
+                return
+            pending = job["events"][after:]
+            for event in pending:
+                yield event
+            after += len(pending)
+            if job["finished_at"] is not None and not pending:
+                return
+            idle = 0.0 if pending else idle + poll_seconds
+            if idle >= heartbeat_seconds:
+                idle = 0.0
+                yield None
+            time.sleep(poll_seconds)
+
+    def drain(self, timeout):
+        """Wait until no job is queued or running (or timeout); True when idle. New submits still work."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while any(job["finished_at"] is None for job in self._jobs.values()):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def snapshot(self):
+        with self._cond:
+            states = {}
+            for job in self._jobs.values():
+                states[job["state"]] = states.get(job["state"], 0) + 1
+            return {"workers": self.workers, "max_queued": self.max_queued, "queued": self._queued, "jobs": states}
+
+    # ----- housekeeping (caller holds the lock) -----
+
+    def _expire_finished(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [k for k, j in self._jobs.items() if j["finished_at"] is not None and j["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+            if self.state_dir:
+                try:
+                    os.remove(self._state_path(job_id))
+                except OSError:
+                    pass
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _persist(self, job):
+        if not self.state_dir:
+            return
+        path = self._state_path(job["id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(job, fh, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Could not share state of OCR job {job['id']}:", e)
+
+    def _load(self, job_id):
+        """A sibling's job from its state file, or None (also for ids that are not ours to read)."""
+        if not self.state_dir or not re.fullmatch(r"[0-9a-f]{32}", job_id or ""):
+            return None
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as fh:
+                job = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if job["finished_at"] is not None and job["finished_at"] < time.time() - self.retention_seconds:
+            return None
+        return job
+
+    def _retry_after(self):
+        average = sum(self._recent_durations) / len(self._recent_durations) if self._recent_durations else 5.0
+        return max(1, int(math.ceil(average * self._queued / self.workers)))
@@ -0,0 +1,165 @@
+"""
+Cached login sessions: a workflow's login prefix (its steps up to and including
+the one with config.ends_login) runs once, then later runs restore the browser
+state it produced instead of repeating it.
+
+  - LoginCache keys a snapshot by the target origin plus a hash of the prefix
+    steps (URLs, fields and typed credentials), so different accounts never share
+    one; entries expire after ttl seconds. Nothing is written to disk.
+  - capture_state() takes the cookies and local/session storage of the current page
+  - restore_state() loads a light page on the origin, sets the cookies and
+    storage, then opens the target URL
+  - login_rejected() tells a restored session the site did not accept: we were
+    sent back to the login URL, or the prefix's first login field is showing
+
+WebDriver only exposes cookies of the current page's domain, so a login that
+relies on cookies of another domain (a separate SSO host) cannot be cached
+this way; its restore is rejected and the prefix runs again.
+"""
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+STORAGE_SCRIPT = """
+var dump = function (store) {
+  var out = {};
+  for (var i = 0; i < store.length; i++) { var k = store.key(i); out[k] = store.getItem(k); }
+  return out;
+};
+try { return {local: dump(window.localStorage), session: dump(window.sessionStorage)}; }
+catch (e) { return {local: {}, session: {}}; }
+"""
+
+RESTORE_STORAGE_SCRIPT = """
+var state = arguments[0];
+try {
+  Object.keys(state.local).forEach(function (k) { window.localStorage.setItem(k, state.local[k]); });
+  Object.keys(state.session).forEach(function (k) { window.sessionStorage.setItem(k, state.session[k]); });
+} catch (e) {}
+"""
+
+FIELD_SHOWING_SCRIPT = """
+var el = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!el) return false;
+var rect = el.getBoundingClientRect();
+return !!(rect.width || rect.height);
+"""
+
+COOKIE_KEYS = ("name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite")
+
+
+def prefix_length(steps):
+    """Number of leading steps that make up the login prefix (0 when no step ends_login)."""
+    for index, step in enumerate(steps):
+        if (step.get("config") or {}).get("ends_login"):
+            return index + 1
+    return 0
+
+
+def origin_of(url):
+    parts = urlsplit(url if "://" in url else "https://" + url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def login_origin(prefix):
+    """Origin of the prefix's first navigate step, or None."""
+    for step in prefix:
+        if step.get("type") == "navigate" and (step.get("config") or {}).get("url"):
+            return origin_of(step["config"]["url"])
+    return None
+
+
+class LoginCache:
+    def __init__(self, ttl=900):
+        self.ttl = ttl
+        self._entries = {}  # key -> snapshot dict
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "rejected": 0, "expired": 0}
+
+    @staticmethod
+    def key(prefix):
+        """Cache key of a login prefix: its origin plus a hash of the steps (credentials included)."""
+        material = [(step.get("type"), {k: v for k, v in (step.get("config") or {}).items() if k != "ends_login"})
+                    for step in prefix]
+        digest = hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{login_origin(prefix)}#{digest[:32]}"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] <= time.time():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            self.stats["hits" if entry else "misses"] += 1
+            return entry
+
+    def put(self, key, state):
+        with self._lock:
+            self._entries[key] = {**state, "stored_at": time.time(), "expires_at": time.time() + self.ttl}
+            self.stats["stored"] += 1
+
+    def reject(self, key):
+        """Drop a snapshot the site no longer accepts."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats["rejected"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self):
+        """Entry origins and ages (never cookie values), plus counters."""
+        now = time.time()
+        with self._lock:
+            entries = [{"origin": key.split("#", 1)[0], "age_seconds": round(now - e["stored_at"], 1),
+                        "expires_in_seconds": round(e["expires_at"] - now, 1), "cookies": len(e["cookies"])}
+                       for key, e in self._entries.items() if e["expires_at"] > now]
+        return {"ttl": self.ttl, "entries": entries, **self.stats}
+
+
+def capture_state(driver):
+    """Cookies and local/session storage of the page the driver is on, plus its URL."""
+    storage = driver.execute_script(STORAGE_SCRIPT) or {}
+    return {
+        "url": driver.current_url,
+        "cookies": [{k: c[k] for k in COOKIE_KEYS if k in c} for c in driver.get_cookies()],
+        "local": storage.get("local") or {},
+        "session": storage.get("session") or {},
+    }
+
+
+def restore_state(driver, state, origin, target_url, restore_path="/favicon.ico"):
+    """
+    Put a captured state back: cookies and storage can only be set on a page of
+    their origin, so a light one (restore_path) is loaded first, then target_url.
+    """
+    driver.get(origin + restore_path)
+    for cookie in state["cookies"]:
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"⚠️  Could not restore cookie {cookie.get('name')}: {e}")
+    if state["local"] or state["session"]:
+        driver.execute_script(RESTORE_STORAGE_SCRIPT, {"local": state["local"], "session": state["session"]})
+    driver.get(target_url)
+
+
+def login_rejected(driver, prefix, target_url):
+    """True when the site sent a restored session back to its login page."""
+    login_url = next((s["config"]["url"] for s in prefix
+                      if s.get("type") == "navigate" and (s.get("config") or {}).get("url")), None)
+    if login_url and bare_url(driver.current_url) == bare_url(login_url) != bare_url(target_url):
+        return True
+    first_field = next((s["config"]["xpath"] for s in prefix
+                        if s.get("type") == "type" and (s.get("config") or {}).get("xpath")), None)
+    # a script, not find_elements + is_displayed: presence and visibility in one round trip
+    return bool(first_field and driver.execute_script(FIELD_SHOWING_SCRIPT, first_field))
+
+
+def bare_url(url):
+    url = url if "://" in url else "https://" + url
+    return url.split("#")[0].split("?")[0].rstrip("/")
@@ -0,0 +1,176 @@
+"""
+Stage timings and Prometheus metrics for the OCR server, without a client library.
+
+  - Metrics: counters, gauges and fixed-bucket histograms, rendered in the
+    Prometheus text exposition format for the /metrics endpoint
+  - collect_timings / timed_stage: a per-request collector that pipeline
+    stages report into (also across the "pages"/"roi" thread pools, which
+    run tasks in a copy of the caller's context)
+
+Stage histograms observe the time a request spent in each stage (front and
+back summed), so batch workers can report their totals back to the parent.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_timings = contextvars.ContextVar("ocr_stage_timings", default=None)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self, namespace="ocr", buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._meta = {}        # name -> (type, help)
+        self._values = {}      # (name, labels) -> float, for counters and gauges
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    def observe_stages(self, stage_seconds):
+        """Record a request's {stage: seconds} totals into the stage histogram."""
+        for stage, seconds in stage_seconds.items():
+            self.observe("stage_seconds", seconds, stage=stage)
+
+    def render(self):
+        """Everything recorded so far, in the Prometheus text format."""
+        with self._lock:
+            values = dict(self._values)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        series = {}  # name -> [(labels, lines)]; histogram buckets must stay in le order
+        for (name, labels), value in values.items():
+            full = f"{self.namespace}_{name}"
+            series.setdefault(name, []).append((labels, [f"{full}{format_labels(labels)} {format_value(value)}"]))
+        for (name, labels), hist in histograms.items():
+            full = f"{self.namespace}_{name}"
+            lines = [
+                f"{full}_bucket{format_labels(labels + (('le', format_value(bound)),))} {count}"
+                for bound, count in zip(self.buckets + (float("inf"),), hist[:-2] + [hist[-1]])
+            ]
+            lines.append(f"{full}_sum{format_labels(labels)} {round(hist[-2], 6)}")
+            lines.append(f"{full}_count{format_labels(labels)} {hist[-1]}")
+            series.setdefault(name, []).append((labels, lines))
+
+        out = []
+        for name in sorted(series):
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            if help_text:
+                out.append(f"# HELP {self.namespace}_{name} {help_text}")
+            out.append(f"# TYPE {self.namespace}_{name} {kind}")
+            for _, lines in sorted(series[name]):
+                out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+class StageTimings:
+    """Seconds spent per stage during one request (thread-safe; stages may run concurrently)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
+
+    def totals(self):
+        with self._lock:
+            return dict(self._seconds)
+
+    def summary_ms(self):
+        """Compact breakdown for a response body: {stage: ms, ..., "total": ms}."""
+        summary = {stage: round(seconds * 1000, 1) for stage, seconds in self.totals().items()}
+        summary["total"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return summary
+
+
+@contextmanager
+def collect_timings(metrics=None):
+    """
+    Collect stage timings for the enclosed work. Nested calls share the outer
+    collector; when the outermost one exits its totals go into `metrics`.
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+        if metrics is not None:
+            metrics.observe_stages(timings.totals())
+
+
+@contextmanager
+def timed_stage(stage):
+    """Add the enclosed block's duration to the current collector (no-op outside one)."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - started)
+
+
+def timed(stage):
+    """Decorator form of timed_stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_call(stage, func, *args, **kwargs):
+    with timed_stage(stage):
+        return func(*args, **kwargs)
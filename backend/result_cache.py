@@ -0,0 +1,175 @@
+"""
+Content-addressed cache for OCR responses.
+
+Two tiers:
+  - memory: LRU over serialized JSON, bounded by entry count and TTL
+  - disk (optional): one JSON file per key under a cache directory,
+    bounded by total bytes and TTL, shared by restarts and batch workers
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def digest_bytes(*chunks):
+    """sha256 over several byte strings, length-prefixed so (ab, c) != (a, bc)."""
+    h = hashlib.sha256()
+    for chunk in chunks:
+        h.update(len(chunk).to_bytes(8, "big"))
+        h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=256, ttl_seconds=3600, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()  # key -> (stored_at, serialized)
+        self._disk_index = None       # key -> (mtime, size), built on first disk access
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # ----- public API -----
+
+    def get(self, key):
+        """Return a fresh copy of the cached value, or None on a miss/expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, serialized = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return json.loads(serialized)
+                del self._memory[key]
+
+        serialized = self._disk_get(key, now)
+        with self._lock:
+            if serialized is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            self._memory_put(key, serialized, now)
+        return json.loads(serialized)
+
+    def put(self, key, value):
+        serialized = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self.stats["stores"] += 1
+            self._memory_put(key, serialized, now)
+        self._disk_put(key, serialized)
+
+    def snapshot(self):
+        """Counters plus current tier sizes, for the stats endpoint."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk_index) if self._disk_index is not None else None,
+                "disk_bytes": sum(size for _, size in self._disk_index.values()) if self._disk_index else 0,
+            }
+
+    # ----- memory tier -----
+
+    def _memory_put(self, key, serialized, now):
+        self._memory[key] = (now, serialized)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ----- disk tier -----
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _load_disk_index(self):
+        """Scan the cache directory once; later updates are tracked incrementally."""
+        if self._disk_index is not None:
+            return
+        index = {}
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                index[name[:-5]] = (st.st_mtime, st.st_size)
+        self._disk_index = index
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl_seconds:
+                self._disk_remove(key)
+                return None
+            with open(path, "r", encoding="utf-8") as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def _disk_put(self, key, serialized):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(serialized)
+            os.replace(tmp_path, path)
+            st = os.stat(path)
+        except OSError as e:
+            print("⚠️ Result cache write failed:", e)
+            return
+        with self._lock:
+            self._load_disk_index()
+            self._disk_index[key] = (st.st_mtime, st.st_size)
+            expired, overflow = self._disk_evictions(time.time())
+        for old_key in expired + overflow:
+            self._disk_remove(old_key)
+
+    def _disk_evictions(self, now):
+        """Pick expired keys, then oldest keys until the tier fits disk_max_bytes. Caller holds the lock."""
+        expired = [k for k, (mtime, _) in self._disk_index.items() if now - mtime > self.ttl_seconds]
+        expired_set = set(expired)
+        remaining = sorted(
+            (mtime, size, k) for k, (mtime, size) in self._disk_index.items() if k not in expired_set
+        )
+        total = sum(size for _, size, _ in remaining)
+        overflow = []
+        for _, size, k in remaining:
+            if total <= self.disk_max_bytes:
+                break
+            overflow.append(k)
+            total -= size
+        for k in expired + overflow:
+            self._disk_index.pop(k, None)
+        self.stats["evictions"] += len(expired) + len(overflow)
+        return expired, overflow
+
+    def _disk_remove(self, key):
+        with self._lock:
+            if self._disk_index is not None:
+                self._disk_index.pop(key, None)
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
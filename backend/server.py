@@ -1,17 +1,51 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
+import atexit
+import contextvars
+import hashlib
+import io
 import json
+import multiprocessing
 import os
+import queue
 import shutil
+import sys
+import tempfile
+import threading
 import time
 import uuid
+import zipfile
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, CancelledError, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 import cv2
 import numpy as np
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+
+from aadhaar_qr import parse_aadhaar_qr
+from jobs import JobManager, JobQueueFull
+from ocr_metrics import Metrics, collect_timings, timed, timed_call, timed_stage
+from result_cache import ResultCache, digest_bytes
+from serving import serve
+from storage import JsonlLog, StorageArea, StorageSweeper
 
 # ========= Flask Setup =========
+# Uploads up to this size are buffered and decoded in memory; larger ones spool to disk
+UPLOAD_SPOOL_MAX_BYTES = int(os.environ.get("OCR_UPLOAD_SPOOL_MAX_BYTES", 32 * 1024 * 1024))
+
+class OCRRequest(Request):
+    """Keep multipart file parts in memory (werkzeug spools anything over 500KB to a temp file)."""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_MAX_BYTES:
+            return io.BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
 app = Flask(__name__)
+app.request_class = OCRRequest
 CORS(app)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,6 +55,10 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(DEBUG_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+# poppler only reads PDFs from files (pdf2image's *_from_bytes write a temp file per
+# call), so an in-memory PDF is written once per request here: RAM-backed when possible
+PDF_SPOOL_DIR = os.environ.get(
+    "OCR_PDF_SPOOL_DIR", "/dev/shm" if os.access("/dev/shm", os.W_OK) else UPLOAD_DIR)
 
 # ========= CONFIG =========
 # Toggle: after perspective-warp, also resize to a fixed canvas
@@ -42,18 +80,291 @@ ROI_PERCENTS = {
 MIN_CARD_AREA_RATIO = 0.20  # card must cover >= 20% of image area
 CANNY_LOW, CANNY_HIGH = 75, 200
 GAUSS_BLUR_KSIZE = 5
+# Card detection runs on a copy capped at this longest side (0 = full resolution);
+# the found corners are rescaled and refined on the original before warping
+DETECT_MAX_SIDE = int(os.environ.get("OCR_DETECT_MAX_SIDE", 1024))
+# Per-request memory budget. Inputs that would push one request's working set past
+# it are downsampled while decoding: PDFs rasterize at a lower DPI and JPEGs decode
+# at 1/2-1/8 scale. A pair request holds both sides at once. 0 = unlimited.
+OCR_MEMORY_BUDGET_BYTES = int(os.environ.get("OCR_MEMORY_BUDGET_BYTES", 512 * 1024 * 1024))
+PIPELINE_BYTES_PER_PIXEL = 12  # input + warp + overlay + grayscale work, per input pixel (rough)
+
+# Documents (multi-page PDFs / scans with several cards per page)
+PDF_DPI = 300
+DOCUMENT_MAX_PAGES = int(os.environ.get("OCR_DOCUMENT_MAX_PAGES", 100))
+DOCUMENT_MAX_CARDS_PER_PAGE = 8
+MULTI_CARD_MIN_AREA_RATIO = 0.03   # an ID-1 card is ~7% of an A4 scan
+CARD_ASPECT_RANGE = (1.3, 1.9)     # ID-1 is 85.6 x 54 mm = 1.586
+
+# Batch OCR: card pairs are fanned out to a pool of worker processes
+OCR_BATCH_WORKERS = int(os.environ.get("OCR_BATCH_WORKERS", os.cpu_count() or 1))
+OCR_BATCH_MAX_PAIRS = int(os.environ.get("OCR_BATCH_MAX_PAIRS", 100))
+# A pair still running this long after it was handed to a worker fails; its (hung) pool
+# takes no new pairs and is killed once the other pairs on it have finished
+OCR_BATCH_ITEM_TIMEOUT_SECONDS = float(os.environ.get("OCR_BATCH_ITEM_TIMEOUT_SECONDS", 300))
+# Workers are never forked from the serving process: it runs threads (debug writer,
+# sweeper, jobs, requests) and a child could inherit one of their locks held
+OCR_BATCH_START_METHOD = os.environ.get(
+    "OCR_BATCH_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+# Intra-request concurrency: front/back pages and their ROI OCR calls run on
+# bounded thread pools (OpenCV and tesseract release the GIL). 1 = serial.
+OCR_CONCURRENCY = int(os.environ.get("OCR_CONCURRENCY", 4))
+# Batch workers are already one process per core, so they default to serial
+OCR_BATCH_WORKER_CONCURRENCY = int(os.environ.get("OCR_BATCH_WORKER_CONCURRENCY", 1))
+UPLOAD_EXTENSIONS = {"jpg", "jpeg", "png", "pdf"}
+
+# OCR mode:
+#   "per_roi"     -> one tesseract call per ROI crop (original behaviour)
+#   "single_pass" -> one image_to_data call over all active ROIs, words mapped back to ROIs
+OCR_MODE = os.environ.get("OCR_MODE", "per_roi")
+SINGLE_PASS_PSM = 11  # sparse text: the card layout is not one uniform block
+# ROI crops are rescaled so their text lines come out about this tall (px) before
+# thresholding; tesseract reads best at ~20-40px glyphs whatever the input DPI. 0 = off.
+OCR_TARGET_LINE_HEIGHT = int(os.environ.get("OCR_TARGET_LINE_HEIGHT", 36))
+OCR_SCALE_RANGE = (0.2, 4.0)   # clamp for the rescale factor
+OCR_SCALE_TOLERANCE = 0.15     # leave crops alone when already within 15% of the target
+# Per-ROI OCR: find the text lines inside the (generous) ROI and OCR only those.
+# Single-line fields send their best line with psm 7; block fields stack their lines (psm 6).
+LINE_LOCALIZATION = os.environ.get("OCR_LINE_LOCALIZATION", "1") == "1"
+ROI_PSM = {"name": 7, "dob": 7, "gender": 7, "aadhaar": 7, "address": 6}
+LINE_PAD = 6  # px of white kept around each line box
+# Side classifier: layout features on a downscaled warped card decide "front"/"back"
+# before QR detection. Backs OCR the address and search only their QR region, so a
+# back whose QR does not decode still reads the address. Fronts OCR the demographic
+# ROIs after a QR search of the card's right side, where PVC fronts print their QR
+# and where a back misread as a front (e.g. a low-contrast QR block) has its own:
+# either still takes the QR fast path, at about half the cost of a full-page search.
+# Pages the classifier is unsure about are searched in full and keep the QR-driven routing.
+SIDE_CLASSIFIER = os.environ.get("OCR_SIDE_CLASSIFIER", "1") == "1"
+SIDE_CLASSIFIER_WIDTH = 480          # px; QR modules stay ~3px wide at this size
+SIDE_ROI_KEYS = {"front": ("name", "dob", "gender", "aadhaar"), "back": ("address",)}
+SIDE_QR_REGIONS = {"front": (0.55, 0.05, 0.45, 0.90), "back": (0.45, 0.05, 0.55, 0.90)}  # (x%, y%, w%, h%)
+QR_BLOCK_SIZE = 0.35        # QR-search window side, as a fraction of card height
+QR_BLOCK_MIN_INK = 0.30     # a QR is ~50% dark modules; text lines stay well under this
+QR_BLOCK_MIN_EDGES = 0.20   # ...and dense in edges, unlike a photo or a solid logo
+MIN_TEXT_INK = 0.04         # dark-pixel share of an ROI that counts as "has text"
+# QR-first: when either side's QR parses as an Aadhaar payload, take the fields from
+# it and skip tesseract for the whole pair (ROI OCR remains the fallback)
+QR_FAST_PATH = os.environ.get("OCR_QR_FAST_PATH", "1") == "1"
+
+# Debug assets: "off" (none), "overlay" (QR/ROI overlay only), "full" (every stage)
+DEBUG_LEVEL = os.environ.get("OCR_DEBUG_LEVEL", "full")
+DEBUG_LEVELS = {"off": 0, "overlay": 1, "full": 2}
+DEBUG_WRITE_QUEUE_SIZE = 256  # pending background writes before new assets are skipped
+DEBUG_MEMORY_SLOTS = 32       # cap on in-memory debug arrays saved outside a request (debug_scope)
+
+# Side-by-side previews: keep the two overlays in memory and render/encode the
+# composite when /outputs/<file> is first fetched (then memoize the JPEG).
+# Batch workers live in other processes, so they always write it eagerly.
+LAZY_COMPOSITE = os.environ.get("OCR_LAZY_COMPOSITE", "1") == "1"
+COMPOSITE_CACHE_MAX_BYTES = int(os.environ.get("OCR_COMPOSITE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+COMPOSITE_CACHE_TTL_SECONDS = int(os.environ.get("OCR_COMPOSITE_CACHE_TTL_SECONDS", 600))
+
+# Result cache for re-submitted uploads, keyed by upload bytes + pipeline config
+RESULT_CACHE_ENABLED = os.environ.get("OCR_CACHE", "1") == "1"
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("OCR_CACHE_MAX_ENTRIES", 256))
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("OCR_CACHE_TTL_SECONDS", 3600))
+RESULT_CACHE_DISK = os.environ.get("OCR_CACHE_DISK", "0") == "1"
+RESULT_CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+RESULT_CACHE_DISK_MAX_BYTES = int(os.environ.get("OCR_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024))
+
+# Production serving (python server.py --production): pre-forked workers sharing port
+# 5001, each warmed up before accepting; over SERVE_MAX_IN_FLIGHT concurrent requests a
+# worker answers 429; on SIGTERM workers finish in-flight requests and jobs first.
+SERVE_HOST = os.environ.get("OCR_SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.environ.get("OCR_SERVE_PORT", 5001))
+SERVE_WORKERS = int(os.environ.get("OCR_SERVE_WORKERS", 2))
+SERVE_MAX_IN_FLIGHT = int(os.environ.get("OCR_SERVE_MAX_IN_FLIGHT", 4))
+SERVE_GRACEFUL_TIMEOUT = int(os.environ.get("OCR_SERVE_GRACEFUL_TIMEOUT", 60))
+JOB_STATE_DIR = os.path.join(OUTPUT_DIR, "jobs")
+
+# Storage caps (0 = unlimited). A background thread evicts expired files, then the
+# oldest ones, every STORAGE_SWEEP_INTERVAL_SECONDS. Debug and output files are
+# spread over 256 hashed subdirectories; uploads/ only holds transient spools.
+STORAGE_SWEEP_INTERVAL_SECONDS = int(os.environ.get("OCR_STORAGE_SWEEP_INTERVAL_SECONDS", 60))
+DEBUG_DIR_MAX_BYTES = int(os.environ.get("OCR_DEBUG_DIR_MAX_BYTES", 512 * 1024 * 1024))
+DEBUG_DIR_MAX_AGE_SECONDS = int(os.environ.get("OCR_DEBUG_DIR_MAX_AGE_SECONDS", 24 * 3600))
+OUTPUT_DIR_MAX_BYTES = int(os.environ.get("OCR_OUTPUT_DIR_MAX_BYTES", 1024 * 1024 * 1024))
+OUTPUT_DIR_MAX_AGE_SECONDS = int(os.environ.get("OCR_OUTPUT_DIR_MAX_AGE_SECONDS", 7 * 24 * 3600))
+UPLOAD_DIR_MAX_AGE_SECONDS = int(os.environ.get("OCR_UPLOAD_DIR_MAX_AGE_SECONDS", 3600))
+# Result payloads: "files" (one JSON per request) or "jsonl" (append to a rotating
+# outputs/results.jsonl; responses then carry output_record_id instead of output_text_url)
+OUTPUT_PERSIST = os.environ.get("OCR_OUTPUT_PERSIST", "files")
+RESULT_LOG_PATH = os.path.join(OUTPUT_DIR, "results.jsonl")
+RESULT_LOG_MAX_BYTES = int(os.environ.get("OCR_RESULT_LOG_MAX_BYTES", 64 * 1024 * 1024))
+RESULT_LOG_BACKUPS = int(os.environ.get("OCR_RESULT_LOG_BACKUPS", 5))
+# Rewrite outputs/latest.{json,txt,jpg} on every request (handy when tuning ROIs by hand)
+OUTPUT_WRITE_LATEST = os.environ.get("OCR_OUTPUT_WRITE_LATEST", "1") == "1"
+
+# Async OCR jobs: bounded worker threads + queue depth limit (429 when full)
+OCR_JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", 2))
+OCR_JOB_MAX_QUEUED = int(os.environ.get("OCR_JOB_MAX_QUEUED", 16))
+OCR_JOB_RETENTION_SECONDS = int(os.environ.get("OCR_JOB_RETENTION_SECONDS", 900))
+
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+    disk_dir=RESULT_CACHE_DIR if RESULT_CACHE_DISK else None,
+    disk_max_bytes=RESULT_CACHE_DISK_MAX_BYTES,
+) if RESULT_CACHE_ENABLED else None
+
+metrics = Metrics(namespace="ocr")
+metrics.describe("stage_seconds", "histogram", "Time a request spent in each pipeline stage")
+metrics.describe("request_seconds", "histogram", "HTTP request latency by endpoint")
+metrics.describe("requests_total", "counter", "HTTP requests by endpoint and status code")
+metrics.describe("errors_total", "counter", "Failed OCR work: HTTP 5xx responses and failed batch/job items")
+metrics.describe("cards_total", "counter", "Processed card images by whether the card outline was found")
+metrics.describe("qr_total", "counter", "Processed card images by QR outcome (none, detected, parsed)")
+metrics.describe("sides_total", "counter", "Processed card images by classified side (front, back, unknown)")
+metrics.describe("cache_entries", "gauge", "Result cache entries per tier")
+metrics.describe("cache_lookups_total", "counter", "Result cache lookups by outcome")
+metrics.describe("jobs", "gauge", "Async OCR jobs by state")
+metrics.describe("inputs_downscaled_total", "counter", "Decoded inputs downsampled to fit OCR_MEMORY_BUDGET_BYTES")
+metrics.describe("storage_bytes", "gauge", "Bytes on disk per storage area, as of the last sweep")
+metrics.describe("storage_evicted_files", "gauge", "Files evicted per storage area since start")
+
+debug_store = StorageArea("debug", DEBUG_DIR, DEBUG_DIR_MAX_BYTES, DEBUG_DIR_MAX_AGE_SECONDS)
+output_store = StorageArea("outputs", OUTPUT_DIR, OUTPUT_DIR_MAX_BYTES, OUTPUT_DIR_MAX_AGE_SECONDS,
+                           keep_prefixes=("latest.", "results.jsonl"))
+upload_store = StorageArea("uploads", UPLOAD_DIR, max_age_seconds=UPLOAD_DIR_MAX_AGE_SECONDS, hashed=False)
+storage_sweeper = StorageSweeper([debug_store, output_store, upload_store], STORAGE_SWEEP_INTERVAL_SECONDS)
+result_log = JsonlLog(RESULT_LOG_PATH, RESULT_LOG_MAX_BYTES, RESULT_LOG_BACKUPS) if OUTPUT_PERSIST == "jsonl" else None
 
 # ========= Helpers =========
 
+def report_progress(progress, stage, **details):
+    """Forward a pipeline stage to an optional progress(stage, **details) callback."""
+    if progress is not None:
+        progress(stage, **details)
+
 def unique_name(prefix, ext="jpg"):
     return f"{prefix}_{int(time.time())}_{uuid.uuid4().hex[:6]}.{ext}"
 
-def save_debug(img, label):
+_thread_pools = {}
+
+def get_thread_pool(name):
+    """Named per-process thread pool; rebuilt after a fork since pool threads do not survive it."""
+    key = (name, os.getpid())
+    pool = _thread_pools.get(key)
+    if pool is None:
+        pool = ThreadPoolExecutor(max_workers=OCR_CONCURRENCY, thread_name_prefix=f"ocr-{name}")
+        _thread_pools[key] = pool
+    return pool
+
+def run_concurrently(name, tasks):
+    """
+    Run zero-arg callables on the named pool and return their results in order.
+    Tasks on one pool must not wait on tasks from the same pool (pages -> roi is fine).
+    """
+    if OCR_CONCURRENCY <= 1 or len(tasks) <= 1:
+        return [task() for task in tasks]
+    pool = get_thread_pool(name)
+    # each task runs in a copy of this context so stage timings reach the request's collector
+    futures = [pool.submit(contextvars.copy_context().run, task) for task in tasks]
+    return [future.result() for future in futures]
+
+# debug level of the current call (and the pool tasks it runs) when it differs from DEBUG_LEVEL
+_call_debug_level = contextvars.ContextVar("ocr_debug_level", default=None)
+
+def debug_enabled(level):
+    """True when the debug level in effect (the call's, else DEBUG_LEVEL) includes assets of the given level."""
+    current = _call_debug_level.get() or DEBUG_LEVEL
+    return DEBUG_LEVELS.get(current, DEBUG_LEVELS["full"]) >= DEBUG_LEVELS[level]
+
+_debug_images = OrderedDict()  # filename -> array, for the lifetime of a request
+_debug_lock = threading.Lock()
+_debug_scope = contextvars.ContextVar("ocr_debug_scope", default=None)  # names saved by the current request
+_unscoped_debug = deque()  # names saved outside any scope, oldest first
+_debug_queues = {}  # pid -> background writer queue
+
+def debug_writer_loop(write_queue):
+    """Background thread: JPEG-encode and persist debug images off the request path."""
+    while True:
+        path, img = write_queue.get()
+        try:
+            cv2.imwrite(path, img)
+        except Exception as e:
+            print("⚠️ Debug write failed:", e)
+        finally:
+            write_queue.task_done()
+
+def get_debug_write_queue():
+    """Per-process writer queue; the thread is started lazily (and again after a fork)."""
+    pid = os.getpid()
+    with _debug_lock:
+        write_queue = _debug_queues.get(pid)
+        if write_queue is None:
+            write_queue = queue.Queue(maxsize=DEBUG_WRITE_QUEUE_SIZE)
+            threading.Thread(target=debug_writer_loop, args=(write_queue,),
+                             name="debug-writer", daemon=True).start()
+            _debug_queues[pid] = write_queue
+    return write_queue
+
+def flush_debug_writes(timeout=5.0):
+    """Wait (bounded) for queued debug writes; registered at exit so no write is cut off mid-encode."""
+    deadline = time.time() + timeout
+    for write_queue in list(_debug_queues.values()):
+        while write_queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+atexit.register(flush_debug_writes)
+
+def save_debug(img, label, level="full"):
+    """
+    Keep a debug image in memory and queue it for a background write.
+    Returns its filename, or None when DEBUG_LEVEL excludes this level.
+    """
+    if not debug_enabled(level):
+        return None
     fn = unique_name(label, "jpg")
-    path = os.path.join(DEBUG_DIR, fn)
-    cv2.imwrite(path, img)
+    scope = _debug_scope.get()
+    with _debug_lock:
+        _debug_images[fn] = img
+        if scope is not None:
+            scope.append(fn)  # kept until the request releases it, however many run at once
+        else:
+            _unscoped_debug.append(fn)
+            while len(_unscoped_debug) > DEBUG_MEMORY_SLOTS:
+                _debug_images.pop(_unscoped_debug.popleft(), None)
+    try:
+        get_debug_write_queue().put_nowait((debug_store.path_for(fn), img))
+    except queue.Full:
+        print(f"⚠️ Debug writer is behind, not persisting {fn}")
     return fn
 
+def get_debug_array(filename):
+    """In-memory debug image by filename, or None once released/evicted."""
+    with _debug_lock:
+        return _debug_images.get(filename)
+
+def release_debug_images(debug_files):
+    """Drop a request's debug arrays from memory (pending writes keep their own reference)."""
+    with _debug_lock:
+        for name in (debug_files or {}).values():
+            _debug_images.pop(name, None)
+
+@contextmanager
+def debug_scope():
+    """
+    Request scope for in-memory debug arrays: what is saved inside (including on the
+    request's pool threads) stays readable until released, and is released on exit at the latest.
+    """
+    names = []
+    token = _debug_scope.set(names)
+    try:
+        yield
+    finally:
+        _debug_scope.reset(token)
+        release_debug_images(dict(enumerate(names)))
+
+def add_debug(debug_assets, key, img, label, level="full"):
+    """save_debug + record the filename under key when the asset was kept."""
+    name = save_debug(img, label, level)
+    if name:
+        debug_assets[key] = name
+
 def order_points(pts):
     # pts: 4x2
     rect = np.zeros((4, 2), dtype="float32")
@@ -90,63 +401,149 @@ def four_point_transform(image, pts):
     warped = cv2.warpPerspective(image, M, (maxW, maxH), flags=cv2.INTER_CUBIC)
     return warped
 
-def detect_and_warp_card(bgr):
+def detection_scale(shape):
+    """Factor (<= 1) that brings the longest side down to DETECT_MAX_SIDE."""
+    longest = max(shape[:2])
+    if not DETECT_MAX_SIDE or longest <= DETECT_MAX_SIDE:
+        return 1.0
+    return DETECT_MAX_SIDE / float(longest)
+
+def refine_quad_corners(bgr, quad, radius):
     """
-    Returns warped_card, debug_assets, info dict
-    Falls back to original if card not found (with reason)
+    Snap corners found on the downscaled copy to full-resolution positions.
+    cornerSubPix runs on a small grayscale patch around each corner, so the
+    full image is never converted; a corner that drifts out of its search
+    window keeps its rescaled position.
     """
-    debug_assets = {}
-    info = {"card_found": False, "reason": ""}
-
-    orig = bgr.copy()
-    debug_assets["original"] = save_debug(orig, "0_original")
+    H, W = bgr.shape[:2]
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.05)
+    refined = quad.copy()
+    for i, (x, y) in enumerate(quad):
+        x0, y0 = max(0, int(x) - 2 * radius), max(0, int(y) - 2 * radius)
+        x1, y1 = min(W, int(x) + 2 * radius + 1), min(H, int(y) + 2 * radius + 1)
+        if x1 - x0 < 2 * radius + 1 or y1 - y0 < 2 * radius + 1:
+            continue
+        patch = cv2.cvtColor(bgr[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        pt = np.array([[[x - x0, y - y0]]], dtype=np.float32)
+        cv2.cornerSubPix(patch, pt, (radius, radius), (-1, -1), criteria)
+        nx, ny = pt[0, 0] + (x0, y0)
+        if abs(nx - x) <= radius and abs(ny - y) <= radius:
+            refined[i] = (nx, ny)
+    return refined
+
+def quad_aspect_ratio(quad):
+    (tl, tr, br, bl) = order_points(quad)
+    width = (np.linalg.norm(tr - tl) + np.linalg.norm(br - bl)) / 2.0
+    height = (np.linalg.norm(bl - tl) + np.linalg.norm(br - tr)) / 2.0
+    return max(width, height) / max(1.0, min(width, height))
+
+def find_card_quad(bgr, debug_assets, info):
+    """
+    Locate the card's 4 corners in full-resolution coordinates.
+    Returns a 4x2 float32 array, or None with info["reason"] set.
+    """
+    quads = find_card_quads(bgr, debug_assets, info)
+    return quads[0] if quads else None
 
-    gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+def find_card_quads(bgr, debug_assets, info, max_cards=1, min_area_ratio=None):
+    """
+    Locate up to max_cards card quads (largest first) in full-resolution coordinates.
+    With max_cards > 1, candidates must also have an ID-card aspect ratio so
+    photos and text blocks on a scanned page are not mistaken for cards.
+    Returns a list of 4x2 float32 arrays; empty with info["reason"] set.
+    """
+    if min_area_ratio is None:
+        min_area_ratio = MIN_CARD_AREA_RATIO
+    # contours are searched on a capped-resolution copy; only the warp needs full res.
+    # INTER_LINEAR: INTER_AREA at fractional scales costs more than the Canny it saves,
+    # and the blur below absorbs the aliasing
+    scale = detection_scale(bgr.shape)
+    small = bgr if scale == 1.0 else cv2.resize(bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
     # slight blur reduces noise for Canny
     blur = cv2.GaussianBlur(gray, (GAUSS_BLUR_KSIZE, GAUSS_BLUR_KSIZE), 0)
 
     edges = cv2.Canny(blur, CANNY_LOW, CANNY_HIGH)
-    debug_assets["edges"] = save_debug(edges, "1_edges")
+    add_debug(debug_assets, "edges", edges, "1_edges")
 
     # find contours
     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
         info["reason"] = "no contours"
-        return bgr, debug_assets, info
+        return []
 
     # consider largest contours by area
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:7]
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:max(7, 3 * max_cards)]
     H, W = gray.shape[:2]
     img_area = W * H
 
-    quad = None
-    vis = bgr.copy()
+    quads = []
+    # contour visualisation is only needed for the full debug level, and is drawn
+    # at detection resolution rather than on a full-resolution copy
+    vis = small.copy() if debug_enabled("full") else None
 
     for c in contours:
         area = cv2.contourArea(c)
-        if area < MIN_CARD_AREA_RATIO * img_area:
+        if area < min_area_ratio * img_area:
             continue
 
         peri = cv2.arcLength(c, True)
         approx = cv2.approxPolyDP(c, 0.02 * peri, True)
 
-        # draw candidate
-        cv2.drawContours(vis, [approx], -1, (0, 255, 255), 3)
+        # draw candidate (contours are in detection coordinates)
+        if vis is not None:
+            cv2.drawContours(vis, [approx], -1, (0, 255, 255), 3)
 
         if len(approx) == 4:
             quad = approx.reshape(4, 2).astype("float32")
+            if max_cards > 1:
+                low, high = CARD_ASPECT_RANGE
+                if not low <= quad_aspect_ratio(quad) <= high:
+                    continue
+            quads.append(quad)
             # draw selected in green
-            cv2.drawContours(vis, [approx], -1, (0, 255, 0), 4)
-            break
+            if vis is not None:
+                cv2.drawContours(vis, [approx], -1, (0, 255, 0), 4)
+            if len(quads) >= max_cards:
+                break
 
-    debug_assets["contours"] = save_debug(vis, "2_contours")
+    if vis is not None:
+        add_debug(debug_assets, "contours", vis, "2_contours")
 
-    if quad is None:
+    if not quads:
         info["reason"] = "no 4-corner polygon above area threshold"
+        return []
+
+    if scale != 1.0:
+        radius = int(min(25, max(3, np.ceil(2.0 / scale))))
+        quads = [refine_quad_corners(bgr, quad / scale, radius) for quad in quads]
+    return quads
+
+@timed("warp")
+def detect_and_warp_card(bgr):
+    """
+    Returns warped_card, debug_assets, info dict
+    Falls back to original if card not found (with reason)
+    """
+    debug_assets = {}
+    info = {"card_found": False, "reason": ""}
+
+    # the pipeline never writes into its input, so the debug asset can share it
+    add_debug(debug_assets, "original", bgr, "0_original")
+
+    quad = find_card_quad(bgr, debug_assets, info)
+    if quad is None:
         return bgr, debug_assets, info
 
-    warped = four_point_transform(orig, quad)
-    debug_assets["warped_raw"] = save_debug(warped, "3_warped")
+    warped = warp_card(bgr, quad, debug_assets, info)
+    return warped, debug_assets, info
+
+def warp_card(bgr, quad, debug_assets, info):
+    """Perspective-warp one detected quad to a landscape card and mark info as found."""
+    info["quad"] = order_points(quad).round(1).tolist()
+
+    warped = four_point_transform(bgr, quad)
+    add_debug(debug_assets, "warped_raw", warped, "3_warped")
 
     # Normalize orientation: ensure width > height if your card is landscape
     h, w = warped.shape[:2]
@@ -154,8 +551,9 @@ def detect_and_warp_card(bgr):
         warped = cv2.rotate(warped, cv2.ROTATE_90_CLOCKWISE)
 
     info["card_found"] = True
-    return warped, debug_assets, info
+    return warped
 
+@timed("normalize")
 def normalize_canvas(img):
     """Optional: resize to fixed canvas after warp for easier visual tuning."""
     if not USE_FIXED_CANVAS:
@@ -174,14 +572,43 @@ def get_roi_pixels(img, roi_pct):
     ww = max(1, min(ww, w - x)); hh = max(1, min(hh, h - y))
     return (x, y, ww, hh)
 
-def read_roi_text(img, roi_rect):
-    x, y, ww, hh = roi_rect
-    crop = img[y:y+hh, x:x+ww]
-    # If crop degenerate, return empty
-    if crop.size == 0 or crop.shape[0] < 10 or crop.shape[1] < 10:
-        return ""
+def measure_line_height(gray):
+    """
+    Median height (px) of the text lines in a grayscale crop, from the
+    row profile of an Otsu-inverted copy; None when no line stands out.
+    """
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    rows = cv2.reduce(ink, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+    # a row belongs to a line if it carries a little ink; lone specks and
+    # full-width rules (card borders, table lines) do not count
+    width = gray.shape[1]
+    inked = (rows > max(2, width * 0.01)) & (rows < width * 0.9)
+
+    edges = np.diff(np.concatenate(([0], inked.astype(np.int8), [0])))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    heights = heights[heights >= 4]
+    return float(np.median(heights)) if heights.size else None
+
+def normalize_text_scale(gray, line_height=None):
+    """
+    Resize a grayscale crop so its lines are ~OCR_TARGET_LINE_HEIGHT px tall.
+    Returns (image, scale); scale is 1.0 when the crop was left as is.
+    """
+    if OCR_TARGET_LINE_HEIGHT <= 0:
+        return gray, 1.0
+    line_height = line_height or measure_line_height(gray)
+    if not line_height:
+        return gray, 1.0
+    scale = min(max(OCR_TARGET_LINE_HEIGHT / line_height, OCR_SCALE_RANGE[0]), OCR_SCALE_RANGE[1])
+    if abs(scale - 1.0) <= OCR_SCALE_TOLERANCE:
+        return gray, 1.0
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    resized = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+    return resized, scale
 
-    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+def threshold_for_ocr(crop):
+    """Grayscale + adaptive threshold, shared by both OCR modes."""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
 
     # Adaptive threshold is good for uneven lighting
     processed = cv2.adaptiveThreshold(
@@ -192,13 +619,142 @@ def read_roi_text(img, roi_rect):
     # Optional mild dilation can connect broken characters
     # kernel = np.ones((1,1), np.uint8)
     # processed = cv2.dilate(processed, kernel, iterations=1)
+    return processed
+
+def find_text_lines(binary, line_height):
+    """
+    Boxes (x, y, w, h) of the text lines in a thresholded crop (dark text on
+    white), top to bottom. A wide closing joins the glyphs of a line into one
+    blob; blobs far from line_height tall (specks, rules, photo edges) are dropped.
+    """
+    ink = cv2.bitwise_not(binary)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, int(line_height * 0.8)), max(1, int(line_height * 0.15))))
+    blobs = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(blobs, connectivity=8)
+
+    boxes = sorted(
+        (int(bx), int(by), int(bw), int(bh)) for bx, by, bw, bh, _ in stats[1:]
+        if line_height * 0.4 <= bh <= line_height * 2.5 and bw >= line_height * 0.5
+    )
+    # words split by a wide gap end up as separate blobs: merge boxes sharing most of their rows
+    lines = []
+    for box in sorted(boxes, key=lambda b: b[1] + b[3] / 2):
+        for i, (lx, ly, lw, lh) in enumerate(lines):
+            overlap = min(ly + lh, box[1] + box[3]) - max(ly, box[1])
+            if overlap > 0.5 * min(lh, box[3]):
+                x0, y0 = min(lx, box[0]), min(ly, box[1])
+                x1, y1 = max(lx + lw, box[0] + box[2]), max(ly + lh, box[1] + box[3])
+                lines[i] = (x0, y0, x1 - x0, y1 - y0)
+                break
+        else:
+            lines.append(box)
+    return sorted(lines, key=lambda b: b[1])
+
+def crop_line(binary, box):
+    x, y, w, h = box
+    H, W = binary.shape[:2]
+    return binary[max(0, y - LINE_PAD):min(H, y + h + LINE_PAD), max(0, x - LINE_PAD):min(W, x + w + LINE_PAD)]
+
+def stack_lines(binary, boxes):
+    """Left-aligned, white-padded stack of the line crops: one compact image for a block ROI."""
+    crops = [crop_line(binary, box) for box in boxes]
+    width = max(c.shape[1] for c in crops)
+    rows = []
+    for c in crops:
+        rows.append(cv2.copyMakeBorder(c, LINE_PAD, LINE_PAD, 0, width - c.shape[1],
+                                       cv2.BORDER_CONSTANT, value=255))
+    return np.vstack(rows)
+
+def localize_text(binary, line_height, psm):
+    """
+    Shrink a thresholded ROI to its text: the most prominent line for psm 7,
+    all lines stacked otherwise. Returns the ROI unchanged when no line is found.
+    """
+    boxes = find_text_lines(binary, line_height)
+    if not boxes:
+        return binary
+    if psm == 7:
+        # lines cut by the ROI's top/bottom edge usually belong to a neighbouring field
+        H = binary.shape[0]
+        inside = [b for b in boxes if b[1] > 0 and b[1] + b[3] < H] or boxes
+        return crop_line(binary, max(inside, key=lambda b: b[2] * b[3]))
+    return stack_lines(binary, boxes)
+
+def read_roi_text(img, roi_rect, key=None):
+    x, y, ww, hh = roi_rect
+    crop = img[y:y+hh, x:x+ww]
+    # If crop degenerate, return empty
+    if crop.size == 0 or crop.shape[0] < 10 or crop.shape[1] < 10:
+        return ""
 
-    text = pytesseract.image_to_string(processed, lang="eng", config="--psm 6")
+    psm = ROI_PSM.get(key, 6)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    line_height = measure_line_height(gray)
+    gray, scale = normalize_text_scale(gray, line_height)
+    processed = threshold_for_ocr(gray)
+    if LINE_LOCALIZATION and line_height:
+        processed = localize_text(processed, line_height * scale, psm)
+    text = pytesseract.image_to_string(processed, lang="eng", config=f"--psm {psm}")
     return text.strip()
 
-def draw_debug_overlays(base, qr_bbox, qr_text, roi_rects, active_keys=None):
-    """Return an image with QR bbox + ROI boxes for debug."""
-    overlay = base.copy()
+@timed("ocr_single_pass")
+def read_rois_single_pass(img, roi_rects):
+    """
+    OCR several ROIs with one tesseract invocation.
+    The union of the ROIs is rescaled, thresholded and passed to image_to_data
+    once; each recognised word is assigned to the ROI containing its box centre.
+    Returns {key: text} for every key in roi_rects.
+    """
+    texts = {k: "" for k in roi_rects}
+    if not roi_rects:
+        return texts
+
+    x0 = min(r[0] for r in roi_rects.values())
+    y0 = min(r[1] for r in roi_rects.values())
+    x1 = max(r[0] + r[2] for r in roi_rects.values())
+    y1 = max(r[1] + r[3] for r in roi_rects.values())
+    crop = img[y0:y1, x0:x1]
+    if crop.size == 0 or crop.shape[0] < 10 or crop.shape[1] < 10:
+        return texts
+
+    gray, scale = normalize_text_scale(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY))
+    processed = threshold_for_ocr(gray)
+    data = pytesseract.image_to_data(
+        processed, lang="eng", config=f"--psm {SINGLE_PASS_PSM}",
+        output_type=pytesseract.Output.DICT,
+    )
+
+    # key -> {(block, par, line): [words]} ; dicts keep tesseract's reading order
+    lines = {k: {} for k in roi_rects}
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        if not word:
+            continue
+        cx = x0 + (data["left"][i] + data["width"][i] / 2.0) / scale
+        cy = y0 + (data["top"][i] + data["height"][i] / 2.0) / scale
+        line_id = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        for k, (rx, ry, rw, rh) in roi_rects.items():
+            if rx <= cx < rx + rw and ry <= cy < ry + rh:
+                lines[k].setdefault(line_id, []).append(word)
+                break
+
+    for k, grouped in lines.items():
+        texts[k] = "\n".join(" ".join(words) for words in grouped.values())
+    return texts
+
+def read_rois(img, roi_rects, mode=None):
+    """OCR a dict of ROI rects using the configured OCR_MODE; returns {key: text}."""
+    mode = mode or OCR_MODE
+    if mode == "single_pass":
+        return read_rois_single_pass(img, roi_rects)
+    keys = list(roi_rects)
+    texts = run_concurrently("roi", [partial(timed_call, f"ocr_{k}", read_roi_text, img, roi_rects[k], k) for k in keys])
+    return dict(zip(keys, texts))
+
+@timed("overlay")
+def draw_debug_overlays(base, qr_bbox, qr_text, roi_rects, active_keys=None, in_place=False):
+    """Return an image with QR bbox + ROI boxes for debug (drawn onto base itself when in_place)."""
+    overlay = base if in_place else base.copy()
 
     # QR overlay
     if qr_bbox is not None and len(qr_bbox) > 0:
@@ -236,75 +792,230 @@ def resize_to_height(img, target_h):
     interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
     return cv2.resize(img, (new_w, target_h), interpolation=interpolation)
 
-def save_side_by_side_output(front_img, back_img):
-    """Create and persist a side-by-side image using the processed front & back."""
+def render_side_by_side(front_img, back_img):
     target_h = max(front_img.shape[0], back_img.shape[0])
     left = resize_to_height(front_img, target_h)
     right = resize_to_height(back_img, target_h)
-    combined = np.hstack((left, right))
+    return np.hstack((left, right))
+
+@timed("composite")
+def save_side_by_side_output(front_img, back_img):
+    """Create and persist a side-by-side image using the processed front & back."""
+    combined = render_side_by_side(front_img, back_img)
 
     filename = unique_name("output", "jpg")
-    path = os.path.join(OUTPUT_DIR, filename)
+    path = output_store.path_for(filename)
     cv2.imwrite(path, combined)
 
-    latest_symlink = os.path.join(OUTPUT_DIR, "latest.jpg")
-    try:
-        shutil.copy(path, latest_symlink)
-    except Exception:
-        pass
+    if OUTPUT_WRITE_LATEST:
+        latest_symlink = os.path.join(OUTPUT_DIR, "latest.jpg")
+        try:
+            shutil.copy(path, latest_symlink)
+        except Exception:
+            pass
 
     return filename, path
 
+_composites = OrderedDict()  # filename -> [created_at, (front, back) or None, jpeg bytes or None]
+_composite_lock = threading.Lock()
+_composite_latest = None
+
+def composite_entry_bytes(entry):
+    if entry[2] is not None:
+        return len(entry[2])
+    return sum(img.nbytes for img in entry[1])
+
+def prune_composites(now):
+    """Drop expired entries, then oldest ones until under the byte cap. Caller holds the lock."""
+    for name in [n for n, e in _composites.items() if now - e[0] > COMPOSITE_CACHE_TTL_SECONDS]:
+        del _composites[name]
+    total = sum(composite_entry_bytes(e) for e in _composites.values())
+    while _composites and total > COMPOSITE_CACHE_MAX_BYTES:
+        _, entry = _composites.popitem(last=False)
+        total -= composite_entry_bytes(entry)
+
+@timed("composite")
+def defer_side_by_side_output(front_img, back_img):
+    """Register a composite to render on first fetch; returns the filename it will be served as."""
+    global _composite_latest
+    filename = unique_name("output", "jpg")
+    now = time.time()
+    with _composite_lock:
+        _composites[filename] = [now, (front_img, back_img), None]
+        _composite_latest = filename
+        prune_composites(now)
+    return filename
+
+def get_composite_jpeg(filename):
+    """
+    JPEG bytes of a deferred composite ("latest.jpg" = most recent), rendered
+    on the first call and memoized; None when unknown or already evicted.
+    """
+    with _composite_lock:
+        if filename == "latest.jpg" and _composite_latest:
+            filename = _composite_latest
+        entry = _composites.get(filename)
+        if entry is None or time.time() - entry[0] > COMPOSITE_CACHE_TTL_SECONDS:
+            return None
+        if entry[2] is not None:
+            return entry[2]
+        front_img, back_img = entry[1]
+
+    started = time.perf_counter()
+    ok, buf = cv2.imencode(".jpg", render_side_by_side(front_img, back_img))
+    metrics.observe("stage_seconds", time.perf_counter() - started, stage="composite_render")
+    if not ok:
+        return None
+    jpeg = buf.tobytes()
+    with _composite_lock:
+        if filename in _composites:
+            _composites[filename][1:] = [None, jpeg]
+    return jpeg
+
 def get_debug_image_or_fallback(debug_files, key, fallback_img):
-    """Attempt to load a debug image; fallback to provided np array."""
+    """Return an in-memory debug image from this request; fallback to provided np array."""
     debug_name = debug_files.get(key) if debug_files else None
     if debug_name:
-        candidate_path = os.path.join(DEBUG_DIR, debug_name)
-        if os.path.exists(candidate_path):
-            debug_img = cv2.imread(candidate_path)
-            if debug_img is not None:
-                return debug_img
+        debug_img = get_debug_array(debug_name)
+        if debug_img is not None:
+            return debug_img
     return fallback_img
 
+def hash_upload(file_storage):
+    """sha256 of an upload's bytes; rewinds the stream so it can still be saved."""
+    h = hashlib.sha256()
+    stream = file_storage.stream
+    for chunk in iter(lambda: stream.read(1 << 20), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+def pipeline_fingerprint():
+    """
+    Settings that change the OCR response; part of every result cache key, so a
+    config change misses entries computed under the old settings. A new knob that
+    affects results belongs here.
+    """
+    config = {
+        "roi": ROI_PERCENTS,
+        "canny": [CANNY_LOW, CANNY_HIGH],
+        "blur": GAUSS_BLUR_KSIZE,
+        "min_card_area": MIN_CARD_AREA_RATIO,
+        "card_aspect": CARD_ASPECT_RANGE,
+        "detect_max_side": DETECT_MAX_SIDE,
+        "fixed_canvas": USE_FIXED_CANVAS,
+        "target_size": TARGET_SIZE,
+        "pdf_dpi": PDF_DPI,
+        "ocr_mode": OCR_MODE,
+        "single_pass_psm": SINGLE_PASS_PSM,
+        "target_line_height": OCR_TARGET_LINE_HEIGHT,
+        "scale_range": OCR_SCALE_RANGE,
+        "scale_tolerance": OCR_SCALE_TOLERANCE,
+        "line_localization": LINE_LOCALIZATION,
+        "line_pad": LINE_PAD,
+        "roi_psm": ROI_PSM,
+        "memory_budget": [OCR_MEMORY_BUDGET_BYTES, PIPELINE_BYTES_PER_PIXEL],
+        "qr_fast_path": QR_FAST_PATH,
+        "side_classifier": SIDE_CLASSIFIER,
+        "side_classifier_width": SIDE_CLASSIFIER_WIDTH,
+        "side_roi_keys": SIDE_ROI_KEYS,
+        "side_qr_regions": SIDE_QR_REGIONS,
+        "qr_block": [QR_BLOCK_SIZE, QR_BLOCK_MIN_INK, QR_BLOCK_MIN_EDGES],
+        "min_text_ink": MIN_TEXT_INK,
+        "debug_level": DEBUG_LEVEL,
+    }
+    return json.dumps(config, sort_keys=True)
+
+def result_cache_key(front_digest, back_digest):
+    if result_cache is None or not front_digest or not back_digest:
+        return None
+    return digest_bytes(front_digest.encode(), back_digest.encode(), pipeline_fingerprint().encode())
+
+def upload_extension(filename):
+    """Normalized extension for an upload; unknown types are treated as jpg."""
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return ext if ext in UPLOAD_EXTENSIONS else "jpg"
+
 def save_uploaded_file(file_storage, prefix):
     """Persist upload using a normalized extension returned as a local path."""
-    ext = os.path.splitext(file_storage.filename or "")[1].lower().lstrip(".")
-    if ext not in {"jpg", "jpeg", "png", "pdf"}:
-        ext = "jpg"
+    ext = upload_extension(file_storage.filename)
 
     safe_name = unique_name(prefix, ext)
     save_path = os.path.join(UPLOAD_DIR, safe_name)
     file_storage.save(save_path)
     return save_path
 
-def persist_output_payload(payload):
-    """Write OCR payload to outputs as JSON and text copies, returning filenames."""
+def stream_size(stream):
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+@timed("upload")
+def read_upload_source(file_storage, prefix, saved_paths):
+    """
+    Turn an upload into a decode source: (bytes, ext) kept in memory, or, above
+    UPLOAD_SPOOL_MAX_BYTES, a path under UPLOAD_DIR (added to saved_paths for cleanup).
+    """
+    if stream_size(file_storage.stream) > UPLOAD_SPOOL_MAX_BYTES:
+        path = save_uploaded_file(file_storage, prefix)
+        saved_paths.append(path)
+        return path
+    data = file_storage.stream.read()
+    file_storage.stream.seek(0)
+    return (data, upload_extension(file_storage.filename))
+
+@timed("persist")
+def persist_output_payload(payload, progress=None):
+    """
+    Persist an OCR payload per OUTPUT_PERSIST. Returns (json_filename, path) for
+    "files", or (None, log path) for "jsonl", where the record id is payload["id"].
+    """
     json_filename = unique_name("ocr", "json")
-    json_path = os.path.join(OUTPUT_DIR, json_filename)
+    if result_log is not None:
+        payload["id"] = json_filename[:-len(".json")]
+        result_log.append(payload)
+        report_progress(progress, "persisted", record=payload["id"])
+        return None, result_log.path
+
+    json_path = output_store.path_for(json_filename)
     serialized = json.dumps(payload, ensure_ascii=False, indent=2)
 
     with open(json_path, "w", encoding="utf-8") as fh:
         fh.write(serialized)
 
-    latest_json = os.path.join(OUTPUT_DIR, "latest.json")
-    latest_txt = os.path.join(OUTPUT_DIR, "latest.txt")
-    try:
-        shutil.copy(json_path, latest_json)
-    except Exception:
-        pass
+    if OUTPUT_WRITE_LATEST:
+        latest_json = os.path.join(OUTPUT_DIR, "latest.json")
+        latest_txt = os.path.join(OUTPUT_DIR, "latest.txt")
+        try:
+            shutil.copy(json_path, latest_json)
+        except Exception:
+            pass
 
-    with open(latest_txt, "w", encoding="utf-8") as fh:
-        fh.write(serialized)
+        with open(latest_txt, "w", encoding="utf-8") as fh:
+            fh.write(serialized)
 
+    report_progress(progress, "persisted", file=json_filename)
     return json_filename, json_path
 
+def output_links(payload, text_filename):
+    """Where a persisted payload can be found: a /outputs URL, or its record id in the JSONL log."""
+    if text_filename:
+        return {"output_text_url": f"/outputs/{text_filename}"}
+    return {"output_text_url": None, "output_record_id": payload.get("id")}
+
+def page_side(result):
+    """The side a page was routed as: the classifier's answer, else back when a QR was seen."""
+    return result.get("side") or ("back" if result.get("qr_detected") else "front")
+
 def extract_demographic_fields(results):
-    """Return name/dob/aadhaar/gender only from pages where QR was not detected."""
+    """Return name/dob/aadhaar/gender only from pages routed as the front."""
     keys = ("name", "dob", "aadhaar", "gender")
     extracted = {key: "" for key in keys}
 
     for result in results:
-        if result.get("qr_detected"):
+        if page_side(result) != "front":
             continue
         fields = result.get("fields", {})
         for key in keys:
@@ -315,9 +1026,9 @@ def extract_demographic_fields(results):
     return extracted
 
 def extract_address_from_results(results):
-    """Return the first available address from pages where QR was detected."""
+    """Return the first available address from pages routed as the back."""
     for result in results:
-        if not result.get("qr_detected"):
+        if page_side(result) != "back":
             continue
         fields = result.get("fields", {})
         address = fields.get("address", "")
@@ -325,80 +1036,771 @@ def extract_address_from_results(results):
             return address
     return ""
 
-def process_page_bgr(bgr):
+@timed("qr")
+def detect_qr(img, region=None):
     """
-    Full pipeline for a single page/image:
-    1) Detect card + warp
-    2) Normalize canvas (optional)
-    3) QR detection
-    4) Conditional ROI OCR (address only if QR; else other fields)
-    5) Debug assets
+    Detect + decode a QR code, only inside region (x%, y%, w%, h%) when given;
+    returns (text, bbox) in img coordinates, with bbox None when nothing was found.
     """
-    debug_assets = {}
+    x, y = 0, 0
+    if region is not None:
+        x, y, w, h = get_roi_pixels(img, region)
+        img = img[y:y + h, x:x + w]
+    qr = cv2.QRCodeDetector()
+    qr_data, qr_bbox, _ = qr.detectAndDecode(img)
+    if qr_bbox is not None and (x or y):
+        qr_bbox = qr_bbox + np.array([x, y], dtype=qr_bbox.dtype)
+    return qr_data, qr_bbox
 
+@timed("classify")
+def classify_card_side(card):
+    """
+    Cheap front/back guess for a warped card, from layout alone:
+      - back:  a QR-like block (dense in dark modules and edges) inside SIDE_QR_REGIONS["back"]
+      - front: no such block, and text in both the name and Aadhaar-number ROIs
+      - back:  no QR-like block, but text only in the address ROI
+    Returns (side or None when unsure, feature dict).
+    """
+    scale = SIDE_CLASSIFIER_WIDTH / float(card.shape[1])
+    small = cv2.resize(card, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else card
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    edges = (cv2.Canny(gray, 50, 150) > 0).astype(np.uint8)
+
+    # windowed densities; the strongest window whose centre lies in the QR region
+    block = max(3, int(gray.shape[0] * QR_BLOCK_SIZE))
+    ink_density = cv2.boxFilter(ink.astype(np.float32), -1, (block, block))
+    edge_density = cv2.boxFilter(edges.astype(np.float32), -1, (block, block))
+    x, y, w, h = get_roi_pixels(gray, SIDE_QR_REGIONS["back"])
+    qr_like = np.where(edge_density[y:y + h, x:x + w] >= QR_BLOCK_MIN_EDGES, ink_density[y:y + h, x:x + w], 0)
+    features = {"qr_block_ink": round(float(qr_like.max()), 3)}
+
+    for key in ("name", "aadhaar", "address"):
+        rx, ry, rw, rh = get_roi_pixels(gray, ROI_PERCENTS[key])
+        features[f"{key}_ink"] = round(float(ink[ry:ry + rh, rx:rx + rw].mean()), 3)
+
+    if features["qr_block_ink"] >= QR_BLOCK_MIN_INK:
+        return "back", features
+    if min(features["name_ink"], features["aadhaar_ink"]) >= MIN_TEXT_INK:
+        return "front", features
+    if features["address_ink"] >= MIN_TEXT_INK and max(features["name_ink"], features["aadhaar_ink"]) < MIN_TEXT_INK:
+        return "back", features
+    return None, features
+
+def scan_page_bgr(bgr, progress=None):
+    """
+    Stages 1-3 of process_page_bgr (warp, normalize, QR) without any OCR.
+    Returns page state for finish_page; qr_fields holds the parsed Aadhaar QR, if any.
+    """
     # 1) Detect & warp
     warped, warp_debug, warp_info = detect_and_warp_card(bgr)
-    debug_assets.update({f"warp_{k}": v for k, v in warp_debug.items()})
+    report_progress(progress, "warped", card_found=warp_info["card_found"])
+    return scan_warped_card(warped, warp_debug, warp_info, progress)
+
+def scan_warped_card(warped, warp_debug, warp_info, progress=None):
+    """Stages 2-3 (normalize, side, QR) for a card that has already been warped."""
+    debug_assets = {f"warp_{k}": v for k, v in warp_debug.items()}
 
     # 2) Normalize
     norm = normalize_canvas(warped)
-    debug_assets["warped_final"] = save_debug(norm, "4_warped_final")
-
-    # 3) QR detection on normalized card
-    qr = cv2.QRCodeDetector()
-    qr_data, qr_bbox, _ = qr.detectAndDecode(norm)
+    add_debug(debug_assets, "warped_final", norm, "4_warped_final")
+
+    # 3) Side classification (only meaningful on a found card), then QR detection
+    # in that side's QR region (the full page for unsure pages)
+    side = None
+    if SIDE_CLASSIFIER and warp_info["card_found"]:
+        side, _ = classify_card_side(norm)
+        report_progress(progress, "side", side=side)
+    qr_data, qr_bbox = detect_qr(norm, SIDE_QR_REGIONS.get(side))
     qr_detected = qr_bbox is not None and len(qr_bbox) > 0
+    report_progress(progress, "qr", qr_detected=bool(qr_detected))
+
+    return {
+        "norm": norm,
+        "debug_assets": debug_assets,
+        "warp_info": warp_info,
+        "side": side,
+        "qr_data": qr_data,
+        "qr_bbox": qr_bbox,
+        "qr_detected": qr_detected,
+        "qr_fields": parse_aadhaar_qr(qr_data) if QR_FAST_PATH and qr_data else None,
+        # norm is the caller's image when no card was found, and a kept debug asset at
+        # the full level; otherwise nothing reads it after OCR, so the overlay may reuse it
+        "norm_private": warp_info["card_found"] and not debug_enabled("full"),
+    }
+
+def finish_page(page, run_ocr=True, progress=None):
+    """Stages 4-5 of process_page_bgr: ROI OCR routed by side (or QR) and the debug overlay."""
+    norm = page["norm"]
+    debug_assets = page["debug_assets"]
+    qr_detected = page["qr_detected"]
 
     # 4) ROI OCR logic
     roi_rects = {k: get_roi_pixels(norm, p) for k, p in ROI_PERCENTS.items()}
 
     fields = {}
-    active_roi_keys = []
-    if qr_detected:
+    if not run_ocr:
+        active_roi_keys = []
+    elif page["side"] is not None:
+        active_roi_keys = [k for k in SIDE_ROI_KEYS[page["side"]] if k in roi_rects]
+    elif qr_detected:
         # only address
         if "address" in roi_rects:
-            fields["address"] = read_roi_text(norm, roi_rects["address"])
-            active_roi_keys.append("address")
+            active_roi_keys = ["address"]
         else:
+            active_roi_keys = []
             fields["note"] = "address ROI not defined"
     else:
         # all except address
-        for k, rect in roi_rects.items():
-            if k == "address":
-                continue
-            fields[k] = read_roi_text(norm, rect)
-            active_roi_keys.append(k)
+        active_roi_keys = [k for k in roi_rects if k != "address"]
+    fields.update(read_rois(norm, {k: roi_rects[k] for k in active_roi_keys}))
+    report_progress(progress, "ocr", rois=active_roi_keys, skipped=not run_ocr)
 
     # 5) Debug overlay combining QR + ROI
-    overlay = draw_debug_overlays(norm, qr_bbox, qr_data, roi_rects, active_roi_keys or None)
-    debug_assets["overlay"] = save_debug(overlay, "5_overlay")
+    if debug_enabled("overlay"):
+        overlay_keys = (active_roi_keys or None) if run_ocr else []
+        overlay = draw_debug_overlays(norm, page["qr_bbox"], page["qr_data"], roi_rects, overlay_keys,
+                                      in_place=page["norm_private"])
+        add_debug(debug_assets, "overlay", overlay, "5_overlay", level="overlay")
 
     result = {
-        "card_found": warp_info["card_found"],
-        "card_reason": warp_info.get("reason", ""),
+        "card_found": page["warp_info"]["card_found"],
+        "card_reason": page["warp_info"].get("reason", ""),
+        "side": page["side"],
         "qr_detected": bool(qr_detected),
-        "qr_data": qr_data if qr_data else "",
+        "qr_data": page["qr_data"] if page["qr_data"] else "",
         "fields": fields,
         "debug_images": debug_assets  # filenames; serve via /debug/<name>
     }
+    if page["qr_fields"]:
+        result["qr_fields"] = page["qr_fields"]
+    if not run_ocr:
+        result["ocr_skipped"] = True
     return result
 
+def process_page_bgr(bgr, progress=None):
+    """
+    Full pipeline for a single page/image:
+    1) Detect card + warp
+    2) Normalize canvas (optional)
+    3) Side classification, then QR detection in that side's region (+ Aadhaar QR parsing when QR_FAST_PATH)
+    4) Conditional ROI OCR (none if the QR parsed; else the side's ROI set, or address only if QR, else the rest)
+    5) Debug assets
+    """
+    page = scan_page_bgr(bgr, progress)
+    return finish_page(page, run_ocr=page["qr_fields"] is None, progress=progress)
+
+def max_input_pixels():
+    """Largest decoded size (pixels) of one request side under OCR_MEMORY_BUDGET_BYTES; 0 = unlimited."""
+    return OCR_MEMORY_BUDGET_BYTES // (2 * PIPELINE_BYTES_PER_PIXEL)
+
+def fit_to_memory_budget(bgr):
+    """Downsample (INTER_AREA) an image larger than max_input_pixels; smaller ones are returned as is."""
+    limit = max_input_pixels()
+    h, w = bgr.shape[:2]
+    if not limit or h * w <= limit:
+        return bgr
+    scale = (limit / float(h * w)) ** 0.5
+    metrics.inc("inputs_downscaled_total")
+    return cv2.resize(bgr, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+def decode_image(data):
+    """
+    imdecode within the memory budget. Oversized images decode straight at
+    the first of 1/2, 1/4 or 1/8 scale that fits (libjpeg scales in the DCT
+    domain, so the full raster is never allocated); fit_to_memory_budget
+    trims anything still too large.
+    """
+    flags = cv2.IMREAD_COLOR
+    limit = max_input_pixels()
+    if limit:
+        try:
+            with Image.open(io.BytesIO(data)) as probe:  # parses the header only
+                w, h = probe.size
+        except Exception:
+            w = h = 0
+        if w * h > limit:
+            flags = cv2.IMREAD_REDUCED_COLOR_8
+            for factor, reduced in ((2, cv2.IMREAD_REDUCED_COLOR_2), (4, cv2.IMREAD_REDUCED_COLOR_4)):
+                if (w // factor) * (h // factor) <= limit:
+                    flags = reduced
+                    break
+    bgr = cv2.imdecode(data, flags)
+    if bgr is None:
+        raise ValueError("Unsupported or corrupted image")
+    return fit_to_memory_budget(bgr)
+
+def pdf_render_dpi(info):
+    """PDF_DPI, lowered when a page of pdfinfo's "Page size" would rasterize past max_input_pixels."""
+    limit = max_input_pixels()
+    try:
+        width_pt, height_pt = (float(v) for v in info["Page size"].split()[0:3:2])
+    except (KeyError, ValueError):
+        return PDF_DPI
+    pixels = (width_pt / 72.0 * PDF_DPI) * (height_pt / 72.0 * PDF_DPI)
+    if not limit or pixels <= limit:
+        return PDF_DPI
+    return max(72, int(PDF_DPI * (limit / pixels) ** 0.5))
+
+def pil_page_to_bgr(page):
+    """Rasterized PDF page -> budget-sized BGR array, without an intermediate writable RGB copy."""
+    rgb = np.asarray(page)  # read-only view over the bytes Pillow exports
+    page.close()
+    return fit_to_memory_budget(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+
 def load_images_from_upload(path):
     """
     For a given saved upload path:
       - If PDF -> convert pages to BGR np arrays
       - If image -> single BGR np array
+    Both are downsampled to fit OCR_MEMORY_BUDGET_BYTES.
     """
     ext = os.path.splitext(path)[1].lower()
     if ext == ".pdf":
-        pages = convert_from_path(path, dpi=300)
-        return [cv2.cvtColor(np.array(p), cv2.COLOR_RGB2BGR)]
+        # front/back uploads only use the first page; don't rasterize the rest
+        dpi = pdf_render_dpi(pdfinfo_from_path(path)) if OCR_MEMORY_BUDGET_BYTES else PDF_DPI
+        pages = convert_from_path(path, dpi=dpi, first_page=1, last_page=1)
+        return [pil_page_to_bgr(pages[0])] if pages else []
     else:
-        data = np.fromfile(path, dtype=np.uint8)
-        bgr = cv2.imdecode(data, cv2.IMREAD_COLOR)
-        if bgr is None:
-            raise ValueError("Unsupported or corrupted image")
-        return [bgr]
+        return [decode_image(np.fromfile(path, dtype=np.uint8))]
+
+def load_images_from_bytes(data, ext):
+    """In-memory twin of load_images_from_upload; a PDF goes through one temp file in PDF_SPOOL_DIR."""
+    if ext == "pdf":
+        with spooled_pdf(data) as tmp:
+            return load_images_from_upload(tmp.name)
+    return [decode_image(np.frombuffer(data, dtype=np.uint8))]
+
+def spooled_pdf(data):
+    """A temp file holding PDF bytes for poppler, removed when closed."""
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", dir=PDF_SPOOL_DIR)
+    tmp.write(data)
+    tmp.flush()
+    return tmp
+
+@timed("decode")
+def load_images_from_source(source):
+    """Decode a source from read_upload_source: a spooled path or (bytes, ext)."""
+    if isinstance(source, str):
+        return load_images_from_upload(source)
+    data, ext = source
+    return load_images_from_bytes(data, ext)
+
+def iter_pdf_pages(path):
+    """
+    Rasterize a PDF one page at a time, so only a single page is ever in memory.
+    The DPI is picked from the first page's size; other page sizes are trimmed after rasterizing.
+    """
+    info = pdfinfo_from_path(path)
+    page_count = min(info["Pages"], DOCUMENT_MAX_PAGES)
+    dpi = pdf_render_dpi(info)
+    for page_number in range(1, page_count + 1):
+        pages = convert_from_path(path, dpi=dpi, first_page=page_number, last_page=page_number)
+        if pages:
+            yield pil_page_to_bgr(pages[0])
+
+def iter_pages_from_source(source):
+    """
+    Lazily yield BGR pages of a document source (see read_upload_source).
+    In-memory PDFs are spooled once for the whole document (see PDF_SPOOL_DIR).
+    """
+    if isinstance(source, str):
+        if source.lower().endswith(".pdf"):
+            yield from iter_pdf_pages(source)
+        else:
+            yield from load_images_from_upload(source)
+        return
+
+    data, ext = source
+    if ext != "pdf":
+        yield from load_images_from_bytes(data, ext)
+        return
+    with spooled_pdf(data) as tmp:
+        yield from iter_pdf_pages(tmp.name)
+
+def card_extracted_fields(result):
+    """extracted-style fields for a single card: from its QR when parsed, else its OCR fields."""
+    source = result.get("qr_fields") or result.get("fields", {})
+    return {key: source.get(key, "") for key in ("name", "dob", "aadhaar", "gender", "address")}
+
+def process_document_page(bgr, progress=None):
+    """Run every card found on one page; falls back to the whole page when no card quad matches."""
+    detect_debug = {}
+    info = {"card_found": False, "reason": ""}
+    with timed_stage("warp"):
+        quads = find_card_quads(bgr, detect_debug, info,
+                                max_cards=DOCUMENT_MAX_CARDS_PER_PAGE,
+                                min_area_ratio=MULTI_CARD_MIN_AREA_RATIO)
+    release_debug_images(detect_debug)
+    if not quads:
+        return [process_page_bgr(bgr, progress)]
+
+    results = []
+    # top-to-bottom, then left-to-right, which is how cards are laid out on a scan
+    for quad in sorted(quads, key=lambda q: (round(q[:, 1].min() / (bgr.shape[0] * 0.1)), q[:, 0].min())):
+        warp_debug = {}
+        warp_info = {"card_found": False, "reason": ""}
+        with timed_stage("warp"):
+            warped = warp_card(bgr, quad, warp_debug, warp_info)
+        card_progress = partial(progress, card=len(results)) if progress else None
+        page = scan_warped_card(warped, warp_debug, warp_info, card_progress)
+        results.append(finish_page(page, run_ocr=page["qr_fields"] is None, progress=card_progress))
+    return results
+
+def process_document(source, progress=None):
+    """Stream a document page by page through the card pipeline; returns the response body."""
+    with collect_timings(metrics) as timings:
+        body = run_document(source, progress)
+        body["timings_ms"] = timings.summary_ms()
+    return body
+
+@debug_scope()
+def run_document(source, progress=None):
+    cards = []
+    page_count = 0
+    pages = iter_pages_from_source(source)
+    while True:
+        with timed_stage("decode"):
+            page_bgr = next(pages, None)
+        if page_bgr is None:
+            break
+        page_index = page_count
+        page_count += 1
+        page_progress = partial(progress, page=page_index) if progress else None
+        page_results = process_document_page(page_bgr, page_progress)
+        del page_bgr
+        report_progress(progress, "page_done", page=page_index, cards=len(page_results))
+        for card_index, result in enumerate(page_results):
+            release_debug_images(result.get("debug_images"))
+            cards.append({
+                "page": page_index,
+                "card": card_index,
+                "extracted": card_extracted_fields(result),
+                **result,
+            })
+
+    record_card_metrics(cards)
+    payload = {"timestamp": int(time.time()), "pages": page_count, "cards": cards}
+    text_filename, _ = persist_output_payload(payload, progress)
+    return {
+        "pages": page_count,
+        "card_count": len(cards),
+        "cards": cards,
+        **output_links(payload, text_filename),
+    }
+
+@debug_scope()
+def process_card_pair(front_bgr, back_bgr, progress=None):
+    """Run the pipeline on a decoded front/back pair, persist outputs and return the response body."""
+    front_progress = partial(progress, side="front") if progress else None
+    back_progress = partial(progress, side="back") if progress else None
+
+    # warp + QR on both sides first, so a parsed Aadhaar QR on either side skips all OCR
+    front_page, back_page = run_concurrently("pages", [
+        partial(scan_page_bgr, front_bgr, front_progress),
+        partial(scan_page_bgr, back_bgr, back_progress),
+    ])
+    qr_fields = front_page["qr_fields"] or back_page["qr_fields"]
+    front_result, back_result = run_concurrently("pages", [
+        partial(finish_page, front_page, run_ocr=qr_fields is None, progress=front_progress),
+        partial(finish_page, back_page, run_ocr=qr_fields is None, progress=back_progress),
+    ])
+
+    try:
+        # default to overlay debug image for combined preview; fallback to raw if missing
+        front_for_output = get_debug_image_or_fallback(front_result.get("debug_images"), "overlay", front_bgr)
+        back_for_output = get_debug_image_or_fallback(back_result.get("debug_images"), "overlay", back_bgr)
+        if LAZY_COMPOSITE:
+            image_filename = defer_side_by_side_output(front_for_output, back_for_output)
+        else:
+            image_filename, _ = save_side_by_side_output(front_for_output, back_for_output)
+        report_progress(progress, "composite", file=image_filename)
+    finally:
+        release_debug_images(front_result.get("debug_images"))
+        release_debug_images(back_result.get("debug_images"))
+
+    if qr_fields:
+        combined_extracted = {key: qr_fields.get(key, "") for key in ("name", "dob", "aadhaar", "gender", "address")}
+        combined_extracted["phone"] = ""
+    else:
+        demographic_fields = extract_demographic_fields([front_result, back_result])
+        address_value = extract_address_from_results([front_result, back_result])
+        combined_extracted = {
+            **demographic_fields,
+            "address": address_value,
+            "phone": "",
+        }
+
+    extraction_source = "qr" if qr_fields else "ocr"
+
+    payload = {
+        "timestamp": int(time.time()),
+        "front": front_result,
+        "back": back_result,
+        "extracted": combined_extracted,
+        "extraction_source": extraction_source,
+    }
+    text_filename, _ = persist_output_payload(payload, progress)
+
+    return {
+        "extracted": combined_extracted,
+        "extraction_source": extraction_source,
+        "front": front_result,
+        "back": back_result,
+        **output_links(payload, text_filename),
+        "output_image_url": f"/outputs/{image_filename}",
+    }
+
+def process_upload_pair(front_source, back_source):
+    """
+    Batch worker entry point: decode a front/back pair and run the pipeline.
+    Runs inside a pool process, so it only takes and returns picklable values.
+    """
+    # metrics live in the parent process; run_batch records these timings there
+    with collect_timings() as timings:
+        front_pages = load_images_from_source(front_source)
+        back_pages = load_images_from_source(back_source)
+        if not front_pages or not back_pages:
+            raise ValueError("Unable to decode one of the provided images.")
+
+        body = process_card_pair(front_pages[0], back_pages[0])
+        body["timings_ms"] = timings.summary_ms()
+    return body
+
+_batch_executor = None
+_hung_pairs = {}  # retired pool -> its pairs past OCR_BATCH_ITEM_TIMEOUT_SECONDS
+
+def init_batch_worker(concurrency):
+    """
+    Pool initializer: cap intra-request threads so workers x threads stays near
+    the core count, and write composites eagerly (a worker's memory is not served).
+    """
+    global OCR_CONCURRENCY, LAZY_COMPOSITE
+    OCR_CONCURRENCY = concurrency
+    LAZY_COMPOSITE = False
+
+def get_batch_executor():
+    """Lazily start the shared worker pool used by the batch endpoint."""
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ProcessPoolExecutor(
+            max_workers=max(1, OCR_BATCH_WORKERS),
+            mp_context=multiprocessing.get_context(OCR_BATCH_START_METHOD),
+            initializer=init_batch_worker,
+            initargs=(OCR_BATCH_WORKER_CONCURRENCY,),
+        )
+    return _batch_executor
+
+def reset_batch_executor(broken=None, terminate=False):
+    """
+    Drop a broken pool (e.g. a worker was OOM-killed) so the next batch gets a fresh one.
+    With `broken`, only that pool is dropped (another batch may already have replaced it);
+    terminate=True also kills its workers, for a pool stuck on a hung pair.
+    """
+    global _batch_executor
+    executor = _batch_executor if broken is None else broken
+    if executor is None:
+        return
+    if terminate:
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+    if _batch_executor is executor:
+        _batch_executor = None
+
+def retire_batch_executor(executor, hung):
+    """
+    Take a pool with a hung pair out of service: the next pair starts a fresh pool, and
+    this one's workers are killed once every other pair on it (of this batch or a
+    concurrent one) has finished, so those are not failed along with the hung one.
+    """
+    global _batch_executor
+    if _batch_executor is executor:
+        _batch_executor = None
+    if executor in _hung_pairs:
+        _hung_pairs[executor].add(hung)
+        return  # already retiring
+    _hung_pairs[executor] = {hung}
+
+    def reap():
+        while any(not item.future.done() and item.future not in _hung_pairs[executor]
+                  for item in list(executor._pending_work_items.values())):
+            time.sleep(0.5)
+        reset_batch_executor(executor, terminate=True)
+        _hung_pairs.pop(executor, None)
+
+    threading.Thread(target=reap, name="ocr-batch-reaper", daemon=True).start()
+
+def submit_batch_pair(pair):
+    """(pool, future) for one pair; a pool a concurrent batch just shut down is replaced first."""
+    executor = get_batch_executor()
+    try:
+        return executor, executor.submit(process_upload_pair, pair["front"], pair["back"])
+    except (BrokenProcessPool, RuntimeError):
+        reset_batch_executor(executor)
+        executor = get_batch_executor()
+        return executor, executor.submit(process_upload_pair, pair["front"], pair["back"])
+
+def split_pair_entry_name(entry_name):
+    """
+    Map a zip entry to (pair_key, side). Accepted layouts:
+      <key>_front.jpg / <key>-back.png   or   <key>/front.jpg
+    Returns None for entries that are not a front/back image.
+    """
+    stem, ext = os.path.splitext(entry_name)
+    if ext.lower().lstrip(".") not in UPLOAD_EXTENSIONS:
+        return None
+    folder, base = os.path.split(stem)
+    lowered = base.lower()
+    if lowered in ("front", "back"):
+        return (folder, lowered) if folder else None
+    for sep in ("_", "-"):
+        key, _, side = lowered.rpartition(sep)
+        if key and side in ("front", "back"):
+            return (os.path.join(folder, base[:len(key)]), side)
+    return None
+
+def save_zip_pairs(file_storage, saved_paths):
+    """
+    Read front/back entries of an uploaded zip, grouped into pairs in archive order.
+    Entries stay in memory unless larger than UPLOAD_SPOOL_MAX_BYTES.
+    """
+    grouped = {}
+    with zipfile.ZipFile(file_storage.stream) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or os.path.basename(info.filename).startswith("."):
+                continue
+            parsed = split_pair_entry_name(info.filename)
+            if parsed is None:
+                continue
+            key, side = parsed
+            if key not in grouped and len(grouped) >= OCR_BATCH_MAX_PAIRS:
+                raise ValueError(f"Batch exceeds {OCR_BATCH_MAX_PAIRS} pairs.")
+
+            ext = upload_extension(info.filename)
+            h = hashlib.sha256()
+            if info.file_size <= UPLOAD_SPOOL_MAX_BYTES:
+                data = archive.read(info)
+                h.update(data)
+                source = (data, ext)
+            else:
+                source = os.path.join(UPLOAD_DIR, unique_name(side, ext))
+                with archive.open(info) as src, open(source, "wb") as dst:
+                    for chunk in iter(lambda: src.read(1 << 20), b""):
+                        h.update(chunk)
+                        dst.write(chunk)
+                saved_paths.append(source)
+            grouped.setdefault(key, {})[side] = source
+            grouped[key][f"{side}_digest"] = h.hexdigest()
+
+    pairs = []
+    for key, sides in grouped.items():
+        pair = {"label": key, "front": sides.get("front"), "back": sides.get("back"),
+                "cache_key": result_cache_key(sides.get("front_digest"), sides.get("back_digest"))}
+        if not pair["front"] or not pair["back"]:
+            pair["error"] = "Pair is missing its front or back image."
+        pairs.append(pair)
+    return pairs
+
+def save_multipart_pairs(saved_paths):
+    """Pair repeated `front`/`back` form fields by position as decode sources."""
+    fronts = request.files.getlist("front")
+    backs = request.files.getlist("back")
+    if len(fronts) != len(backs):
+        raise ValueError("Each front image needs a matching back image (same number of front and back fields).")
+    if len(fronts) > OCR_BATCH_MAX_PAIRS:
+        raise ValueError(f"Batch exceeds {OCR_BATCH_MAX_PAIRS} pairs.")
+
+    pairs = []
+    for index, (front_file, back_file) in enumerate(zip(fronts, backs)):
+        pair = {"label": front_file.filename or str(index), "front": None, "back": None, "cache_key": None}
+        if not front_file.filename or not back_file.filename:
+            pair["error"] = "Uploaded files must include filenames."
+        else:
+            if result_cache is not None:
+                pair["cache_key"] = result_cache_key(hash_upload(front_file), hash_upload(back_file))
+            pair["front"] = read_upload_source(front_file, "front", saved_paths)
+            pair["back"] = read_upload_source(back_file, "back", saved_paths)
+        pairs.append(pair)
+    return pairs
+
+def remove_uploads(paths):
+    for path in paths:
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+def extract_pair(front_source, back_source, cache_key=None, progress=None):
+    """Decode + process one front/back pair, storing the response in the result cache."""
+    with collect_timings(metrics) as timings:
+        front_pages = load_images_from_source(front_source)
+        back_pages = load_images_from_source(back_source)
+        if not front_pages or not back_pages:
+            raise ValueError("Unable to decode one of the provided images.")
+        report_progress(progress, "decoded")
+
+        response_body = process_card_pair(front_pages[0], back_pages[0], progress)
+        record_card_metrics([response_body["front"], response_body["back"]])
+        if cache_key:
+            result_cache.put(cache_key, response_body)
+        response_body["cache_hit"] = False
+        response_body["timings_ms"] = timings.summary_ms()
+    return response_body
+
+def record_card_metrics(results):
+    """Count card_found / QR outcomes for processed card results (cache hits are not counted)."""
+    for result in results:
+        metrics.inc("cards_total", found=str(bool(result.get("card_found"))).lower())
+        if result.get("qr_fields"):
+            qr_outcome = "parsed"
+        elif result.get("qr_detected"):
+            qr_outcome = "detected"
+        else:
+            qr_outcome = "none"
+        metrics.inc("qr_total", outcome=qr_outcome)
+        metrics.inc("sides_total", side=result.get("side") or "unknown")
+
+def cache_lookup(cache_key):
+    """result_cache.get that also counts the outcome for /metrics; links to files that are gone are dropped."""
+    cached = result_cache.get(cache_key)
+    metrics.inc("cache_lookups_total", outcome="hit" if cached is not None else "miss")
+    if cached is not None:
+        drop_expired_links(cached)
+    return cached
+
+def composite_available(filename):
+    """True while /outputs/<filename> can still be served (a live deferred composite or a file on disk)."""
+    with _composite_lock:
+        entry = _composites.get(filename)
+        if entry is not None and time.time() - entry[0] <= COMPOSITE_CACHE_TTL_SECONDS:
+            return True
+    return os.path.exists(os.path.join(OUTPUT_DIR, output_store.relative_path(filename)))
+
+def drop_expired_links(body):
+    """
+    A cached body outlives its images: deferred composites expire after
+    COMPOSITE_CACHE_TTL_SECONDS and debug/output files are swept, while cache
+    entries live longer (and on disk, across restarts). Null out the URLs and
+    debug filenames that would now 404.
+    """
+    image_url = body.get("output_image_url")
+    if image_url and not composite_available(image_url.rsplit("/", 1)[-1]):
+        body["output_image_url"] = None
+    text_url = body.get("output_text_url")
+    if text_url and not os.path.exists(os.path.join(OUTPUT_DIR, output_store.relative_path(text_url.rsplit("/", 1)[-1]))):
+        body["output_text_url"] = None
+    for side in ("front", "back"):
+        debug_files = (body.get(side) or {}).get("debug_images")
+        if debug_files:
+            body[side]["debug_images"] = {
+                key: name for key, name in debug_files.items()
+                if get_debug_array(name) is not None
+                or os.path.exists(os.path.join(DEBUG_DIR, debug_store.relative_path(name)))
+            }
+
+def read_batch_pairs(saved_paths):
+    """Batch pairs from the current request: an `archive` zip or repeated front/back fields."""
+    archive_file = request.files.get("archive")
+    if archive_file is not None and archive_file.filename:
+        try:
+            return save_zip_pairs(archive_file, saved_paths)
+        except zipfile.BadZipFile:
+            raise ValueError("The archive field is not a valid zip file.")
+    return save_multipart_pairs(saved_paths)
+
+def run_batch(pairs, progress=None):
+    """
+    Run batch pairs on the worker pool (cache hits skipped) and build the batch response.
+    Pairs are handed over one per worker at a time, so a pair's OCR_BATCH_ITEM_TIMEOUT_SECONDS
+    runs from about when a worker picks it up rather than from the start of the batch.
+    """
+    started = time.perf_counter()
+    results = [None] * len(pairs)
+    todo = deque()
+
+    def finish(item):
+        if not item["success"]:
+            metrics.inc("errors_total", source="batch_item")
+        results[item["index"]] = item
+        report_progress(progress, "item", index=item["index"], success=item["success"],
+                        completed=sum(1 for r in results if r is not None), total=len(pairs))
+
+    def collect(index, future, executor):
+        item = {"index": index, "label": pairs[index]["label"]}
+        try:
+            body = future.result()
+            metrics.observe_stages({k: v / 1000 for k, v in body["timings_ms"].items() if k != "total"})
+            record_card_metrics([body["front"], body["back"]])
+            if pairs[index].get("cache_key"):
+                result_cache.put(pairs[index]["cache_key"], {k: v for k, v in body.items() if k != "timings_ms"})
+            item.update(body)
+            item.update({"success": True, "cache_hit": False})
+        except BrokenProcessPool as e:
+            print("❌ OCR worker pool broke:", e)
+            reset_batch_executor(executor)
+            item.update({"success": False, "error": "OCR worker crashed while processing this pair."})
+        except CancelledError:
+            item.update({"success": False, "error": "OCR worker pool was replaced before this pair ran."})
+        except Exception as e:
+            print(f"❌ OCR Error (pair {index}):", e)
+            item.update({"success": False, "error": str(e)})
+        return item
+
+    for index, pair in enumerate(pairs):
+        item = {"index": index, "label": pair["label"]}
+        hit = cache_lookup(pair["cache_key"]) if pair.get("cache_key") and not pair.get("error") else None
+        if hit is not None:
+            item.update(hit)
+            item.update({"success": True, "cache_hit": True})
+            finish(item)
+        elif pair.get("error"):
+            item.update({"success": False, "error": pair["error"]})
+            finish(item)
+        else:
+            todo.append(index)
+
+    in_flight = {}  # future -> (index, deadline, pool)
+    while todo or in_flight:
+        while todo and len(in_flight) < max(1, OCR_BATCH_WORKERS):
+            index = todo.popleft()
+            executor, future = submit_batch_pair(pairs[index])
+            in_flight[future] = (index, time.monotonic() + OCR_BATCH_ITEM_TIMEOUT_SECONDS, executor)
+        next_deadline = min(deadline for _, deadline, _ in in_flight.values())
+        wait(in_flight, timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for future, (index, deadline, executor) in list(in_flight.items()):
+            if future.done():
+                del in_flight[future]
+                finish(collect(index, future, executor))
+            elif now >= deadline:
+                del in_flight[future]
+                print(f"❌ OCR pair {index} still running after {OCR_BATCH_ITEM_TIMEOUT_SECONDS:g}s; "
+                      "retiring its worker pool")
+                retire_batch_executor(executor, future)
+                finish({"index": index, "label": pairs[index]["label"], "success": False,
+                        "error": "OCR timed out while processing this pair."})
+    elapsed = time.perf_counter() - started
+
+    succeeded = sum(1 for item in results if item["success"])
+    return {
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "cache_hits": sum(1 for item in results if item.get("cache_hit")),
+        "workers": max(1, OCR_BATCH_WORKERS),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "pairs_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+        "results": results,
+    }
+
+job_manager = JobManager(
+    workers=OCR_JOB_WORKERS,
+    max_queued=OCR_JOB_MAX_QUEUED,
+    retention_seconds=OCR_JOB_RETENTION_SECONDS,
+    thread_name_prefix="ocr-job",
+)
 
 # ========= Routes =========
 
@@ -413,83 +1815,287 @@ def extract_text():
     if not front_file.filename or not back_file.filename:
         return jsonify({"error": "Uploaded files must include filenames."}), 400
 
-    front_path = save_uploaded_file(front_file, "front")
-    back_path = save_uploaded_file(back_file, "back")
+    saved_paths = []
+    try:
+        # one collector for the whole request, so timings_ms includes the upload read
+        with collect_timings(metrics) as timings:
+            cache_key = None
+            if result_cache is not None:
+                cache_key = result_cache_key(hash_upload(front_file), hash_upload(back_file))
+                cached = cache_lookup(cache_key)
+                if cached is not None:
+                    cached["cache_hit"] = True
+                    cached["timings_ms"] = timings.summary_ms()
+                    return jsonify(cached)
+
+            front_source = read_upload_source(front_file, "front", saved_paths)
+            back_source = read_upload_source(back_file, "back", saved_paths)
+            return jsonify(extract_pair(front_source, back_source, cache_key))
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    except Exception as e:
+        print("❌ OCR Error:", e)
+        return jsonify({"error": str(e)}), 500
+
+    finally:
+        remove_uploads(saved_paths)
+
+@app.route("/api/ocr/extract-batch", methods=["POST"])
+def extract_batch():
+    """
+    Many front/back pairs in one request, processed on the worker pool.
+    Accepts either repeated form fields (front, back, front, back, ...) or
+    a zip in the `archive` field. Results come back per pair, in order.
+    """
+    saved_paths = []
     try:
-        front_pages = load_images_from_upload(front_path)
-        back_pages = load_images_from_upload(back_path)
+        try:
+            pairs = read_batch_pairs(saved_paths)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        if not front_pages or not back_pages:
-            return jsonify({"error": "Unable to decode one of the provided images."}), 400
+        if not pairs:
+            return jsonify({"error": "No card pairs found (fields: front, back; or archive=<zip>)."}), 400
 
-        front_bgr = front_pages[0]
-        back_bgr = back_pages[0]
+        return jsonify(run_batch(pairs))
 
-        front_result = process_page_bgr(front_bgr)
-        back_result = process_page_bgr(back_bgr)
+    finally:
+        remove_uploads(saved_paths)
 
-        # default to overlay debug image for combined preview; fallback to raw if missing
-        front_for_output = get_debug_image_or_fallback(front_result.get("debug_images"), "overlay", front_bgr)
-        back_for_output = get_debug_image_or_fallback(back_result.get("debug_images"), "overlay", back_bgr)
-        image_filename, _ = save_side_by_side_output(front_for_output, back_for_output)
+@app.route("/api/ocr/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queue OCR work and return immediately with a job id.
+    form-data: kind=pair (front, back) | batch (like extract-batch) | document (file)
+    """
+    kind = request.form.get("kind", "pair")
+    saved_paths = []
+    try:
+        if kind == "pair":
+            front_file = request.files.get("front")
+            back_file = request.files.get("back")
+            if front_file is None or back_file is None or not front_file.filename or not back_file.filename:
+                raise ValueError("Both front and back images are required (fields: front, back).")
+            cache_key = None
+            if result_cache is not None:
+                cache_key = result_cache_key(hash_upload(front_file), hash_upload(back_file))
+            sources = (read_upload_source(front_file, "front", saved_paths),
+                       read_upload_source(back_file, "back", saved_paths))
+            work = lambda progress: extract_pair(*sources, cache_key=cache_key, progress=progress)
+        elif kind == "batch":
+            pairs = read_batch_pairs(saved_paths)
+            if not pairs:
+                raise ValueError("No card pairs found (fields: front, back; or archive=<zip>).")
+            work = partial(run_batch, pairs)
+        elif kind == "document":
+            upload = request.files.get("file")
+            if upload is None or not upload.filename:
+                raise ValueError("A document is required (field: file).")
+            source = read_upload_source(upload, "document", saved_paths)
+            work = partial(process_document, source)
+        else:
+            raise ValueError(f"Unknown job kind: {kind} (expected pair, batch or document).")
 
-        demographic_fields = extract_demographic_fields([front_result, back_result])
-        address_value = extract_address_from_results([front_result, back_result])
-        combined_extracted = {
-            **demographic_fields,
-            "address": address_value,
-            "phone": "",
-        }
+        job_id = job_manager.submit(kind, work, cleanup=partial(remove_uploads, list(saved_paths)))
+        saved_paths = []  # the job owns its spooled uploads now
 
-        payload = {
-            "timestamp": int(time.time()),
-            "front": front_result,
-            "back": back_result,
-            "extracted": combined_extracted,
-        }
-        text_filename, _ = persist_output_payload(payload)
-
-        response_body = {
-            "extracted": combined_extracted,
-            "front": front_result,
-            "back": back_result,
-            "output_text_url": f"/outputs/{text_filename}",
-            "output_image_url": f"/outputs/{image_filename}",
-        }
-        return jsonify(response_body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e), "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+
+    finally:
+        remove_uploads(saved_paths)
+
+    return jsonify({
+        "job_id": job_id,
+        "kind": kind,
+        "status_url": f"/api/ocr/jobs/{job_id}",
+        "events_url": f"/api/ocr/jobs/{job_id}/events",
+    }), 202
+
+@app.route("/api/ocr/jobs/<job_id>")
+def get_job(job_id):
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired job id."}), 404
+    return jsonify(status)
+
+@app.route("/api/ocr/jobs/<job_id>/events")
+def stream_job_events(job_id):
+    """Server-sent events: one `progress` event per stage, then `done` or `failed`."""
+    if job_manager.status(job_id, include_result=False) is None:
+        return jsonify({"error": "Unknown or expired job id."}), 404
+    after = request.headers.get("Last-Event-ID", request.args.get("after", "0"))
+    after = int(after) if str(after).isdigit() else 0
+
+    def generate():
+        for event in job_manager.events(job_id, after=after):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            name = event["stage"] if event["stage"] in ("done", "failed") else "progress"
+            yield f"id: {event['seq']}\nevent: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/api/ocr/extract-document", methods=["POST"])
+def extract_document():
+    """
+    One PDF or image (field: file) that may hold several pages and several
+    cards per page. Pages are rasterized and processed one at a time.
+    """
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "A document is required (field: file)."}), 400
+
+    saved_paths = []
+    try:
+        source = read_upload_source(upload, "document", saved_paths)
+        return jsonify(process_document(source))
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     except Exception as e:
         print("❌ OCR Error:", e)
         return jsonify({"error": str(e)}), 500
 
     finally:
-        for path in (front_path, back_path):
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
+        remove_uploads(saved_paths)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    storage_sweeper.ensure_started()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or "unmatched"
+    metrics.inc("requests_total", endpoint=endpoint, status=str(response.status_code))
+    if response.status_code >= 500:
+        metrics.inc("errors_total", source=endpoint)
+    started = g.get("request_started")
+    if started is not None and endpoint != "get_metrics":
+        metrics.observe("request_seconds", time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus text exposition of request, stage, card/QR, cache and job metrics."""
+    if result_cache is not None:
+        stats = result_cache.snapshot()
+        metrics.set("cache_entries", stats["memory_entries"], tier="memory")
+        if stats["disk_entries"] is not None:
+            metrics.set("cache_entries", stats["disk_entries"], tier="disk")
+    for area, stats in storage_sweeper.snapshot().items():
+        metrics.set("storage_bytes", stats["bytes"], area=area)
+        metrics.set("storage_evicted_files", stats["evicted_files"], area=area)
+    job_states = job_manager.snapshot()["jobs"]
+    for state in ("queued", "running", "done", "failed"):
+        metrics.set("jobs", job_states.get(state, 0), state=state)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/ocr/storage-stats")
+def get_storage_stats():
+    return jsonify({"persist": OUTPUT_PERSIST, "areas": storage_sweeper.snapshot()})
+
+@app.route("/api/ocr/cache-stats")
+def get_cache_stats():
+    if result_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **result_cache.snapshot()})
 
 @app.route("/debug/<path:filename>")
 def get_debug_file(filename):
-    return send_from_directory(DEBUG_DIR, filename)
+    relative = debug_store.relative_path(filename)
+    if not os.path.exists(os.path.join(DEBUG_DIR, relative)):
+        # background write may still be pending; serve the in-memory copy
+        img = get_debug_array(filename)
+        if img is not None:
+            ok, buf = cv2.imencode(".jpg", img)
+            if ok:
+                return Response(buf.tobytes(), mimetype="image/jpeg")
+    return send_from_directory(DEBUG_DIR, relative)
 
 @app.route("/outputs/<path:filename>")
 def get_output_file(filename):
-    return send_from_directory(OUTPUT_DIR, filename)
+    jpeg = get_composite_jpeg(filename)
+    if jpeg is not None:
+        return Response(jpeg, mimetype="image/jpeg")
+    return send_from_directory(OUTPUT_DIR, output_store.relative_path(filename))
 
 @app.route("/")
 def home():
     return jsonify({
         "message": "✅ OCR backend running (card warp + QR-conditional ROI + % ROIs)",
         "usage": "POST /api/ocr/extract with form-data: front=<image>, back=<image>",
+        "document_usage": "POST /api/ocr/extract-document with form-data: file=<multi-page PDF or image>",
+        "jobs_usage": "POST /api/ocr/jobs with kind=pair|batch|document (+ files); poll /api/ocr/jobs/<id> or stream /api/ocr/jobs/<id>/events",
+        "batch_usage": "POST /api/ocr/extract-batch with repeated front/back fields or archive=<zip of <id>_front/<id>_back>",
         "debug_view": "GET /debug/<filename> from debug_images in response",
-        "output_view": "GET /outputs/<filename> for combined previews or JSON dumps"
+        "output_view": "GET /outputs/<filename> for combined previews or JSON dumps",
+        "metrics": "GET /metrics (Prometheus); each OCR response also carries timings_ms per stage"
     })
 
+# ========= Production serving =========
+
+def warm_up(debug_level="off"):
+    """Run a synthetic card through the pipeline once (tesseract, QR detector, thread pools)."""
+    print("🔎", pytesseract.get_tesseract_version())
+    scene = np.full((900, 1200, 3), 60, dtype=np.uint8)
+    cv2.rectangle(scene, (110, 140), (1090, 760), (255, 255, 255), -1)
+    cv2.putText(scene, "WARM UP 1234 5678", (380, 470), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
+    token = _call_debug_level.set(debug_level)  # this call only: DEBUG_LEVEL is shared with requests
+    try:
+        with debug_scope():
+            finish_page(scan_page_bgr(scene))
+    finally:
+        _call_debug_level.reset(token)
+
+def prepare_workers(count):
+    """
+    Settings for running as `count` pre-forked processes behind one port. The
+    next request may land on any sibling, so in-memory-only state must be shared:
+    previews are written eagerly and job state is mirrored to JOB_STATE_DIR.
+    """
+    global LAZY_COMPOSITE
+    if count > 1:
+        LAZY_COMPOSITE = False
+        job_manager.share_state(JOB_STATE_DIR)
+        storage_sweeper.areas.append(
+            StorageArea("jobs", JOB_STATE_DIR, max_age_seconds=OCR_JOB_RETENTION_SECONDS, hashed=False))
+
+def drain_worker():
+    """Shutdown hook: let queued/running async jobs finish, then flush pending writes."""
+    if not job_manager.drain(SERVE_GRACEFUL_TIMEOUT):
+        print("⚠️ Stopping with OCR jobs still running")
+    reset_batch_executor()
+    flush_debug_writes()
+
+def admission_exempt(path):
+    """Long-lived streams and monitoring never count against the in-flight cap."""
+    return path.endswith("/events") or path in ("/", "/metrics")
+
 # ========= Main =========
-if __name__ == "__main__":
+if __name__ == "__main__" and "--production" in sys.argv:
+    prepare_workers(SERVE_WORKERS)
+    serve(app, SERVE_HOST, SERVE_PORT,
+          workers=SERVE_WORKERS,
+          max_in_flight=SERVE_MAX_IN_FLIGHT,
+          exempt=admission_exempt,
+          warm_up=warm_up,
+          on_shutdown=drain_worker,
+          graceful_timeout=SERVE_GRACEFUL_TIMEOUT,
+          name="OCR backend")
+
+elif __name__ == "__main__":
     # Ensure Tesseract is available (optional soft check)
     # You can uncomment to log version:
     # try:
@@ -0,0 +1,208 @@
+"""
+Production serving for the Flask backends, instead of the debug server + reloader.
+
+  - serve(): binds one listening socket, forks `workers` processes that each
+    run a threaded werkzeug server on it, restarts workers that die, and on
+    SIGTERM/SIGINT lets every worker finish its in-flight requests before exiting.
+    Each worker runs `warm_up` before accepting connections and `on_shutdown`
+    after draining. Without os.fork (Windows) it serves in-process.
+  - AdmissionControl: WSGI middleware capping in-flight requests per worker;
+    over the cap it answers 429 with Retry-After instead of queueing.
+"""
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+
+class AdmissionControl:
+    def __init__(self, app, max_in_flight, retry_after=1, exempt=None):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.exempt = exempt or (lambda path: False)
+        self.in_flight = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        if self.max_in_flight <= 0 or self.exempt(environ.get("PATH_INFO", "")):
+            return self.app(environ, start_response)
+        with self._cond:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                return self._reject(start_response)
+            self.in_flight += 1
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._release()
+            raise
+        return ClosingIterator(body, self._release)
+
+    def _reject(self, start_response):
+        payload = json.dumps({"error": "Server is busy, retry shortly.", "retry_after": self.retry_after}).encode()
+        start_response("429 Too Many Requests", [
+            ("Content-Type", "application/json"),
+            ("Content-Length", str(len(payload))),
+            ("Retry-After", str(self.retry_after)),
+        ])
+        return [payload]
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout):
+        """Block until no request is in flight (or timeout); True when drained."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+
+class ClosingIterator:
+    """Response iterable that runs `on_close` once the server is done with it (streams included)."""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._iter = iter(body)
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iter)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._on_close()
+
+
+def serve(app, host, port, workers=1, max_in_flight=0, exempt=None, warm_up=None,
+          on_shutdown=None, graceful_timeout=30, name="backend"):
+    """Run `app` until SIGTERM/SIGINT. See the module docstring."""
+    admission = AdmissionControl(app, max_in_flight, exempt=exempt)
+
+    listener = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(256)
+    listener.set_inheritable(True)
+    print(f"🚀 {name} serving on {host}:{port} with {workers} worker(s), "
+          f"max {max_in_flight or 'unlimited'} in-flight request(s) each")
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        run_worker(listener, host, port, admission, warm_up, on_shutdown, graceful_timeout)
+        return
+
+    children = {}
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                run_worker(listener, host, port, admission, warm_up, on_shutdown, graceful_timeout)
+                code = 0
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    while not stopping.is_set():
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in children:
+            started = children.pop(pid)
+            print(f"⚠️ Worker {pid} exited (status {status}), restarting")
+            if time.monotonic() - started < 1:
+                time.sleep(1)  # don't spin if workers die on startup
+            spawn()
+        else:
+            stopping.wait(0.5)
+
+    print(f"⏹️  Shutting down {len(children)} worker(s), waiting up to {graceful_timeout}s for in-flight work")
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + graceful_timeout + 5
+    while children and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            children.pop(pid, None)
+        else:
+            time.sleep(0.1)
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    listener.close()
+
+
+def run_worker(listener, host, port, admission, warm_up, on_shutdown, graceful_timeout):
+    """One worker: warm up, serve on the shared socket, then drain and shut down on a signal."""
+    if warm_up is not None:
+        started = time.perf_counter()
+        try:
+            warm_up()
+            print(f"🔥 Worker {os.getpid()} warmed up in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"⚠️ Worker {os.getpid()} warm-up failed (serving anyway):", e)
+
+    server = make_server(host, port, admission, threaded=True, fd=listener.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever to return, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        if not admission.wait_idle(graceful_timeout):
+            print(f"⚠️ Worker {os.getpid()} stopped with {admission.in_flight} request(s) still in flight")
+        if on_shutdown is not None:
+            try:
+                on_shutdown()
+            except Exception as e:
+                print(f"⚠️ Worker {os.getpid()} shutdown hook failed:", e)
+        server.server_close()
+        sys.stdout.flush()
@@ -0,0 +1,93 @@
+"""
+Step fusion: runs of consecutive `type` steps are filled with one execute_script
+round trip instead of a wait/find, clear and send_keys per field.
+
+  - plan(steps) splits a workflow into single steps and batches of fusable steps
+  - fill_fields() sets each field's value through the native value setter (so
+    React/Vue inputs see it) and dispatches input + change events; it stops at
+    the first field that is missing, hidden, disabled or not a text field and
+    reports how many were filled, so the caller runs the rest step by step
+  - count_round_trips() counts a driver's WebDriver commands, for reporting
+
+A fused field gets no key events. Steps whose text holds special keys (Enter,
+Tab, ... via selenium Keys), or with config.fuse = false, or a wait_after, are
+never fused.
+"""
+
+MAX_BATCH = 25
+
+FILL_SCRIPT = """
+var fields = arguments[0];
+var textTypes = ['', 'text', 'email', 'password', 'search', 'tel', 'url', 'number', 'date',
+                 'datetime-local', 'month', 'time', 'week'];
+for (var i = 0; i < fields.length; i++) {
+  var el = document.evaluate(fields[i][0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  if (!el) return {done: i, error: 'element not found'};
+  var tag = el.tagName.toLowerCase();
+  if (!(tag === 'textarea' || (tag === 'input' && textTypes.indexOf((el.getAttribute('type') || '').toLowerCase()) >= 0)))
+    return {done: i, error: 'not a text field'};
+  var rect = el.getBoundingClientRect();
+  if (el.disabled || el.readOnly || !(rect.width || rect.height) || getComputedStyle(el).visibility === 'hidden')
+    return {done: i, error: 'element not interactable'};
+  el.focus();
+  Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value').set.call(el, fields[i][1]);
+  el.dispatchEvent(new Event('input', {bubbles: true}));
+  el.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return {done: fields.length, error: null};
+"""
+
+
+def fusable(step):
+    """A type step with plain text, no wait after it and not opted out."""
+    config = step.get("config") or {}
+    if step.get("type") != "type" or config.get("fuse") is False or config.get("wait_after") not in (None, "none"):
+        return False
+    text = config.get("text", "")
+    if not isinstance(text, str) or not config.get("xpath"):
+        return False
+    # selenium Keys live in the private use area (U+E000..); newlines submit forms
+    return not any(ch in "\n\r\t" or "\ue000" <= ch <= "\uf8ff" for ch in text)
+
+
+def plan(steps, enabled=True):
+    """[(kind, steps)]: ("batch", [2+ fusable steps]) or ("single", [step]), in order."""
+    groups, run = [], []
+
+    def flush():
+        if len(run) > 1:
+            groups.append(("batch", list(run)))
+        else:
+            groups.extend(("single", [step]) for step in run)
+        run.clear()
+
+    for step in steps:
+        if enabled and fusable(step):
+            run.append(step)
+            if len(run) == MAX_BATCH:
+                flush()
+        else:
+            flush()
+            groups.append(("single", [step]))
+    flush()
+    return groups
+
+
+def fill_fields(driver, steps):
+    """Fill the steps' fields in one round trip; returns (filled count, error of the first unfilled one or None)."""
+    fields = [[step["config"]["xpath"], step["config"].get("text", "")] for step in steps]
+    outcome = driver.execute_script(FILL_SCRIPT, fields) or {}
+    return int(outcome.get("done", 0)), outcome.get("error")
+
+
+def count_round_trips(driver):
+    """Count every WebDriver command the driver sends in driver.round_trips."""
+    execute = driver.execute
+    driver.round_trips = 0
+
+    def counted(driver_command, params=None):
+        driver.round_trips += 1
+        return execute(driver_command, params)
+
+    driver.execute = counted
+    return driver
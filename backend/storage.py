@@ -0,0 +1,195 @@
+"""
+Bounded on-disk storage for uploads/, debug/ and outputs/.
+
+  - StorageArea: one directory with optional size and age caps. Files go into
+    two-hex-char hashed subdirectories (256 buckets) so no directory grows huge;
+    sweep() evicts expired files, then the oldest until under the size cap.
+  - StorageSweeper: a background thread sweeping every area on an interval.
+  - JsonlLog: an append-only JSON-lines log with size-based rotation, for
+    persisting results without one file per request.
+
+Sweeps rescan the directories instead of keeping an index, because batch
+worker processes write into the same areas.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class StorageArea:
+    def __init__(self, name, root, max_bytes=0, max_age_seconds=0, hashed=True, keep_prefixes=()):
+        self.name = name
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hashed = hashed
+        self.keep_prefixes = tuple(keep_prefixes)
+        self.stats = {"evicted_files": 0, "evicted_bytes": 0, "files": 0, "bytes": 0, "last_sweep": None}
+        self._made_dirs = set()
+        os.makedirs(root, exist_ok=True)
+
+    def bucket(self, filename):
+        return hashlib.sha1(filename.encode("utf-8")).hexdigest()[:2] if self.hashed else ""
+
+    def relative_path(self, filename):
+        """Where filename lives under root: its hashed bucket, or root itself for legacy flat files."""
+        bucket = self.bucket(filename)
+        if bucket and not os.path.exists(os.path.join(self.root, filename)):
+            return f"{bucket}/{filename}"
+        return filename
+
+    def path_for(self, filename):
+        """Absolute path to write filename to (its bucket directory is created on first use)."""
+        bucket = self.bucket(filename)
+        directory = os.path.join(self.root, bucket) if bucket else self.root
+        if directory not in self._made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._made_dirs.add(directory)
+        return os.path.join(directory, filename)
+
+    # ----- eviction -----
+
+    def _is_bucket(self, name):
+        return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+    def _scan(self):
+        """(mtime, size, path) for every evictable file: top-level files plus bucket contents."""
+        files = []
+        directories = [self.root]
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if self.hashed and entry.is_dir(follow_symlinks=False) and self._is_bucket(entry.name):
+                    directories.append(entry.path)
+        for directory in directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if not entry.is_file(follow_symlinks=False) or entry.name.startswith(self.keep_prefixes):
+                            continue
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        files.append((st.st_mtime, st.st_size, entry.path))
+            except OSError:
+                continue
+        return files
+
+    def sweep(self, now=None):
+        """Evict expired files, then oldest files down to 90% of max_bytes. Returns (files, bytes) removed."""
+        now = now or time.time()
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        doomed = []
+        if self.max_age_seconds:
+            doomed = [f for f in files if now - f[0] > self.max_age_seconds]
+        if self.max_bytes and total > self.max_bytes:
+            remaining = total - sum(size for _, size, _ in doomed)
+            doomed_set = set(doomed)
+            for f in files:
+                if remaining <= self.max_bytes * 0.9:
+                    break
+                if f not in doomed_set:
+                    doomed.append(f)
+                    remaining -= f[1]
+
+        removed_files = removed_bytes = 0
+        for _, size, path in doomed:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed_files += 1
+            removed_bytes += size
+        self.stats.update({
+            "files": len(files) - removed_files,
+            "bytes": total - removed_bytes,
+            "last_sweep": int(now),
+        })
+        self.stats["evicted_files"] += removed_files
+        self.stats["evicted_bytes"] += removed_bytes
+        return removed_files, removed_bytes
+
+    def snapshot(self):
+        return {"root": self.root, "max_bytes": self.max_bytes, "max_age_seconds": self.max_age_seconds, **self.stats}
+
+
+class StorageSweeper:
+    def __init__(self, areas, interval_seconds=60):
+        self.areas = list(areas)
+        self.interval_seconds = interval_seconds
+        self._started_pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the sweep thread once per process (batch workers never call this)."""
+        with self._lock:
+            if self._started_pid == os.getpid() or self.interval_seconds <= 0:
+                return
+            self._started_pid = os.getpid()
+        threading.Thread(target=self._loop, name="storage-sweeper", daemon=True).start()
+
+    def sweep_all(self):
+        for area in self.areas:
+            try:
+                removed, freed = area.sweep()
+            except OSError as e:
+                print(f"⚠️ Storage sweep of {area.name} failed:", e)
+                continue
+            if removed:
+                print(f"🧹 Evicted {removed} files ({freed // 1024} KB) from {area.name}")
+
+    def _loop(self):
+        while True:
+            self.sweep_all()
+            time.sleep(self.interval_seconds)
+
+    def snapshot(self):
+        return {area.name: area.snapshot() for area in self.areas}
+
+
+class JsonlLog:
+    """
+    One JSON object per line, rotated to path.1 .. path.N once path exceeds max_bytes.
+    Each record is a single O_APPEND write, so batch worker processes can share
+    the file; a record racing a rotation simply lands in path.1.
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def append(self, record):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if self.max_bytes and size > self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) <= self.max_bytes:
+                    return  # another writer rotated already
+            except OSError:
+                return
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            try:
+                if self.backups > 0:
+                    os.replace(self.path, f"{self.path}.1")
+                else:
+                    os.remove(self.path)
+            except FileNotFoundError:
+                pass
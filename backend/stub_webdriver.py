@@ -0,0 +1,324 @@
+"""
+A local stand-in for a Selenium node, for exercising the automation backend
+without Docker or a browser. It speaks enough of the W3C WebDriver protocol
+for the step types the backend uses (navigate, find/click/type, execute,
+cookies, windows, screenshots); pages are simulated, not rendered.
+
+Usage (from backend/):
+    python stub_webdriver.py [--port 4444] [--latency-ms 20] [--max-sessions 4]
+    SELENIUM_URLS=http://localhost:4444,http://localhost:4445 python app_selenium_live.py
+
+--latency-ms is added to every command to stand in for a real browser
+round trip; --max-sessions is the node's slot count (like SE_NODE_MAX_SESSIONS).
+An XPath containing "missing" is never found, so failure paths can be tried
+(a find for it sits out the session's implicit wait first, as a browser would);
+one containing "disabled" is found but rejects typing (element not interactable).
+--settle-ms is how long a page keeps "changing" after a navigation, click or
+keystroke, as seen by the backend's wait probe (DOM quiet / network idle).
+
+Logins are simulated: clicking an element whose XPath mentions "submit" after
+typing into one that mentions "password" sets a "session" cookie (and a
+localStorage token). While no valid session cookie is set, every XPath probe for
+a login field reports it showing. node.revoke_logins() invalidates all sessions.
+"""
+import argparse
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+# 1x1 white PNG
+BLANK_PNG = base64.b64encode(bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010802000000907753de"
+    "0000000c4944415408d763f8ffff3f0005fe02fea7d6a4c40000000049454e44ae426082"
+)).decode()
+
+
+class WebDriverError(Exception):
+    def __init__(self, status, error, message):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+
+
+class StubSession:
+    def __init__(self, node):
+        self.node = node
+        self.id = uuid.uuid4().hex
+        self.url = "about:blank"
+        self.windows = [uuid.uuid4().hex]
+        self.window = self.windows[0]
+        self.cookies = {}        # name -> cookie dict (any domain)
+        self.storage = {}        # localStorage of the current origin
+        self.elements = {}       # element id -> xpath
+        self.values = {}         # xpath -> typed text
+        self.commands = 0
+        self.implicit = 0.0      # seconds a find keeps looking for a missing element
+        self.last_change = time.time()  # of the simulated DOM, for the wait probe
+
+    @property
+    def title(self):
+        return "" if self.url == "about:blank" else f"Stub page: {self.url}"
+
+    def element(self, xpath):
+        if "missing" in xpath:
+            time.sleep(self.implicit)
+            raise WebDriverError(404, "no such element", f"Unable to locate element: {xpath}")
+        element_id = uuid.uuid5(uuid.NAMESPACE_URL, self.id + xpath).hex
+        self.elements[element_id] = xpath
+        return {ELEMENT_KEY: element_id}
+
+    @property
+    def logged_in(self):
+        cookie = self.cookies.get("session")
+        return cookie is not None and cookie.get("value") in self.node.logins
+
+    def log_in_if_submitting(self, xpath):
+        if "submit" in xpath and any("password" in field and text for field, text in self.values.items()):
+            token = uuid.uuid4().hex
+            self.node.logins.add(token)
+            host = self.url.split("/")[2] if "://" in self.url else "localhost"
+            self.cookies["session"] = {"name": "session", "value": token, "path": "/", "domain": host}
+            self.storage["token"] = token
+
+    def xpath_of(self, element_id):
+        if element_id not in self.elements:
+            raise WebDriverError(404, "stale element reference", "Element is no longer attached to the DOM")
+        return self.elements[element_id]
+
+    def execute(self, script, args, settle_ms=0):
+        """Scripts are not run; the few the backend sends get plausible answers."""
+        if "__rpaWait" in script:
+            # the page settles settle_ms after the last action; the probe's quiet time counts from then
+            quiet_ms = (time.time() - self.last_change) * 1000 - settle_ms
+            return {"ready": "complete", "pending": 0 if quiet_ms >= 0 else 1,
+                    "quietMs": max(0.0, quiet_ms), "url": self.url}
+        if "textTypes" in script and args:
+            # step fusion's batched fill: [[xpath, text], ...]
+            for i, (xpath, text) in enumerate(args[0]):
+                if "missing" in xpath:
+                    return {"done": i, "error": "element not found"}
+                if "disabled" in xpath:
+                    return {"done": i, "error": "element not interactable"}
+                self.values[xpath] = text
+                self.last_change = time.time()
+            return {"done": len(args[0]), "error": None}
+        if "isDisplayed" in script:
+            return True
+        if "localStorage.clear" in script:
+            self.storage.clear()
+            return None
+        if "getBoundingClientRect" in script and args:
+            # is a login field showing? only while logged out
+            return not self.logged_in
+        if "sessionStorage" in script and "setItem" in script:
+            self.storage.update((args[0] or {}).get("local") or {})
+            return None
+        if "sessionStorage" in script:
+            return {"local": dict(self.storage), "session": {}}
+        if "readyState" in script:
+            return "complete"
+        return None
+
+
+class StubWebDriver:
+    def __init__(self, latency_ms=0, max_sessions=4, settle_ms=0):
+        self.latency = latency_ms / 1000.0
+        self.settle_ms = settle_ms
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.logins = set()  # valid "session" cookie values
+        self.lock = threading.Lock()
+        self.stats = {"sessions_created": 0, "commands": 0}
+
+    def revoke_logins(self):
+        """Expire every simulated login, as a server restart or logout would."""
+        with self.lock:
+            self.logins.clear()
+
+    def dispatch(self, method, path, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.stats["commands"] += 1
+        parts = [p for p in path.split("/") if p]
+        if parts == ["status"]:
+            with self.lock:
+                free = self.max_sessions - len(self.sessions)
+            return {"ready": free > 0, "message": f"stub node, {free} free slot(s)", "stats": dict(self.stats)}
+        if parts == ["session"] and method == "POST":
+            return self.new_session(body)
+        if len(parts) < 2 or parts[0] != "session":
+            raise WebDriverError(404, "unknown command", f"{method} {path}")
+        with self.lock:
+            session = self.sessions.get(parts[1])
+        if session is None:
+            raise WebDriverError(404, "invalid session id", f"invalid session id: {parts[1]}")
+        session.commands += 1
+        route = "/".join(parts[2:])
+        if not route and method == "DELETE":
+            with self.lock:
+                self.sessions.pop(session.id, None)
+            return None
+        return self.session_command(session, method, route, body)
+
+    def new_session(self, body):
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise WebDriverError(500, "session not created", "Could not start a new session: all slots are busy")
+            session = StubSession(self)
+            self.sessions[session.id] = session
+            self.stats["sessions_created"] += 1
+        capabilities = body.get("capabilities", {}).get("alwaysMatch", {})
+        session.implicit = (capabilities.get("timeouts") or {}).get("implicit", 0) / 1000.0
+        return {"sessionId": session.id, "capabilities": {**capabilities, "browserName": "stub"}}
+
+    def session_command(self, s, method, route, body):
+        if route == "url":
+            if method == "POST":
+                url = body.get("url", "")
+                if not s.url.split("/")[:3] == url.split("/")[:3]:
+                    s.storage = {}
+                s.url = url
+                s.last_change = time.time()
+                return None
+            return s.url
+        if route == "title":
+            return s.title
+        if route == "timeouts" and method == "POST":
+            if "implicit" in body:
+                s.implicit = body["implicit"] / 1000.0
+            return None
+        if route in ("timeouts", "refresh", "back", "forward", "window/maximize", "actions"):
+            return None
+        if route == "screenshot":
+            return BLANK_PNG
+        if route in ("execute/sync", "execute/async"):
+            return s.execute(body.get("script", ""), body.get("args", []), self.settle_ms)
+        if route == "element" and method == "POST":
+            return s.element(body.get("value", ""))
+        if route == "elements" and method == "POST":
+            try:
+                return [s.element(body.get("value", ""))]
+            except WebDriverError:
+                return []
+        match = re.fullmatch(r"element/([0-9a-f]+)/(\w+)(?:/(\w+))?", route)
+        if match:
+            xpath = s.xpath_of(match.group(1))
+            action = match.group(2)
+            if action in ("clear", "value") and "disabled" in xpath:
+                raise WebDriverError(400, "element not interactable", f"Element {xpath} is not interactable")
+            if action == "clear":
+                s.values[xpath] = ""
+                return None
+            if action == "value":
+                s.values[xpath] = s.values.get(xpath, "") + body.get("text", "")
+                s.last_change = time.time()
+                return None
+            if action == "enabled":
+                return "disabled" not in xpath
+            if action == "displayed":
+                return True
+            if action == "selected":
+                return False
+            if action == "text":
+                return s.values.get(xpath, "")
+            if action in ("attribute", "property"):
+                return s.values.get(xpath, "") if match.group(3) == "value" else None
+            if action == "rect":
+                return {"x": 0, "y": 0, "width": 100, "height": 20}
+            if action == "click":
+                s.last_change = time.time()
+                s.log_in_if_submitting(xpath)
+            return None
+        if route == "cookie":
+            if method == "POST":
+                cookie = body.get("cookie", {})
+                s.cookies[cookie.get("name")] = cookie
+                return None
+            if method == "DELETE":
+                s.cookies.clear()
+                return None
+            return list(s.cookies.values())
+        if route.startswith("cookie/"):
+            name = route.split("/", 1)[1]
+            if method == "DELETE":
+                s.cookies.pop(name, None)
+                return None
+            if name not in s.cookies:
+                raise WebDriverError(404, "no such cookie", name)
+            return s.cookies[name]
+        if route == "window":
+            if method == "POST":
+                s.window = body.get("handle")
+                return None
+            if method == "DELETE":
+                s.windows.remove(s.window)
+                return list(s.windows)
+            return s.window
+        if route == "window/handles":
+            return list(s.windows)
+        if route == "window/new":
+            handle = uuid.uuid4().hex
+            s.windows.append(handle)
+            return {"handle": handle, "type": "tab"}
+        raise WebDriverError(404, "unknown command", f"{method} /{route}")
+
+
+def make_handler(node):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else {}
+                status, payload = 200, {"value": node.dispatch(self.command, self.path, body)}
+            except WebDriverError as e:
+                status, payload = e.status, {"value": {"error": e.error, "message": str(e), "stacktrace": ""}}
+            except ValueError as e:
+                status, payload = 400, {"value": {"error": "invalid argument", "message": str(e), "stacktrace": ""}}
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_DELETE = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start(port=0, latency_ms=0, max_sessions=4, host="127.0.0.1", settle_ms=0):
+    """Serve a stub node on a background thread; returns (server, url). port=0 picks a free one."""
+    node = StubWebDriver(latency_ms, max_sessions, settle_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(node))
+    server.daemon_threads = True
+    server.node = node
+    threading.Thread(target=server.serve_forever, name="stub-webdriver", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4444)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--max-sessions", type=int, default=4)
+    parser.add_argument("--settle-ms", type=float, default=0)
+    args = parser.parse_args()
+    server, url = start(args.port, args.latency_ms, args.max_sessions, args.host, args.settle_ms)
+    print(f"🧪 Stub WebDriver node on {url} ({args.max_sessions} slots, {args.latency_ms}ms per command)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
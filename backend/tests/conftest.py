@@ -0,0 +1,34 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# the backend modules are flat scripts, imported by name (as they import each other)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stub_webdriver  # noqa: E402
+
+
+@pytest.fixture
+def stub_node():
+    """A stand-in Selenium node on a free port; yields (server, url). server.node is the StubWebDriver."""
+    server, url = stub_webdriver.start(max_sessions=4)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend(stub_node, monkeypatch):
+    """The automation backend on a 2-session pool of the stub node (one reserved, one for runs)."""
+    import app_selenium_live as automation
+    from browser_pool import SessionPool
+
+    server, url = stub_node
+    pool = SessionPool(automation.create_driver, [url], max_size=2, lease_timeout=1)
+    monkeypatch.setattr(automation, "browser_pool", pool)
+    monkeypatch.setattr(automation, "workflow_slots", threading.BoundedSemaphore(1))
+    yield automation
+    automation.release_interactive_session()
+    pool.close_all()
@@ -0,0 +1,125 @@
+import gzip
+import random
+import sys
+import zlib
+
+import pytest
+
+from aadhaar_qr import SECURE_QR_FIELDS, decimal_to_bytes, parse_aadhaar_qr
+
+SECURE_FIELDS = {
+    "indicator": "3",
+    "reference_id": "123420190315101500123",
+    "name": "Asha Devi",
+    "dob": "15-03-1990",
+    "gender": "F",
+    "care_of": "W/O Ramesh Kumar",
+    "district": "Pune",
+    "landmark": "Near Temple",
+    "house": "12B",
+    "location": "Shivaji Nagar",
+    "pincode": "411005",
+    "post_office": "Shivaji Nagar",
+    "state": "Maharashtra",
+    "street": "MG Road",
+    "sub_district": "Haveli",
+    "vtc": "Pune",
+}
+
+
+def secure_qr(fields=SECURE_FIELDS, marker=b"V2", compress=gzip.compress, trailer=bytes(range(256))):
+    """The decimal text of a secure QR: 0xFF-separated fields (+ photo/signature bytes), compressed."""
+    parts = ([marker] if marker else []) + [fields[name].encode("iso-8859-1") for name in SECURE_QR_FIELDS]
+    payload = compress(b"\xff".join(parts) + b"\xff" + trailer)
+    return str(int.from_bytes(payload, "big"))
+
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def test_secure_qr_fields_and_masked_reference_id():
+    assert parse_aadhaar_qr(secure_qr()) == {
+        "name": "Asha Devi",
+        "dob": "15/03/1990",
+        "gender": "Female",
+        "aadhaar": "XXXX XXXX 1234",
+        "address": "W/O Ramesh Kumar, 12B, MG Road, Near Temple, Shivaji Nagar, Pune, Haveli, Maharashtra, 411005",
+        "format": "secure",
+    }
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, zlib.compress, raw_deflate], ids=["gzip", "zlib", "deflate"])
+@pytest.mark.parametrize("marker", [b"V2", None], ids=["v2", "v1"])
+def test_secure_qr_compression_and_version_marker(compress, marker):
+    fields = parse_aadhaar_qr(secure_qr(marker=marker, compress=compress))
+    assert fields["name"] == "Asha Devi" and fields["aadhaar"] == "XXXX XXXX 1234"
+
+
+def test_reference_id_without_digits_leaves_the_number_blank():
+    fields = parse_aadhaar_qr(secure_qr({**SECURE_FIELDS, "reference_id": "ABCD20190315"}))
+    assert fields["aadhaar"] == ""
+
+
+def test_decimal_to_bytes_round_trips_past_the_int_digit_limit():
+    data = bytes(random.Random(1).randrange(1, 256) for _ in range(4000))
+    limit = sys.get_int_max_str_digits()
+    sys.set_int_max_str_digits(0)
+    try:
+        digits = str(int.from_bytes(data, "big"))  # ~9600 digits
+    finally:
+        sys.set_int_max_str_digits(limit)
+    assert decimal_to_bytes(digits) == data
+
+
+@pytest.mark.parametrize("text", [
+    secure_qr()[:len(secure_qr()) // 2],                              # truncated digits
+    secure_qr()[:-40],
+    "9" * 500,                                                        # digits, but not a compressed stream
+    str(int.from_bytes(gzip.compress(b"\xff".join([b"V2", b"3", b"1234"])), "big")),  # too few fields
+    secure_qr({**SECURE_FIELDS, "name": ""}),
+    secure_qr({**SECURE_FIELDS, "gender": "X"}),
+    "12345",                                                          # too short for a secure QR
+    "",
+    None,
+    "https://example.com/not-an-aadhaar",
+])
+def test_malformed_secure_qr_is_none(text):
+    assert parse_aadhaar_qr(text) is None
+
+
+def test_truncated_payloads_never_raise():
+    text = secure_qr()
+    for cut in range(101, len(text), 7):
+        assert parse_aadhaar_qr(text[:cut]) is None
+
+
+def test_xml_print_letter_qr():
+    text = ('<?xml version="1.0" encoding="UTF-8"?><PrintLetterBarcodeData uid="123456789012" '
+            'name="Ravi Kumar" gender="M" yob="1985" co="S/O Mohan" house="4" street="Lake Road" '
+            'vtc="Bhopal" dist="Bhopal" state="Madhya Pradesh" pc="462001"/>')
+    assert parse_aadhaar_qr(text) == {
+        "name": "Ravi Kumar",
+        "dob": "1985",
+        "gender": "Male",
+        "aadhaar": "1234 5678 9012",
+        "address": "S/O Mohan, 4, Lake Road, Bhopal, Madhya Pradesh, 462001",
+        "format": "xml",
+    }
+
+
+def test_xml_qda_qr():
+    text = '<QDA n="Meena" g="F" d="01-01-2000" u="xxxxxxxx4321" a="Chennai, Tamil Nadu"/>'
+    fields = parse_aadhaar_qr(text)
+    assert fields["name"] == "Meena" and fields["dob"] == "01/01/2000"
+    assert fields["aadhaar"] == "xxxxxxxx4321" and fields["address"] == "Chennai, Tamil Nadu"
+
+
+@pytest.mark.parametrize("text", [
+    '<PrintLetterBarcodeData uid="123456789012" name="Ravi"',   # truncated
+    '<PrintLetterBarcodeData uid="123456789012" gender="M"/>',  # no name
+    '<Other name="Ravi"/>',
+])
+def test_malformed_xml_qr_is_none(text):
+    assert parse_aadhaar_qr(text) is None
@@ -0,0 +1,50 @@
+import os
+import time
+
+import cv2
+
+import server
+from test_side_routing import card_with_front_text
+
+
+def test_batch_workers_are_not_forked_from_the_server():
+    executor = server.get_batch_executor()
+    try:
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        server.reset_batch_executor()
+
+
+def test_pair_past_its_timeout_fails_and_replaces_the_pool(monkeypatch):
+    # a fresh worker still importing the server module cannot answer within 10ms
+    monkeypatch.setattr(server, "OCR_BATCH_ITEM_TIMEOUT_SECONDS", 0.01)
+    server.reset_batch_executor()
+    pairs = [{"label": str(n), "front": "missing_front.jpg", "back": "missing_back.jpg"} for n in range(2)]
+    body = server.run_batch(pairs)
+    assert body["failed"] == 2
+    assert body["results"][0]["error"] == "OCR timed out while processing this pair."
+    assert server._batch_executor is None
+
+
+def test_a_hung_pair_fails_alone(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "OCR_BATCH_ITEM_TIMEOUT_SECONDS", 3)
+    monkeypatch.setattr(server, "OCR_BATCH_WORKERS", 2)
+    server.reset_batch_executor()
+    card = str(tmp_path / "card.png")
+    cv2.imwrite(card, card_with_front_text(qr_at=(820, 60)))  # QR fast path: no tesseract needed
+    hung = str(tmp_path / "hung.jpg")
+    os.mkfifo(hung)  # opening it blocks until a writer shows up, which never happens
+    pairs = [{"label": "hung", "front": hung, "back": card}]
+    pairs += [{"label": str(n), "front": card, "back": card} for n in range(16)]  # ~5s of work for the other worker
+    try:
+        body = server.run_batch(pairs)
+        deadline = time.monotonic() + 5
+        while server._hung_pairs:  # the retired pool is killed once only the hung pair is left on it
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+    finally:
+        server.reset_batch_executor()
+    assert body["results"][0]["error"] == "OCR timed out while processing this pair."
+    # the pairs still running when it timed out, and those after, are unaffected
+    assert body["succeeded"] == 16
+    assert [item["index"] for item in body["results"]] == list(range(17))
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+from selenium import webdriver
+
+from browser_pool import PoolExhausted, SessionPool
+
+
+def remote_driver(endpoint):
+    return webdriver.Remote(command_executor=endpoint, options=webdriver.ChromeOptions())
+
+
+def make_pool(url, **kwargs):
+    kwargs.setdefault("max_size", 2)
+    kwargs.setdefault("lease_timeout", 1)
+    return SessionPool(remote_driver, [url], **kwargs)
+
+
+def test_lease_and_release_reuses_the_session(stub_node):
+    server, url = stub_node
+    pool = make_pool(url)
+    with pool.lease() as first:
+        first.driver.get("https://example.test/a")
+        assert pool.snapshot()["leased"][0]["id"] == first.id
+    with pool.lease() as second:
+        assert second.id == first.id
+        assert second.driver.current_url == "about:blank"  # reset between runs
+    snapshot = pool.snapshot()
+    assert snapshot["created"] == 1 and snapshot["leases"] == 2
+    assert [s["id"] for s in snapshot["idle"]] == [first.id] and snapshot["leased"] == []
+    pool.close_all()
+    assert server.node.sessions == {}
+
+
+def test_session_is_discarded_when_the_run_raises(stub_node):
+    server, url = stub_node
+    pool = make_pool(url)
+    with pytest.raises(RuntimeError):
+        with pool.lease() as session:
+            broken = session
+            raise RuntimeError("step failed")
+    assert pool.stats["discarded"] == 1
+    assert broken.driver.session_id not in server.node.sessions
+    with pool.lease() as session:
+        assert session.id != broken.id
+    pool.close_all()
+
+
+def test_session_is_recycled_after_max_runs(stub_node):
+    server, url = stub_node
+    pool = make_pool(url, max_runs=2)
+    ids = []
+    for _ in range(3):
+        with pool.lease() as session:
+            ids.append(session.id)
+    assert ids[0] == ids[1] != ids[2]
+    assert pool.stats["recycled"] == 1 and pool.stats["created"] == 2
+    assert len(server.node.sessions) == 1
+    pool.close_all()
+
+
+def test_dead_idle_session_is_replaced_after_health_check(stub_node):
+    server, url = stub_node
+    pool = make_pool(url, health_check_after=0)
+    with pool.lease() as session:
+        dead = session
+    server.node.sessions.clear()  # the node lost the session (crash, timeout)
+    with pool.lease() as session:
+        assert session.id != dead.id
+        assert session.driver.current_url == "about:blank"
+    assert pool.stats["discarded"] == 1 and pool.stats["created"] == 2
+    pool.close_all()
+
+
+def test_min_size_is_opened_up_front_and_max_size_caps_sessions(stub_node):
+    server, url = stub_node
+    pool = make_pool(url, min_size=2, max_size=3)
+    pool.ensure_min()
+    assert len(pool.snapshot()["idle"]) == 2 and len(server.node.sessions) == 2
+    leased = [pool.acquire() for _ in range(3)]
+    assert len({s.id for s in leased}) == 3 and len(server.node.sessions) == 3
+    with pytest.raises(PoolExhausted):
+        pool.acquire(timeout=0.2)
+    assert len(server.node.sessions) == 3
+    for session in leased:
+        pool.release(session)
+    pool.close_all()
+
+
+def test_acquire_raises_pool_exhausted_after_lease_timeout(stub_node):
+    server, url = stub_node
+    pool = make_pool(url, max_size=1, lease_timeout=0.5)
+    held = pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolExhausted) as excinfo:
+        pool.acquire()
+    assert 0.4 <= time.monotonic() - started < 2
+    assert excinfo.value.retry_after >= 1
+    assert pool.stats["exhausted"] == 1
+    pool.release(held)
+    pool.close_all()
+
+
+def test_waiting_acquire_gets_a_released_session(stub_node):
+    server, url = stub_node
+    pool = make_pool(url, max_size=1, lease_timeout=5)
+    held = pool.acquire()
+    threading.Timer(0.2, pool.release, args=(held,)).start()
+    session = pool.acquire()
+    assert session.id == held.id and pool.stats["waits"] == 1
+    pool.release(session)
+    pool.close_all()
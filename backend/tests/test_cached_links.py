@@ -0,0 +1,38 @@
+import numpy as np
+
+import server
+
+
+def card_body(image_filename, debug_name):
+    return {
+        "output_image_url": f"/outputs/{image_filename}",
+        "output_text_url": None,
+        "front": {"debug_images": {"overlay": debug_name}},
+        "back": {"debug_images": {}},
+    }
+
+
+def test_cache_hit_keeps_links_that_still_resolve():
+    img = np.zeros((8, 8, 3), np.uint8)
+    image_filename = server.defer_side_by_side_output(img, img)
+    debug_name = "overlay_0000_kept.jpg"
+    server._debug_images[debug_name] = img  # still in memory, as during its request
+    try:
+        body = card_body(image_filename, debug_name)
+        server.drop_expired_links(body)
+        assert body["output_image_url"] == f"/outputs/{image_filename}"
+        assert body["front"]["debug_images"] == {"overlay": debug_name}
+    finally:
+        server.release_debug_images({"overlay": debug_name})
+
+
+def test_cache_hit_drops_expired_composite_and_debug_links(monkeypatch):
+    img = np.zeros((8, 8, 3), np.uint8)
+    image_filename = server.defer_side_by_side_output(img, img)
+    # the composite outlived its TTL; the debug image was never persisted
+    monkeypatch.setattr(server, "COMPOSITE_CACHE_TTL_SECONDS", -1)
+    body = card_body(image_filename, "overlay_0000_gone.jpg")
+    server.drop_expired_links(body)
+    assert body["output_image_url"] is None
+    assert body["front"]["debug_images"] == {}
+    assert server.get_composite_jpeg(image_filename) is None
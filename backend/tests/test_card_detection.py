@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import server
+from bench_ocr import corner_tolerance_px, synthetic_scene
+
+
+def detect_corners(scene, max_side):
+    server.DETECT_MAX_SIDE = max_side
+    quad = server.find_card_quad(scene, {}, {})
+    assert quad is not None
+    return server.order_points(quad)
+
+
+@pytest.mark.parametrize("megapixels", [2, 5, 12])
+def test_downscaled_detection_stays_within_corner_tolerance(megapixels, monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "off")
+    monkeypatch.setattr(server, "DETECT_MAX_SIDE", server.DETECT_MAX_SIDE)
+    scene, truth = synthetic_scene(megapixels, seed=megapixels)
+    assert server.detection_scale(scene.shape) < 1.0  # the downscaled path is the one under test
+
+    full_res = detect_corners(scene, 0)
+    downscaled = detect_corners(scene, 1024)
+    tolerance = corner_tolerance_px(truth)
+    assert np.linalg.norm(downscaled - full_res, axis=1).max() <= tolerance
+    assert np.linalg.norm(downscaled - truth, axis=1).max() <= tolerance
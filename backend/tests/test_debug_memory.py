@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+import pytest
+
+import server
+from test_side_routing import card_with_front_text
+
+IMG = np.zeros((4, 4, 3), np.uint8)
+
+
+@pytest.fixture
+def small_cap(monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "full")
+    monkeypatch.setattr(server, "DEBUG_MEMORY_SLOTS", 2)
+
+
+def test_concurrent_requests_keep_their_debug_arrays_until_released(small_cap):
+    requests = 8
+    barrier = threading.Barrier(requests)
+    kept, released = [], []
+
+    def request(n):
+        with server.debug_scope():
+            names = [server.save_debug(IMG, f"test_{n}_{k}") for k in range(7)]
+            barrier.wait(5)  # every request has saved its assets: 56 arrays, far past the cap
+            kept.append(all(server.get_debug_array(name) is IMG for name in names))
+            barrier.wait(5)
+        released.append(all(server.get_debug_array(name) is None for name in names))
+
+    threads = [threading.Thread(target=request, args=(n,)) for n in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert kept == [True] * requests and released == [True] * requests
+
+
+def test_a_failed_request_releases_its_arrays(small_cap):
+    with pytest.raises(RuntimeError):
+        with server.debug_scope():
+            name = server.save_debug(IMG, "test_failed")
+            raise RuntimeError("pipeline error")
+    assert server.get_debug_array(name) is None
+
+
+def test_arrays_saved_outside_a_request_stay_capped(small_cap):
+    names = [server.save_debug(IMG, f"test_loose_{k}") for k in range(4)]
+    assert [server.get_debug_array(name) is not None for name in names] == [False, False, True, True]
+    server.release_debug_images(dict(enumerate(names)))
+
+
+def test_composites_use_the_overlays_of_concurrent_pairs(small_cap, monkeypatch):
+    fallbacks = []
+    lookup = server.get_debug_image_or_fallback
+
+    def recording_lookup(debug_files, key, fallback_img):
+        img = lookup(debug_files, key, fallback_img)
+        if img is fallback_img:
+            fallbacks.append(debug_files)
+        return img
+
+    monkeypatch.setattr(server, "get_debug_image_or_fallback", recording_lookup)
+    card = card_with_front_text(qr_at=(820, 60))  # QR fast path: no tesseract needed
+    threads = [threading.Thread(target=server.process_card_pair, args=(card, card)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert fallbacks == []
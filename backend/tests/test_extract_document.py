@@ -0,0 +1,28 @@
+import io
+
+import server
+
+
+def test_undecodable_document_is_a_client_error():
+    client = server.app.test_client()
+    response = client.post("/api/ocr/extract-document",
+                           data={"file": (io.BytesIO(b"not an image"), "scan.jpg")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Unsupported or corrupted image"
+
+
+def test_in_memory_pdf_is_spooled_once_outside_uploads(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "PDF_SPOOL_DIR", str(tmp_path))
+    opened = []
+
+    def fake_pages(path):
+        opened.append(path)
+        with open(path, "rb") as fh:
+            assert fh.read() == b"%PDF-1.4 test"
+        yield from ()
+
+    monkeypatch.setattr(server, "iter_pdf_pages", fake_pages)
+    assert list(server.iter_pages_from_source((b"%PDF-1.4 test", "pdf"))) == []
+    assert len(opened) == 1 and opened[0].startswith(str(tmp_path))
+    assert list(tmp_path.iterdir()) == []  # removed once the pages are read
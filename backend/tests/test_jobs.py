@@ -0,0 +1,125 @@
+import io
+import threading
+
+import pytest
+
+import server
+from jobs import JobCancelled, JobManager, JobQueueFull
+
+
+def blocking_job():
+    """(job function, started event, release event): the job runs until released."""
+    started, release = threading.Event(), threading.Event()
+
+    def job(progress):
+        started.set()
+        release.wait(10)
+        return "released"
+
+    return job, started, release
+
+
+def full_manager():
+    """One worker busy and both queue slots taken; returns (manager, release event)."""
+    manager = JobManager(workers=1, max_queued=2, thread_name_prefix="test-job")
+    job, started, release = blocking_job()
+    manager.submit("test", job)
+    assert started.wait(5)
+    manager.submit("test", job)
+    manager.submit("test", job)
+    return manager, release
+
+
+def test_queue_cap_and_retry_after_estimate():
+    manager, release = full_manager()
+    try:
+        with pytest.raises(JobQueueFull) as raised:
+            manager.submit("test", lambda progress: None)
+        # no finished job yet: 5s per job assumed, 2 queued on 1 worker
+        assert raised.value.retry_after == 10
+        assert manager.snapshot()["queued"] == 2
+    finally:
+        release.set()
+    assert manager.drain(10)
+    manager.submit("test", lambda progress: None)  # the queue has room again
+
+
+def test_queue_full_is_a_429_with_retry_after(monkeypatch):
+    manager, release = full_manager()
+    monkeypatch.setattr(server, "job_manager", manager)
+    try:
+        response = server.app.test_client().post(
+            "/api/ocr/jobs", data={"kind": "document", "file": (io.BytesIO(b"%PDF-1.4"), "scan.pdf")},
+            content_type="multipart/form-data")
+    finally:
+        release.set()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert response.get_json()["retry_after"] == 10
+
+
+def test_cancelling_a_queued_job_ends_it_without_running():
+    manager = JobManager(workers=1, max_queued=4, thread_name_prefix="test-job")
+    job, started, release = blocking_job()
+    manager.submit("test", job)
+    assert started.wait(5)
+    ran, cleaned = threading.Event(), threading.Event()
+    queued = manager.submit("test", lambda progress: ran.set(), cleanup=cleaned.set)
+    try:
+        assert manager.cancel(queued) == "cancelled"
+        assert manager.status(queued)["state"] == "cancelled"
+        assert manager.snapshot()["queued"] == 0
+    finally:
+        release.set()
+    assert manager.drain(10)
+    assert not ran.is_set() and cleaned.is_set()
+    assert [event["stage"] for event in manager.events(queued)] == ["cancelled"]
+
+
+def test_cancelling_a_running_job_stops_it_at_its_next_check():
+    manager = JobManager(workers=1, thread_name_prefix="test-job")
+    started = threading.Event()
+
+    def job(progress):
+        started.set()
+        steps = 0
+        while not progress.cancelled.wait(0.01):
+            steps += 1
+        raise JobCancelled(result={"steps": steps})
+
+    job_id = manager.submit("test", job)
+    assert started.wait(5)
+    assert manager.cancel(job_id) == "running"
+    status = manager.wait(job_id, timeout=5)
+    assert status["state"] == "cancelled"
+    assert "steps" in status["result"]  # the partial result is kept
+
+
+def test_event_sequence_numbers_and_resume():
+    manager = JobManager(workers=1, thread_name_prefix="test-job")
+
+    def job(progress):
+        for page in range(3):
+            progress("page_done", page=page)
+        return {"pages": 3}
+
+    job_id = manager.submit("test", job)
+    manager.wait(job_id, timeout=5)
+    events = list(manager.events(job_id))
+    assert [event["seq"] for event in events] == [1, 2, 3, 4, 5]
+    assert [event["stage"] for event in events] == ["started", "page_done", "page_done", "page_done", "done"]
+    resumed = list(manager.events(job_id, after=2))
+    assert resumed == events[2:]
+    assert list(manager.events(job_id, after=5)) == []
+
+
+def test_event_stream_resumes_after_last_event_id(monkeypatch):
+    manager = JobManager(workers=1, thread_name_prefix="test-job")
+    monkeypatch.setattr(server, "job_manager", manager)
+    job_id = manager.submit("test", lambda progress: progress("page_done", page=0))
+    manager.wait(job_id, timeout=5)
+    body = server.app.test_client().get(f"/api/ocr/jobs/{job_id}/events",
+                                        headers={"Last-Event-ID": "1"}).get_data(as_text=True)
+    ids = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("id: ")]
+    assert ids == ["2", "3"]
+    assert "event: done" in body
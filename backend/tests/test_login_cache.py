@@ -0,0 +1,97 @@
+import pytest
+
+import login_cache as cache_module
+from jobs import JobManager
+from login_cache import LoginCache
+
+LOGIN = [
+    {"id": "open", "type": "navigate", "config": {"url": "https://example.test/login"}},
+    {"id": "user", "type": "type", "config": {"xpath": "//input[@name='user']", "text": "asha"}},
+    {"id": "pass", "type": "type", "config": {"xpath": "//input[@name='password']", "text": "secret"}},
+    {"id": "submit", "type": "click", "config": {"xpath": "//button[@type='submit']", "ends_login": True}},
+]
+WORKFLOW = LOGIN + [
+    {"id": "account", "type": "navigate", "config": {"url": "https://example.test/account"}},
+    {"id": "search", "type": "type", "config": {"xpath": "//input[@name='q']", "text": "invoices"}},
+]
+
+
+@pytest.fixture
+def cache(backend, monkeypatch):
+    fresh = LoginCache(ttl=60)
+    monkeypatch.setattr(backend, "login_cache", fresh)
+    return fresh
+
+
+def run(backend, steps=WORKFLOW):
+    jobs = JobManager(workers=1, thread_name_prefix="test-workflow")
+    status = jobs.wait(jobs.submit("workflow", lambda progress: backend.run_workflow(steps, progress)), timeout=30)
+    assert status["state"] == "done"
+    assert all(r["result"]["success"] for r in status["result"]["results"])
+    return status["result"]
+
+
+def typed_passwords(stub_node):
+    server, _ = stub_node
+    return [session.values.get("//input[@name='password']") for session in server.node.sessions.values()]
+
+
+def test_a_second_run_reuses_the_cached_login(backend, cache, stub_node):
+    first = run(backend)
+    assert first["login"] == "cached" and cache.stats["stored"] == 1
+    for session in stub_node[0].node.sessions.values():
+        session.values.clear()
+
+    second = run(backend)
+    assert second["login"] == "restored" and cache.stats["hits"] == 1
+    by_id = {r["step_id"]: r["result"] for r in second["results"]}
+    assert all(by_id[step["id"]].get("skipped") for step in LOGIN)
+    assert by_id["account"]["restored_login"]
+    assert not any(typed_passwords(stub_node))  # the credentials were not typed again
+    assert second["round_trips"] < first["round_trips"]
+
+
+def test_a_rejected_cached_login_falls_back_to_logging_in(backend, cache, stub_node):
+    run(backend)
+    stub_node[0].node.revoke_logins()  # e.g. the site restarted and forgot its sessions
+
+    second = run(backend)
+    assert cache.stats["rejected"] == 1
+    by_id = {r["step_id"]: r["result"] for r in second["results"]}
+    assert not any(by_id[step["id"]].get("skipped") for step in LOGIN)
+    assert "secret" in typed_passwords(stub_node)
+    assert second["login"] == "cached" and cache.stats["stored"] == 2  # the fresh login replaces it
+
+
+def test_clearing_the_cache_makes_the_next_run_log_in(backend, cache):
+    run(backend)
+    client = backend.app.test_client()
+    assert [entry["origin"] for entry in client.get("/api/login-cache").get_json()["entries"]] == [
+        "https://example.test"]
+    assert client.delete("/api/login-cache").get_json()["success"]
+    assert client.get("/api/login-cache").get_json()["entries"] == []
+    assert run(backend)["login"] == "cached"
+    assert cache.stats["hits"] == 0
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = LoginCache(ttl=60)
+    key = LoginCache.key(LOGIN)
+    cache.put(key, {"url": "https://example.test/account", "cookies": [], "local": {}, "session": {}})
+    now[0] += 59
+    assert cache.get(key) is not None
+    now[0] += 2
+    assert cache.get(key) is None
+    assert cache.stats["expired"] == 1 and cache.snapshot()["entries"] == []
+
+
+def test_keys_differ_by_credentials_but_not_by_ends_login():
+    other_user = [dict(step, config=dict(step["config"])) for step in LOGIN]
+    other_user[1]["config"]["text"] = "ravi"
+    assert LoginCache.key(other_user) != LoginCache.key(LOGIN)
+    marker_moved = [dict(step, config={k: v for k, v in step["config"].items() if k != "ends_login"})
+                    for step in LOGIN]
+    assert LoginCache.key(marker_moved) == LoginCache.key(LOGIN)
+    assert LoginCache.key(LOGIN).startswith("https://example.test#")
@@ -0,0 +1,25 @@
+import pytest
+
+import server
+from result_cache import ResultCache
+
+FRONT, BACK = "a" * 64, "b" * 64
+
+
+@pytest.mark.parametrize("name, value", [
+    ("DETECT_MAX_SIDE", 2048),
+    ("SINGLE_PASS_PSM", 6),
+    ("OCR_SCALE_RANGE", (0.5, 2.0)),
+    ("OCR_SCALE_TOLERANCE", 0.3),
+    ("OCR_TARGET_LINE_HEIGHT", 0),
+    ("SIDE_QR_REGIONS", {"front": None, "back": None}),
+    ("QR_BLOCK_MIN_INK", 0.4),
+    ("PDF_DPI", 200),
+])
+def test_a_changed_setting_misses_the_cache(monkeypatch, name, value):
+    monkeypatch.setattr(server, "result_cache", ResultCache(max_entries=4))
+    server.result_cache.put(server.result_cache_key(FRONT, BACK), {"front": {"name": "Asha"}})
+    assert server.cache_lookup(server.result_cache_key(FRONT, BACK)) is not None
+
+    monkeypatch.setattr(server, name, value)
+    assert server.cache_lookup(server.result_cache_key(FRONT, BACK)) is None
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+import server
+
+QR_PAYLOAD = '<QDA n="Meena Iyer" g="F" d="01-01-2000" u="xxxxxxxx4321" a="Chennai"/>'
+
+
+def card_with_front_text(qr_at=None, qr_size=150):
+    """A warped card with text in the front's ROIs and, optionally, a QR at (x, y)."""
+    card = np.full((630, 1000, 3), 255, np.uint8)
+    for key, text in (("name", "MEENA IYER"), ("dob", "01/01/2000"), ("aadhaar", "1234 5678 4321")):
+        x, y, w, h = server.get_roi_pixels(card, server.ROI_PERCENTS[key])
+        cv2.putText(card, text, (x + 5, y + h - 5), cv2.FONT_HERSHEY_SIMPLEX, h / 30, (0, 0, 0), 3)
+    if qr_at is not None:
+        qr = cv2.resize(cv2.QRCodeEncoder.create().encode(QR_PAYLOAD), (qr_size, qr_size),
+                        interpolation=cv2.INTER_NEAREST)
+        x, y = qr_at
+        card[y:y + qr_size, x:x + qr_size] = cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR)
+    return card
+
+
+def scan(card):
+    return server.scan_warped_card(card, {}, {"card_found": True, "reason": ""})
+
+
+def test_a_qr_on_the_right_of_a_front_takes_the_fast_path(monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "off")
+    card = card_with_front_text(qr_at=(820, 60))  # where PVC fronts print theirs
+    assert server.classify_card_side(card)[0] == "front"
+    page = scan(card)
+    assert page["side"] == "front" and page["qr_detected"]
+    assert page["qr_fields"]["name"] == "Meena Iyer"
+    assert server.finish_page(page, run_ocr=page["qr_fields"] is None)["ocr_skipped"]
+
+
+def test_fronts_are_not_searched_outside_their_qr_region(monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "off")
+    page = scan(card_with_front_text(qr_at=(30, 40)))  # over the photo
+    assert page["side"] == "front" and not page["qr_detected"]
+
+
+def test_a_back_read_as_a_front_keeps_its_qr(monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "off")
+    monkeypatch.setattr(server, "classify_card_side", lambda card: ("front", {}))
+    page = scan(card_with_front_text(qr_at=(620, 120), qr_size=300))  # a back's QR sits on its right half too
+    assert page["side"] == "front" and page["qr_fields"]["name"] == "Meena Iyer"
+
+
+def test_front_without_a_qr_goes_on_to_ocr(monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "off")
+    page = scan(card_with_front_text())
+    assert page["side"] == "front" and not page["qr_detected"] and page["qr_fields"] is None
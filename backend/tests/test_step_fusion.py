@@ -0,0 +1,89 @@
+import pytest
+from selenium.webdriver.common.keys import Keys
+
+from jobs import JobManager
+from step_fusion import MAX_BATCH, fusable, plan
+
+FIELDS = ["//input[@name='first']", "//input[@name='last']", "//input[@name='email']",
+          "//input[@name='phone']", "//textarea[@name='note']"]
+
+
+def type_step(xpath, text="x", **config):
+    return {"id": xpath, "type": "type", "config": {"xpath": xpath, "text": text, **config}}
+
+
+def form_workflow(fields=FIELDS):
+    return ([{"id": "open", "type": "navigate", "config": {"url": "https://example.test/form"}}]
+            + [type_step(xpath, f"value {n}") for n, xpath in enumerate(fields)]
+            + [{"id": "send", "type": "click", "config": {"xpath": "//button[@type='submit']"}}])
+
+
+def run(backend, steps):
+    jobs = JobManager(workers=1, thread_name_prefix="test-workflow")
+    status = jobs.wait(jobs.submit("workflow", lambda progress: backend.run_workflow(steps, progress)), timeout=30)
+    assert status["state"] == "done"
+    return status["result"]
+
+
+def typed_values(stub_node, clear=False):
+    server, _ = stub_node
+    values = {}
+    for session in server.node.sessions.values():
+        values.update(session.values)
+        if clear:
+            session.values.clear()
+    return values
+
+
+def test_plan_batches_runs_of_fusable_type_steps():
+    a, b, c = (type_step(xpath) for xpath in FIELDS[:3])
+    click = {"type": "click", "config": {"xpath": "//button"}}
+    assert plan([a, b, click, c]) == [("batch", [a, b]), ("single", [click]), ("single", [c])]
+    assert plan([a, b, c], enabled=False) == [("single", [a]), ("single", [b]), ("single", [c])]
+
+
+def test_plan_caps_batch_size():
+    steps = [type_step(f"//input[{n}]") for n in range(MAX_BATCH + 2)]
+    assert [(kind, len(group)) for kind, group in plan(steps)] == [("batch", MAX_BATCH), ("batch", 2)]
+
+
+@pytest.mark.parametrize("step", [
+    type_step("//input", "line\n"),              # a newline submits the form
+    type_step("//input", "go" + Keys.ENTER),
+    type_step("//input", fuse=False),
+    type_step("//input", wait_after="settle"),
+    type_step("", "x"),
+    {"type": "click", "config": {"xpath": "//input"}},
+])
+def test_steps_that_are_never_fused(step):
+    assert not fusable(step)
+
+
+def test_fusion_cuts_round_trips(backend, stub_node, monkeypatch):
+    monkeypatch.setattr(backend, "FUSE_STEPS", False)
+    before = run(backend, form_workflow())
+    assert typed_values(stub_node, clear=True) == {xpath: f"value {n}" for n, xpath in enumerate(FIELDS)}
+    monkeypatch.setattr(backend, "FUSE_STEPS", True)
+    after = run(backend, form_workflow())
+
+    assert before["fused_steps"] == 0 and after["fused_steps"] == len(FIELDS)
+    assert all(r["result"]["success"] for r in before["results"] + after["results"])
+    # step by step a field costs a find, a visibility check, clear and send_keys; fused, all share one call
+    assert after["round_trips"] <= before["round_trips"] - 3 * len(FIELDS)
+    assert typed_values(stub_node) == {xpath: f"value {n}" for n, xpath in enumerate(FIELDS)}
+
+
+def test_fused_fill_falls_back_at_a_field_that_is_not_interactable(backend, stub_node):
+    fields = [FIELDS[0], "//input[@name='disabled']", FIELDS[2], FIELDS[3]]
+    result = run(backend, form_workflow(fields))
+    by_id = {r["step_id"]: r["result"] for r in result["results"]}
+
+    assert [r["step_id"] for r in result["results"]] == ["open", *fields, "send"]
+    assert by_id[fields[0]]["success"] and by_id[fields[0]]["fused"] == len(fields)
+    assert not by_id[fields[1]]["success"] and "not interactable" in by_id[fields[1]]["error"]
+    # the fields after the one that stopped the fill are typed step by step
+    for xpath in fields[2:]:
+        assert by_id[xpath]["success"] and "fused" not in by_id[xpath]
+    values = typed_values(stub_node)
+    assert values[fields[0]] == "value 0" and values[fields[3]] == "value 3"
+    assert fields[1] not in values
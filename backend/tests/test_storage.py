@@ -0,0 +1,112 @@
+import json
+import os
+
+from storage import JsonlLog, StorageArea, StorageSweeper
+
+NOW = 1_700_000_000
+
+
+def write(area, name, size=100, age=0):
+    """A size-byte file in area, last modified age seconds before NOW; returns its path."""
+    path = area.path_for(name)
+    with open(path, "wb") as fh:
+        fh.write(b"x" * size)
+    os.utime(path, (NOW - age, NOW - age))
+    return path
+
+
+def test_files_go_into_hashed_buckets(tmp_path):
+    area = StorageArea("debug", str(tmp_path))
+    path = write(area, "overlay_0001.jpg")
+    assert os.path.dirname(path) == os.path.join(str(tmp_path), area.bucket("overlay_0001.jpg"))
+    assert area.relative_path("overlay_0001.jpg") == f"{area.bucket('overlay_0001.jpg')}/overlay_0001.jpg"
+
+
+def test_legacy_flat_files_are_still_found(tmp_path):
+    area = StorageArea("outputs", str(tmp_path))
+    (tmp_path / "old_result.json").write_text("{}")
+    assert area.relative_path("old_result.json") == "old_result.json"
+
+
+def test_sweep_evicts_expired_files(tmp_path):
+    area = StorageArea("uploads", str(tmp_path), max_age_seconds=3600, hashed=False)
+    old = write(area, "old.jpg", age=7200)
+    fresh = write(area, "fresh.jpg", age=60)
+    assert area.sweep(now=NOW) == (1, 100)
+    assert not os.path.exists(old) and os.path.exists(fresh)
+    assert area.snapshot()["files"] == 1 and area.snapshot()["evicted_files"] == 1
+
+
+def test_sweep_evicts_oldest_files_down_to_90_percent_of_the_quota(tmp_path):
+    area = StorageArea("debug", str(tmp_path), max_bytes=1000)
+    paths = [write(area, f"asset_{n}.jpg", size=200, age=100 - n) for n in range(6)]  # 1200 bytes, oldest first
+    assert area.sweep(now=NOW) == (2, 400)
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True, True, True]
+    assert area.snapshot()["bytes"] == 800
+
+
+def test_under_quota_and_age_nothing_is_evicted(tmp_path):
+    area = StorageArea("debug", str(tmp_path), max_bytes=1000, max_age_seconds=3600)
+    write(area, "a.jpg", size=500, age=10)
+    assert area.sweep(now=NOW) == (0, 0)
+
+
+def test_expired_files_count_towards_the_quota_cut(tmp_path):
+    area = StorageArea("outputs", str(tmp_path), max_bytes=500, max_age_seconds=3600)
+    expired = write(area, "expired.json", size=400, age=7200)
+    kept = [write(area, f"recent_{n}.json", size=100, age=10 - n) for n in range(3)]
+    # 700 bytes; dropping the expired file alone gets under 450
+    assert area.sweep(now=NOW) == (1, 400)
+    assert not os.path.exists(expired) and all(os.path.exists(path) for path in kept)
+
+
+def test_kept_prefixes_are_never_swept(tmp_path):
+    area = StorageArea("outputs", str(tmp_path), max_bytes=100, max_age_seconds=60,
+                       keep_prefixes=("latest.", "results.jsonl"))
+    latest = tmp_path / "latest.json"
+    latest.write_text("{}" * 100)
+    os.utime(latest, (NOW - 7200, NOW - 7200))
+    write(area, "result_1.json", size=200, age=7200)
+    assert area.sweep(now=NOW) == (1, 200)
+    assert latest.exists()
+
+
+def test_sweeper_carries_on_past_an_area_that_fails(tmp_path):
+    broken = StorageArea("broken", str(tmp_path / "broken"), max_age_seconds=1)
+    os.rmdir(broken.root)  # scanning it raises
+    area = StorageArea("uploads", str(tmp_path / "uploads"), max_age_seconds=1, hashed=False)
+    path = write(area, "old.jpg", age=NOW - 60)  # sweep_all uses the real clock
+    StorageSweeper([broken, area], interval_seconds=0).sweep_all()
+    assert not os.path.exists(path)
+
+
+def test_log_rotates_into_numbered_backups(tmp_path):
+    path = str(tmp_path / "logs" / "results.jsonl")
+    log = JsonlLog(path, max_bytes=100, backups=2)
+    for n in range(4):
+        log.append({"n": n, "pad": "x" * 120})  # each record alone passes max_bytes
+    assert not os.path.exists(path)
+    with open(path + ".1") as fh:
+        assert [json.loads(line)["n"] for line in fh] == [3]
+    with open(path + ".2") as fh:
+        assert [json.loads(line)["n"] for line in fh] == [2]
+    assert not os.path.exists(path + ".3")  # older records fall off the end
+
+
+def test_log_appends_until_it_passes_max_bytes(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    log = JsonlLog(path, max_bytes=1000, backups=1)
+    for n in range(3):
+        log.append({"n": n, "name": "Asha Devi"})
+    with open(path) as fh:
+        assert [json.loads(line) for line in fh] == [{"n": n, "name": "Asha Devi"} for n in range(3)]
+    assert not os.path.exists(path + ".1")
+
+
+def test_log_without_backups_drops_the_full_file(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    log = JsonlLog(path, max_bytes=50, backups=0)
+    log.append({"pad": "x" * 80})
+    assert not os.path.exists(path) and not os.path.exists(path + ".1")
+    log.append({"n": 1})
+    assert os.path.exists(path)
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from jobs import JobManager
+
+
+def run(backend, steps):
+    jobs = JobManager(workers=1, thread_name_prefix="test-workflow")
+    status = jobs.wait(jobs.submit("workflow", lambda progress: backend.run_workflow(steps, progress)), timeout=30)
+    assert status["state"] == "done"
+    return status["result"]
+
+
+def test_sessions_have_no_implicit_wait(backend, stub_node):
+    server, _ = stub_node
+    with backend.browser_pool.lease():
+        assert [session.implicit for session in server.node.sessions.values()] == [0]
+
+
+def test_a_missing_element_fails_within_the_step_timeout(backend):
+    steps = [
+        {"id": "open", "type": "navigate", "config": {"url": "https://example.test/"}},
+        {"id": "click", "type": "click", "config": {"xpath": "//button[@id='missing']", "timeout": 0.5}},
+    ]
+    started = time.monotonic()
+    result = run(backend, steps)
+    assert time.monotonic() - started < 3
+    click = result["results"][1]["result"]
+    assert not click["success"] and "Timed out after 0.5s" in click["error"]
+
+
+@pytest.mark.parametrize("duration, seconds", [
+    (2, 2.0),
+    (2.5, 2.5),
+    ("3", 3.0),
+    (100, 100.0),    # at the threshold: still seconds
+    (101, 0.101),    # above it: legacy milliseconds
+    (1000, 1.0),
+    (None, 5.0),     # WAIT_STEP_DEFAULT
+    (0, 5.0),
+    ("soon", 5.0),
+    (-1, 0.0),
+])
+def test_wait_step_duration(duration, seconds):
+    from app_selenium_live import wait_step_seconds
+    assert wait_step_seconds({"duration": duration}) == pytest.approx(seconds)
+
+
+def churning_page(stub_node, monkeypatch, settle_ms=60000):
+    """Pages keep changing for settle_ms after every navigation, click or keystroke."""
+    monkeypatch.setattr(stub_node[0].node, "settle_ms", settle_ms)
+
+
+def open_then(step):
+    return [{"id": "open", "type": "navigate", "config": {"url": "https://example.test/", "wait_after": "none"}}, step]
+
+
+def test_default_click_settle_is_capped_near_the_old_fixed_wait(backend, stub_node, monkeypatch):
+    churning_page(stub_node, monkeypatch)
+    click = run(backend, open_then({"id": "click", "type": "click", "config": {"xpath": "//button"}}))["results"][1]
+    assert click["result"]["success"] and click["result"]["wait"] == "settle" and not click["result"]["met"]
+    assert 400 <= click["result"]["waited_ms"] < 1500
+
+
+def test_settle_waits_for_the_page_to_go_quiet(backend, stub_node, monkeypatch):
+    churning_page(stub_node, monkeypatch, settle_ms=400)
+    step = {"id": "click", "type": "click", "config": {"xpath": "//button", "wait_after": "settle"}}
+    click = run(backend, open_then(step))["results"][1]["result"]
+    # asked for explicitly, settle gets SETTLE_TIMEOUT: 400ms of changes, then SETTLE_QUIET_MS of quiet
+    assert click["met"] and 500 <= click["waited_ms"] < 3000
+
+
+def test_a_wait_step_on_a_page_that_never_settles_carries_on(backend, stub_node, monkeypatch):
+    churning_page(stub_node, monkeypatch)
+    wait = run(backend, open_then({"id": "wait", "type": "wait", "config": {"duration": 0.5}}))["results"][1]
+    assert wait["result"]["success"] and not wait["result"]["met"]
+
+
+def test_a_wait_step_for_a_missing_element_fails(backend):
+    step = {"id": "wait", "type": "wait",
+            "config": {"duration": 0.3, "until": "visible", "xpath": "//div[@id='missing']"}}
+    wait = run(backend, open_then(step))["results"][1]["result"]
+    assert not wait["success"] and "visible //div[@id='missing']" in wait["error"]
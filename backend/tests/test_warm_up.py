@@ -0,0 +1,22 @@
+import threading
+
+import server
+
+
+def test_warm_up_runs_without_debug_assets_and_leaves_the_global_level(monkeypatch):
+    monkeypatch.setattr(server, "DEBUG_LEVEL", "full")
+    monkeypatch.setattr(server.pytesseract, "get_tesseract_version", lambda: "stub")
+    seen = {}
+
+    def finish_page(page):
+        seen["warm_up"] = server.debug_enabled("overlay")
+        # a request thread serving meanwhile still gets the configured level
+        other = threading.Thread(target=lambda: seen.update(request=server.debug_enabled("full")))
+        other.start()
+        other.join()
+        seen["global"] = server.DEBUG_LEVEL
+
+    monkeypatch.setattr(server, "finish_page", finish_page)
+    server.warm_up()
+    assert seen == {"warm_up": False, "request": True, "global": "full"}
+    assert server.debug_enabled("full")
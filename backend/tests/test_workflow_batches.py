@@ -0,0 +1,144 @@
+import json
+import os
+import stat
+import threading
+
+import pytest
+
+from jobs import JobCancelled
+from workflow_batches import BatchStore, missing_variables, parse_dataset, render_steps, run_batch
+
+STEPS = [
+    {"id": "open", "type": "navigate", "config": {"url": "https://example.test/{{ region }}/login"}},
+    {"id": "user", "type": "type", "config": {"xpath": "//input[@name='user']", "text": "{{user}}"}},
+    {"id": "pass", "type": "type", "config": {"xpath": "//input[@name='password']", "text": "{{password}}",
+                                             "ends_login": True}},
+]
+
+
+class Progress:
+    """Stands in for a job's progress callback."""
+
+    def __init__(self):
+        self.job_id = "test"
+        self.cancelled = threading.Event()
+        self.events = []
+
+    def __call__(self, stage, **details):
+        self.events.append((stage, details))
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+
+def rows(count):
+    return [{"region": "eu", "user": f"user{n}", "password": f"secret{n}"} for n in range(count)]
+
+
+def runner(fail=(), calls=None):
+    """run_row stand-in: records the user it typed, fails rows whose user is in `fail`."""
+    def run_row(steps, row_progress):
+        user = steps[1]["config"]["text"]
+        if calls is not None:
+            calls.append(user)
+        results = [{"step_id": s["id"], "result": {"success": True}} for s in steps]
+        if user in fail:
+            results[-1]["result"] = {"success": False, "error": "rejected"}
+        return {"results": results, "session_id": 1, "round_trips": 3, "login": "login"}
+    return run_row
+
+
+def test_render_steps_fills_placeholders_and_leaves_other_config():
+    rendered = render_steps(STEPS, {"region": "eu", "user": "asha", "password": 1234})
+    assert rendered[0]["config"]["url"] == "https://example.test/eu/login"
+    assert rendered[2]["config"] == {"xpath": "//input[@name='password']", "text": "1234", "ends_login": True}
+    assert STEPS[1]["config"]["text"] == "{{user}}"  # the template is not modified
+    with pytest.raises(KeyError):
+        render_steps(STEPS, {"region": "eu", "user": "asha"})
+
+
+def test_missing_variables_lists_rows_and_names():
+    data = [{"region": "eu", "user": "a", "password": "x"}, {"user": "b"},
+            {"region": "eu", "user": "c", "password": None}]
+    assert missing_variables(STEPS, data) == [(2, ["password", "region"]), (3, ["password"])]
+    assert missing_variables(STEPS, data, limit=1) == [(2, ["password", "region"])]
+
+
+def test_parse_csv_and_jsonl():
+    assert parse_dataset("user,password\nasha,x1\nravi,x2\n", "csv") == [
+        {"user": "asha", "password": "x1"}, {"user": "ravi", "password": "x2"}]
+    assert parse_dataset('{"user": "asha", "n": 1}\n\n{"user": "ravi"}\n', "jsonl") == [
+        {"user": "asha", "n": 1}, {"user": "ravi"}]
+
+
+@pytest.mark.parametrize("text, fmt, message", [
+    ("user\nasha,extra\n", "csv", "more fields than the header"),
+    ('{"user": "asha"}\n{"user": \n', "jsonl", "line 2 is not valid JSON"),
+    ('["asha"]\n', "jsonl", "line 1 is not an object"),
+    ("user\nasha\n", "xlsx", "Unknown dataset format"),
+])
+def test_parse_dataset_rejects_bad_input(text, fmt, message):
+    with pytest.raises(ValueError, match=message):
+        parse_dataset(text, fmt)
+
+
+def test_resume_skips_finished_rows_and_retries_failed_ones(tmp_path):
+    store = BatchStore(str(tmp_path))
+    assert store.create("b1", STEPS, rows(4))
+    assert not store.create("b1", STEPS, rows(4))  # posted again: the stored batch is resumed
+
+    first = run_batch(store, "b1", runner(fail={"user1", "user3"}), Progress(), parallelism=2)
+    assert first["states"] == {"done": 2, "failed": 2} and first["pending"] == 2
+
+    calls = []
+    second = run_batch(store, "b1", runner(calls=calls), Progress(), parallelism=2)
+    assert sorted(calls) == ["user1", "user3"]
+    assert second["states"] == {"done": 4} and second["pending"] == 0 and second["rows_run"] == 2
+    assert [store.results("b1")[n]["state"] for n in range(4)] == ["done"] * 4
+
+
+def test_cancelled_batch_resumes_with_the_rows_it_had_not_run(tmp_path):
+    store = BatchStore(str(tmp_path))
+    store.create("b2", STEPS, rows(5))
+    progress = Progress()
+    calls = []
+
+    def run_two_then_cancel(steps, row_progress):
+        summary = runner(calls=calls)(steps, row_progress)
+        if len(calls) == 2:
+            progress.cancelled.set()
+        return summary
+
+    with pytest.raises(JobCancelled) as raised:
+        run_batch(store, "b2", run_two_then_cancel, progress, parallelism=1)
+    assert raised.value.result["finished"] == 2
+
+    calls.clear()
+    run_batch(store, "b2", runner(calls=calls), Progress(), parallelism=1)
+    assert calls == ["user2", "user3", "user4"]
+
+
+def test_torn_last_checkpoint_line_is_skipped(tmp_path):
+    store = BatchStore(str(tmp_path))
+    store.create("b3", STEPS, rows(2))
+    store.record("b3", {"row": 0, "state": "done"})
+    with open(tmp_path / "b3.rows.jsonl", "a") as fh:
+        fh.write('{"row": 1, "sta')  # the process died mid-write
+    assert store.results("b3") == {0: {"row": 0, "state": "done"}}
+
+
+def test_checkpoints_are_private_to_their_owner(tmp_path):
+    directory = tmp_path / "batches"
+    store = BatchStore(str(directory))
+    store.create("b4", STEPS, rows(1))
+    store.record("b4", {"row": 0, "state": "done"})
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    for name in ("b4.json", "b4.rows.jsonl"):
+        assert stat.S_IMODE(os.stat(directory / name).st_mode) == 0o600
+    assert json.loads((directory / "b4.json").read_text())["rows"] == rows(1)
+
+
+def test_batch_ids_are_validated(tmp_path):
+    with pytest.raises(ValueError):
+        BatchStore(str(tmp_path)).create("../escape", STEPS, rows(1))
@@ -0,0 +1,63 @@
+import time
+
+from jobs import JobManager
+
+
+def test_runs_wait_for_a_slot_instead_of_exhausting_the_pool(backend):
+    backend.get_driver()  # the interactive session holds one of the two
+    jobs = JobManager(workers=2, thread_name_prefix="test-workflow")
+    steps = [
+        {"id": "open", "type": "navigate", "config": {"url": "https://example.test/"}},
+        # longer than the pool's lease timeout, so a second lease would have failed
+        {"id": "hold", "type": "wait", "config": {"duration": 1.5, "until": "sleep"}},
+    ]
+    job_ids = [jobs.submit("workflow", lambda progress: backend.run_workflow(steps, progress)) for _ in range(2)]
+    statuses = [jobs.wait(job_id, timeout=30) for job_id in job_ids]
+    assert [status["state"] for status in statuses] == ["done", "done"]
+    assert backend.browser_pool.snapshot()["exhausted"] == 0
+
+
+def test_a_run_waiting_for_a_slot_can_be_cancelled(backend):
+    jobs = JobManager(workers=1, thread_name_prefix="test-workflow")
+    backend.workflow_slots.acquire()
+    try:
+        job_id = jobs.submit("workflow", lambda progress: backend.run_workflow([{"type": "navigate"}], progress))
+        jobs.cancel(job_id)
+        assert jobs.wait(job_id, timeout=5)["state"] == "cancelled"
+    finally:
+        backend.workflow_slots.release()
+    assert backend.browser_pool.snapshot()["leases"] == 0
+
+
+def test_execute_workflow_answers_202_once_its_wait_runs_out(backend, monkeypatch):
+    monkeypatch.setattr(backend, "WORKFLOW_SYNC_WAIT_SECONDS", 0.2)
+    client = backend.app.test_client()
+    steps = [{"id": "hold", "type": "wait", "config": {"duration": 1, "until": "sleep"}}]
+    response = client.post("/api/execute-workflow", json={"steps": steps})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.get_json()["status_url"] == f"/api/workflow-runs/{job_id}"
+    status = backend.workflow_jobs.wait(job_id, timeout=30)
+    assert status["state"] == "done"
+    assert client.get(f"/api/workflow-runs/{job_id}").get_json()["result"]["results"][0]["step_id"] == "hold"
+
+
+def test_cancel_cuts_short_a_run_waiting_for_an_element(backend):
+    client = backend.app.test_client()
+    steps = [
+        {"id": "open", "type": "navigate", "config": {"url": "https://example.test/"}},
+        {"id": "click", "type": "click", "config": {"xpath": "//button[@id='missing']", "timeout": 30}},
+    ]
+    job_id = client.post("/api/workflow-runs", json={"steps": steps}).get_json()["job_id"]
+    deadline = time.monotonic() + 10
+    while not any(event["stage"] == "step" for event in backend.workflow_jobs.events(job_id)):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    time.sleep(0.3)  # the click step is now polling for its element
+
+    cancelled_at = time.monotonic()
+    assert client.post(f"/api/workflow-runs/{job_id}/cancel").get_json()["state"] == "running"
+    status = backend.workflow_jobs.wait(job_id, timeout=5)
+    assert status["state"] == "cancelled"
+    assert time.monotonic() - cancelled_at < 2
+    assert [r["step_id"] for r in status["result"]["results"]] == ["open"]
@@ -0,0 +1,149 @@
+"""
+Condition-based waits for workflow steps, instead of fixed sleeps.
+
+A wait polls one condition until it is met or its timeout runs out, and
+reports how long it took. Conditions:
+
+  - visible / clickable:  an element (by XPath) is displayed / displayed and enabled
+  - present:              an element exists in the DOM
+  - url_change:           the URL differs from the one captured before the action
+  - url_contains:         the URL contains some text
+  - ready:                document.readyState is "complete"
+  - dom_quiet:            no DOM mutation for quiet_ms
+  - network_idle:         no fetch/XHR in flight for quiet_ms
+  - settle:               ready + network_idle + dom_quiet (the default after actions)
+
+The page-side conditions share one probe script per poll. It installs a
+MutationObserver and fetch/XHR counters into the page the first time it
+runs in a document, so requests started before that are not seen; quiet
+time is measured from the install.
+"""
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from jobs import JobCancelled
+
+POLL_SECONDS = 0.05
+
+PAGE_PROBE = """
+var w = window;
+if (!w.__rpaWait) {
+  var s = w.__rpaWait = {pending: 0, last: Date.now()};
+  var touch = function () { s.last = Date.now(); };
+  try {
+    new MutationObserver(touch).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  } catch (e) {}
+  if (w.fetch) {
+    var fetch = w.fetch;
+    w.fetch = function () {
+      s.pending++;
+      return fetch.apply(this, arguments).finally(function () { s.pending--; touch(); });
+    };
+  }
+  if (w.XMLHttpRequest) {
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+      s.pending++;
+      this.addEventListener('loadend', function () { s.pending--; touch(); });
+      return send.apply(this, arguments);
+    };
+  }
+}
+return {ready: document.readyState, pending: w.__rpaWait.pending,
+        quietMs: Date.now() - w.__rpaWait.last, url: location.href};
+"""
+
+CONDITIONS = ("visible", "clickable", "present", "url_change", "url_contains",
+              "ready", "dom_quiet", "network_idle", "settle")
+
+
+class WaitTimeout(Exception):
+    def __init__(self, condition, timeout):
+        super().__init__(f"Timed out after {timeout:g}s waiting for {condition}")
+        self.condition = condition
+        self.timeout = timeout
+
+
+def probe_page(driver):
+    """Readiness, pending requests, quiet time and URL of the current document (one round trip)."""
+    try:
+        return driver.execute_script(PAGE_PROBE) or {}
+    except WebDriverException:
+        return {}  # mid-navigation: the old document is gone, the new one not scriptable yet
+
+
+def make_condition(name, xpath=None, text=None, from_url=None, quiet_ms=150):
+    """A WebDriverWait condition for one of CONDITIONS; raises ValueError for unknown names/arguments."""
+    if name in ("visible", "clickable", "present"):
+        if not xpath:
+            raise ValueError(f"'{name}' wait needs an xpath")
+        locator = (By.XPATH, xpath)
+        return {
+            "visible": EC.visibility_of_element_located,
+            "clickable": EC.element_to_be_clickable,
+            "present": EC.presence_of_element_located,
+        }[name](locator)
+    if name == "url_change":
+        return lambda driver: driver.current_url != from_url
+    if name == "url_contains":
+        if not text:
+            raise ValueError("'url_contains' wait needs text")
+        return lambda driver: text in driver.current_url
+    if name in ("ready", "dom_quiet", "network_idle", "settle"):
+        def page_condition(driver):
+            state = probe_page(driver)
+            if not state:
+                return False
+            ready = state.get("ready") == "complete"
+            quiet = state.get("quietMs", 0) >= quiet_ms
+            idle = state.get("pending", 0) <= 0 and quiet
+            return {"ready": ready, "dom_quiet": quiet, "network_idle": idle, "settle": ready and idle}[name]
+        return page_condition
+    raise ValueError(f"Unknown wait condition: {name} (expected one of {', '.join(CONDITIONS)})")
+
+
+def wait_for(driver, condition, timeout, cancelled=None, label="condition"):
+    """
+    Poll condition(driver) until it returns something truthy, which is returned
+    with the seconds waited. Raises WaitTimeout, or JobCancelled once cancelled is set.
+    """
+    def check(browser):
+        if cancelled is not None and cancelled.is_set():
+            raise JobCancelled()
+        return condition(browser)
+
+    started = time.perf_counter()
+    try:
+        value = WebDriverWait(driver, timeout, poll_frequency=POLL_SECONDS).until(check)
+    except TimeoutException:
+        raise WaitTimeout(label, timeout)
+    return value, time.perf_counter() - started
+
+
+def settle(driver, timeout, quiet_ms=150, cancelled=None, from_url=None, condition="settle"):
+    """
+    After-action wait that never fails the step: returns {"wait", "met", "waited_ms"}.
+    condition "none" skips it; "url_change" also needs from_url.
+    """
+    if condition == "none":
+        return {"wait": "none", "met": True, "waited_ms": 0}
+    started = time.perf_counter()
+    try:
+        _, waited = wait_for(driver, make_condition(condition, from_url=from_url, quiet_ms=quiet_ms),
+                             timeout, cancelled, condition)
+        met = True
+    except WaitTimeout:
+        waited, met = time.perf_counter() - started, False
+    return {"wait": condition, "met": met, "waited_ms": round(waited * 1000, 1)}
+
+
+def pause(seconds, cancelled=None):
+    """A fixed sleep that cancellation cuts short (raises JobCancelled)."""
+    if cancelled is None:
+        time.sleep(seconds)
+    elif cancelled.wait(seconds):
+        raise JobCancelled()
@@ -0,0 +1,277 @@
+"""
+Parameterized workflow batches: one workflow with {{variable}} placeholders in
+its step configs, run once per row of a CSV or JSONL dataset.
+
+  - parse_dataset() reads the rows (CSV with a header line, or one JSON object per line)
+  - render_steps() fills a row into the steps; missing variables are an error,
+    checked for every row before anything runs
+  - BatchStore checkpoints a batch on disk: <id>.json holds the definition,
+    <id>.rows.jsonl gets one line per finished row (flushed and fsynced), so a
+    batch that crashed or was cancelled resumes with the rows it had not finished
+  - run_batch() runs the pending rows on `parallelism` threads, each row a
+    workflow run on its own browser session, and reports aggregate throughput
+
+The checkpoint files hold the dataset, credentials included, in plain text:
+the batch directory is created 0700 and its files 0600, and batches should be
+deleted once done.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+
+from jobs import JobCancelled
+
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_.-]*)\s*\}\}")
+BATCH_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def parse_dataset(text, fmt):
+    """Rows (dicts of strings/values) of a CSV or JSONL dataset; raises ValueError for bad input."""
+    if fmt == "csv":
+        rows = [dict(row) for row in csv.DictReader(io.StringIO(text))]
+        if rows and None in rows[0]:
+            raise ValueError("CSV row 1 has more fields than the header")
+        return rows
+    if fmt == "jsonl":
+        rows = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"JSONL line {number} is not valid JSON: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"JSONL line {number} is not an object")
+            rows.append(row)
+        return rows
+    raise ValueError(f"Unknown dataset format: {fmt} (expected csv or jsonl)")
+
+
+def dataset_format(filename=None, content_type=None):
+    """csv or jsonl, from a file name or content type (csv when unknown)."""
+    name, kind = (filename or "").lower(), (content_type or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in kind or "jsonl" in kind:
+        return "jsonl"
+    return "csv"
+
+
+def placeholders(steps):
+    """Variable names used by the steps' configs."""
+    names = set()
+    for step in steps:
+        for value in (step.get("config") or {}).values():
+            if isinstance(value, str):
+                names.update(PLACEHOLDER.findall(value))
+    return names
+
+
+def render_steps(steps, row):
+    """The steps with every {{name}} in their config replaced by row[name]; raises KeyError when missing."""
+    def fill(match):
+        name = match.group(1)
+        if name not in row or row[name] is None:
+            raise KeyError(name)
+        return str(row[name])
+
+    rendered = []
+    for step in steps:
+        config = {key: PLACEHOLDER.sub(fill, value) if isinstance(value, str) else value
+                  for key, value in (step.get("config") or {}).items()}
+        rendered.append({**step, "config": config})
+    return rendered
+
+
+def missing_variables(steps, rows, limit=10):
+    """[(row number, missing names)] of rows that do not fill every placeholder (first `limit`)."""
+    needed = placeholders(steps)
+    problems = []
+    for number, row in enumerate(rows, 1):
+        missing = sorted(name for name in needed if row.get(name) is None)
+        if missing:
+            problems.append((number, missing))
+            if len(problems) >= limit:
+                break
+    return problems
+
+
+def batch_id_for(steps, rows):
+    """Default batch id: posting the same workflow and dataset again resumes the same batch."""
+    material = json.dumps([steps, rows], sort_keys=True, default=str).encode()
+    return hashlib.sha256(material).hexdigest()[:24]
+
+
+class BatchStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _open(self, path, mode):
+        """Open a checkpoint file for writing, readable by its owner only."""
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if mode == "a" else os.O_TRUNC)
+        return os.fdopen(os.open(path, flags, 0o600), mode, encoding="utf-8")
+
+    def _path(self, batch_id, suffix):
+        if not BATCH_ID.fullmatch(batch_id or ""):
+            raise ValueError(f"Invalid batch id: {batch_id!r}")
+        return os.path.join(self.directory, f"{batch_id}{suffix}")
+
+    def create(self, batch_id, steps, rows):
+        """Write the definition, unless the batch already exists (then it is resumed)."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        os.chmod(self.directory, 0o700)
+        path = self._path(batch_id, ".json")
+        if os.path.exists(path):
+            return False
+        tmp_path = f"{path}.tmp"
+        with self._open(tmp_path, "w") as fh:
+            json.dump({"batch_id": batch_id, "created_at": time.time(), "steps": steps, "rows": rows}, fh)
+        os.replace(tmp_path, path)
+        return True
+
+    def load(self, batch_id):
+        """The batch definition, or None."""
+        try:
+            with open(self._path(batch_id, ".json"), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def record(self, batch_id, row_result):
+        """Checkpoint one finished row."""
+        line = json.dumps(row_result, default=str) + "\n"
+        with self._lock:
+            with self._open(self._path(batch_id, ".rows.jsonl"), "a") as fh:
+                fh.write(line)
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def results(self, batch_id):
+        """Latest checkpointed result per row index (a torn last line from a crash is skipped)."""
+        results = {}
+        try:
+            with open(self._path(batch_id, ".rows.jsonl"), "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue
+                    results[result["row"]] = result
+        except OSError:
+            pass
+        return results
+
+    def batch_ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def delete(self, batch_id):
+        for suffix in (".json", ".rows.jsonl"):
+            try:
+                os.remove(self._path(batch_id, suffix))
+            except OSError:
+                pass
+
+
+class RowProgress:
+    """The progress callback handed to one row's workflow run: cancellation follows the batch."""
+
+    def __init__(self, batch_progress, row):
+        self.job_id = f"{batch_progress.job_id}:{row}"
+        self.cancelled = batch_progress.cancelled
+        self.check = batch_progress.check
+
+    def __call__(self, stage, **details):
+        pass  # per-step events of 500 rows would swamp the batch's event log; rows report when done
+
+
+def summarize(total, results, elapsed=None, ran=0):
+    """Aggregate counts and throughput of a batch's row results."""
+    states = {}
+    for result in results.values():
+        states[result["state"]] = states.get(result["state"], 0) + 1
+    durations = sorted(r["seconds"] for r in results.values() if r.get("seconds") is not None)
+    summary = {
+        "rows": total,
+        "finished": len(results),
+        "pending": total - sum(1 for r in results.values() if r["state"] == "done"),
+        "states": states,
+        "row_seconds_avg": round(sum(durations) / len(durations), 2) if durations else None,
+        "row_seconds_p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None,
+    }
+    if elapsed:
+        summary["elapsed_seconds"] = round(elapsed, 2)
+        summary["rows_run"] = ran
+        summary["rows_per_minute"] = round(ran / elapsed * 60, 1)
+    return summary
+
+
+def run_batch(store, batch_id, run_row, progress, parallelism):
+    """
+    Job body: run every row of a stored batch that has not finished successfully
+    (failed rows are retried on resume). run_row(steps, row_progress) runs one
+    rendered workflow and returns its summary (results, round_trips, login, ...).
+    Once cancelled, no new rows start and JobCancelled carries the summary.
+    """
+    batch = store.load(batch_id)
+    done = {row for row, result in store.results(batch_id).items() if result["state"] == "done"}
+    pending = [index for index in range(len(batch["rows"])) if index not in done]
+    progress("rows", total=len(batch["rows"]), pending=len(pending), resumed=len(done))
+    queue = iter(pending)
+    lock = threading.Lock()
+    ran = []
+    started = time.perf_counter()
+
+    def worker():
+        while not progress.cancelled.is_set():
+            with lock:
+                index = next(queue, None)
+            if index is None:
+                return
+            row_started = time.perf_counter()
+            result = {"row": index}
+            try:
+                summary = run_row(render_steps(batch["steps"], batch["rows"][index]), RowProgress(progress, index))
+                failed = next((r for r in summary["results"] if not r["result"].get("success")), None)
+                result.update({
+                    "state": "failed" if failed else "done",
+                    "steps": len(summary["results"]),
+                    "failed_step": failed["step_id"] if failed else None,
+                    "error": failed["result"].get("error") if failed else None,
+                    "session_id": summary.get("session_id"),
+                    "round_trips": summary.get("round_trips"),
+                    "login": summary.get("login"),
+                })
+            except Exception as e:
+                # JobCancelled (a row cut short) lands here too; the row is simply run again on resume
+                cancelled = progress.cancelled.is_set()
+                result.update({"state": "cancelled" if cancelled else "failed", "error": str(e)})
+            result["seconds"] = round(time.perf_counter() - row_started, 2)
+            store.record(batch_id, result)
+            with lock:
+                ran.append(result)
+                finished = len(ran)
+            progress("row", row=index, state=result["state"], error=result.get("error"),
+                     completed=finished, pending=len(pending) - finished)
+
+    threads = [threading.Thread(target=worker, name=f"batch-{batch_id}-{n}", daemon=True)
+               for n in range(max(1, min(parallelism, len(pending))))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = summarize(len(batch["rows"]), store.results(batch_id),
+                        time.perf_counter() - started, sum(1 for r in ran if r["state"] != "cancelled"))
+    summary["batch_id"] = batch_id
+    if progress.cancelled.is_set():
+        raise JobCancelled(result=summary)
+    return summary
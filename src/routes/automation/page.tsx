@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { DndContext, closestCenter, KeyboardSensor, PointerSensor, useSensor, useSensors, type DragEndEvent } from '@dnd-kit/core';
 import { arrayMove, SortableContext, sortableKeyboardCoordinates, verticalListSortingStrategy } from '@dnd-kit/sortable';
 import { Plus, ArrowLeft, Play, Save } from 'lucide-react';
@@ -17,6 +17,7 @@ export default function AutomationPage() {
   const [isExecuting, setIsExecuting] = useState(false);
   const [showStepSelector, setShowStepSelector] = useState(false);
   const [executionResults, setExecutionResults] = useState<any[]>([]);
+  const workflowRunRef = useRef<string | null>(null);
 
   const sensors = useSensors(
     useSensor(PointerSensor),
@@ -117,7 +118,8 @@ export default function AutomationPage() {
     setExecutionResults([]);
     
     try {
-      const response = await fetch('http://localhost:5000/api/execute-workflow', {
+      // Queue the run, then poll its status: a long workflow never holds one HTTP request open
+      const response = await fetch('http://localhost:5000/api/workflow-runs', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ steps: currentWorkflow.steps }),
@@ -127,15 +129,37 @@ export default function AutomationPage() {
         throw new Error('Failed to execute workflow');
       }
 
-      const result = await response.json();
-      setExecutionResults(result.results || []);
+      const { job_id: jobId } = await response.json();
+      workflowRunRef.current = jobId;
+      while (workflowRunRef.current === jobId) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await fetch(`http://localhost:5000/api/workflow-runs/${jobId}`);
+        if (!statusResponse.ok) {
+          throw new Error('Lost track of the workflow run');
+        }
+        const status = await statusResponse.json();
+        if (status.state === 'queued' || status.state === 'running') continue;
+        if (status.state === 'failed') {
+          throw new Error(status.error || 'Workflow run failed');
+        }
+        setExecutionResults(status.result?.results || []);
+        break;
+      }
     } catch (error) {
       console.error('Error executing workflow:', error);
     } finally {
+      workflowRunRef.current = null;
       setIsExecuting(false);
     }
   };
 
+  const cancelWorkflowRun = () => {
+    const jobId = workflowRunRef.current;
+    if (!jobId) return;
+    fetch(`http://localhost:5000/api/workflow-runs/${jobId}/cancel`, { method: 'POST' })
+      .catch(error => console.error('Error cancelling workflow:', error));
+  };
+
   const handleBrowserControl = (action: string, data?: unknown) => {
     console.log('Browser control action:', action, data);
     
@@ -147,6 +171,7 @@ export default function AutomationPage() {
         setIsExecuting(false);
         break;
       case 'stop_workflow':
+        cancelWorkflowRun();
         setIsExecuting(false);
         break;
       case 'reset_browser':
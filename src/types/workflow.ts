@@ -10,6 +10,8 @@ export interface WorkflowStep {
     xpath?: string;
     // Type step
     text?: string;
+    // Last step of the login prefix: the backend caches the session it produces
+    ends_login?: boolean;
     // Wait step
     duration?: number;
     // Screenshot step
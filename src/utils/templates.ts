@@ -50,7 +50,8 @@ export const workflowTemplates: Workflow[] = [
         title: 'Click Login Button',
         description: 'Submit the login form',
         config: {
-          xpath: '/html/body/div/div/div[2]/div[2]/div/div[2]/div/form/div[5]/button'
+          xpath: '/html/body/div/div/div[2]/div[2]/div/div[2]/div/form/div[5]/button',
+          ends_login: true
         },
         order: 4
       },
@@ -211,7 +212,8 @@ export const workflowTemplates: Workflow[] = [
         title: "Click Login Button",
         description: "Submits the login form by clicking the login button.",
         config: {
-          xpath: "//button[@type='submit']"
+          xpath: "//button[@type='submit']",
+          ends_login: true
         },
         order: 5
       },